@@ -0,0 +1,652 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Video Toolkit server
+
+Run from src/server:
+    python benchmark.py engine [--url URL] [--runs N]
+    python benchmark.py lookup [--entries N] [--lookups N]
+    python benchmark.py search [--entries N] [--runs N]
+    python benchmark.py save [--entries N] [--saves N]
+    python benchmark.py stress [--processes N] [--threads N] [--saves N]
+    python benchmark.py stream [--clients N] [--size-mb N] [--requests N]
+    python benchmark.py thumbnails [--cards N]
+    python benchmark.py merge [--seconds N] [--runs N]
+    python benchmark.py fragments [--seconds N] [--latency-ms N] [--fragments N ...]
+    python benchmark.py batch [--urls N] [--latency-ms N]
+    python benchmark.py playlist [--entries N] [--page-size N] [--latency-ms N]
+
+Without --url the benchmarks use a local HTTP fixture server, so they need
+no network access.
+"""
+
+import argparse
+import asyncio
+import functools
+import gc
+import http.client
+import http.server
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def serve_directory(directory: Path) -> Tuple[http.server.ThreadingHTTPServer, str]:
+    """Serve a directory over HTTP on a free local port in a background thread"""
+    handler = functools.partial(QuietHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class SlowHandler(QuietHandler):
+    """Adds a fixed delay to every request, like the round trip to a remote CDN"""
+
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+
+def summarize(label: str, samples: List[float], unit: str = "ms", scale: float = 1000) -> None:
+    values = sorted(sample * scale for sample in samples)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(
+        f"  {label:<24} n={len(values):<5} mean={statistics.mean(values):9.3f}{unit} "
+        f"median={statistics.median(values):9.3f}{unit} p95={p95:9.3f}{unit} min={values[0]:9.3f}{unit}"
+    )
+
+
+async def time_async(func: Callable, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def fixture_video_url(directory: Path) -> str:
+    """Create a small fake video file in a served directory and return its URL"""
+    (directory / "fixture.mp4").write_bytes(os.urandom(256 * 1024))
+    _, base_url = serve_directory(directory)
+    return f"{base_url}/fixture.mp4"
+
+
+async def bench_engine(url: str, runs: int) -> None:
+    """Per-analyze latency of the yt-dlp CLI versus the warm in-process engine"""
+    import extraction
+
+    print(f"📊 Extraction latency for {url} ({runs} runs per mode)")
+    for mode in ("subprocess", "inprocess"):
+        extraction.ytdlp_engine = extraction.create_engine(mode)
+        if extraction.ytdlp_engine is not None:
+            await extraction.ytdlp_engine.start()
+
+        async def analyze():
+            # Bypass the cache so every run performs a real extraction
+            extraction.extraction_cache.invalidate()
+            await extraction.extract_video_info(url)
+
+        cold = await time_async(analyze, 1)
+        summarize(f"{mode} (first call)", cold)
+        summarize(mode, await time_async(analyze, runs))
+        extraction.stop_extraction_engine()
+
+
+def fake_library_entry(index: int) -> Dict[str, Any]:
+    """A library entry shaped like the ones written by /videopage_save"""
+    video_id = f"{index:08x}-0000-4000-8000-000000000000"
+    return {
+        "id": video_id,
+        "video_url": f"https://www.youtube.com/watch?v={index:011d}",
+        "video_page_name": f"Benchmark video {index}",
+        "library_file_name": f"{video_id}.mp4",
+        "file_path": f"video_library/{video_id}.mp4",
+        "file_size": 10_000_000 + index,
+        "video_local_url": f"/videopage_file/{video_id}",
+        "video_direct_url": f"/video_library/{video_id}.mp4",
+        "saved_at": f"2024-01-01T00:00:{index % 60:02d}.{index:06d}",
+        "selected_tags": [f"tag{index % 50}", f"topic{index % 7}"],
+        "description": f"Description of benchmark video {index}. " * 8,
+        "category": f"Category {index % 12}",
+        "view_count": index * 13 % 100_000,
+        "like_count": index * 7 % 5_000,
+        "uploader": f"Uploader {index % 300}",
+        "duration": index % 3600,
+    }
+
+
+def bench_lookup(tmp_dir: Path, entries: int, lookups: int) -> None:
+    """/videopage_file id lookup: data.json scan vs SQLite vs in-memory index"""
+    from library_store import LibraryStore
+
+    print(f"📊 Video id lookup latency with {entries} library entries")
+    library = [fake_library_entry(i) for i in range(entries)]
+    ids = [entry["id"] for entry in library]
+
+    json_path = tmp_dir / "data.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(library, f, indent=2, ensure_ascii=False)
+    print(f"  data.json size: {json_path.stat().st_size / 1e6:.1f} MB")
+
+    def legacy_lookup(video_id: str):
+        # What /videopage_file did before the library store
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return next((video for video in data if video.get("id") == video_id), None)
+
+    samples = []
+    for _ in range(min(lookups, 5)):
+        started = time.perf_counter()
+        assert legacy_lookup(random.choice(ids))
+        samples.append(time.perf_counter() - started)
+    summarize("data.json scan", samples)
+
+    store = LibraryStore(tmp_dir / "library.db")
+    store.add_many(library)
+    sample_ids = [random.choice(ids) for _ in range(lookups)]
+    del library
+    # Like timeit, keep collector pauses over 100k live entries out of the samples
+    gc.collect()
+    gc.disable()
+
+    samples = []
+    for video_id in sample_ids:
+        store._index.clear()
+        started = time.perf_counter()
+        assert store.get(video_id)
+        samples.append(time.perf_counter() - started)
+    summarize("sqlite (index miss)", samples, unit="us", scale=1e6)
+
+    for video_id in sample_ids:
+        store.get(video_id)
+    samples = []
+    for video_id in sample_ids:
+        started = time.perf_counter()
+        assert store.get(video_id)
+        samples.append(time.perf_counter() - started)
+    summarize("in-memory index hit", samples, unit="us", scale=1e6)
+    gc.enable()
+    store.close()
+
+
+def bench_search(tmp_dir: Path, entries: int, runs: int) -> None:
+    """/videopage_list?search= latency: substring scan vs FTS5 index"""
+    from library_store import LibraryStore
+
+    print(f"📊 Library search latency with {entries} library entries")
+    store = LibraryStore(tmp_dir / "library.db")
+    store.add_many([fake_library_entry(i) for i in range(entries)])
+    queries = ["video 4242", "topic3", "benchmark", "uploader 17", "nomatch"]
+
+    for label, fts_enabled in (("substring scan", False), ("fts5 index", True)):
+        store.fts_enabled = fts_enabled
+        for query in queries:
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                results, _ = store.query(search=query, sort_by="relevance")
+                samples.append(time.perf_counter() - started)
+            summarize(f"{label} '{query}' ({len(results)})", samples)
+    store.close()
+
+
+def bench_save(tmp_dir: Path, entries: int, saves: int) -> None:
+    """Per-save latency: rewriting data.json vs a WAL commit to the library store"""
+    from library_store import LibraryStore
+
+    print(f"📊 Library save latency with {entries} existing entries")
+    library = [fake_library_entry(i) for i in range(entries)]
+
+    json_path = tmp_dir / "data.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(library, f, indent=2, ensure_ascii=False)
+
+    def legacy_save(entry: Dict[str, Any]):
+        # What both save endpoints did before the library store
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.append(entry)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    samples = []
+    for i in range(min(saves, 10)):
+        started = time.perf_counter()
+        legacy_save(fake_library_entry(entries + i))
+        samples.append(time.perf_counter() - started)
+    summarize("data.json rewrite", samples)
+
+    store = LibraryStore(tmp_dir / "library.db")
+    store.add_many(library)
+    samples = []
+    for i in range(saves):
+        started = time.perf_counter()
+        store.add(fake_library_entry(entries + i))
+        samples.append(time.perf_counter() - started)
+    summarize("sqlite wal commit", samples)
+    store.close()
+
+
+def _stress_worker(db_path: str, worker: int, threads: int, saves: int) -> Tuple[int, int]:
+    """Save `saves` distinct entries from `threads` threads of one process"""
+    from library_store import LibraryStore
+
+    store = LibraryStore(Path(db_path))
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda i: store.add(fake_library_entry(worker * saves + i)), range(saves)))
+    stats = (store.group_commits, store.grouped_writes)
+    store.close()
+    return stats
+
+
+def bench_stress(tmp_dir: Path, processes: int, threads: int, saves: int) -> None:
+    """Concurrent saves from several processes must all land in the library"""
+    from library_store import LibraryStore
+
+    expected = processes * saves
+    print(f"📊 {processes} processes x {threads} threads saving {expected} entries concurrently")
+    db_path = tmp_dir / "library.db"
+    LibraryStore(db_path).close()
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        futures = [pool.submit(_stress_worker, str(db_path), worker, threads, saves) for worker in range(processes)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    commits = sum(commit_count for commit_count, _ in results)
+    writes = sum(write_count for _, write_count in results)
+    print(f"  {expected / elapsed:.0f} saves/s, {writes} writes in {commits} group commits "
+          f"({writes / max(commits, 1):.1f} writes per commit)")
+
+    store = LibraryStore(db_path)
+    stored = store.count()
+    tags = store._connect().execute("SELECT COUNT(*) FROM video_tags").fetchone()[0]
+    tag_facets = sum(store.facet_counts()["tags"].values())
+    searchable = store.count_matching(search="benchmark")
+    store.close()
+    ok = stored == searchable == expected and tags == tag_facets
+    print(f"  entries={stored} searchable={searchable} tag rows={tags} tag facet total={tag_facets}")
+    print(f"  {'✅ no lost saves' if ok else '❌ library is missing saves'}")
+    if not ok:
+        raise SystemExit(1)
+
+
+def serve_asgi(app) -> Tuple[Any, int]:
+    """Run an ASGI app under uvicorn on a free local port in a background thread"""
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, sock.getsockname()[1]
+
+
+def _fetch(port: int, path: str, headers: Dict[str, str], stop_after: Optional[int] = None) -> int:
+    """GET a URL and read the body (or its first stop_after bytes); returns bytes read"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    received = 0
+    while stop_after is None or received < stop_after:
+        chunk = response.read(1024 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+    conn.close()
+    return received
+
+
+def bench_stream(tmp_dir: Path, clients: int, size_mb: int, requests: int) -> None:
+    """Library media serving: plain FileResponse vs RangeFileResponse under concurrent clients"""
+    from starlette.applications import Starlette
+    from starlette.responses import FileResponse
+    from starlette.routing import Route
+    from media_response import RangeFileResponse
+
+    size = size_mb * 1024 * 1024
+    media = tmp_dir / "media.mp4"
+    with open(media, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    async def plain(request):
+        return FileResponse(media, media_type="video/mp4")
+
+    async def ranged(request):
+        return RangeFileResponse(media, request, media_type="video/mp4")
+
+    server, port = serve_asgi(Starlette(routes=[Route("/plain", plain), Route("/range", ranged)]))
+    print(f"📊 Streaming a {size_mb} MB file to {clients} concurrent clients ({requests} requests each)")
+
+    for label, path in (("FileResponse", "/plain"), ("RangeFileResponse", "/range")):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            total = sum(pool.map(lambda _: _fetch(port, path, {}), range(clients * requests)))
+        elapsed = time.perf_counter() - started
+        print(f"  {label + ' full file':<32} {total / elapsed / 1e6:9.1f} MB/s")
+
+    # Seeking: the player needs 1 MB at a random offset. Without ranges it
+    # has to read from the start of the file up to that point.
+    window = 1024 * 1024
+    offsets = [random.randrange(0, size - window) for _ in range(clients * requests)]
+    for label, fetch in (
+        ("FileResponse", lambda offset: _fetch(port, "/plain", {}, stop_after=offset + window)),
+        ("RangeFileResponse", lambda offset: _fetch(
+            port, "/range", {"Range": f"bytes={offset}-{offset + window - 1}"})),
+    ):
+        def timed(offset):
+            started = time.perf_counter()
+            fetch(offset)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(clients) as pool:
+            samples = list(pool.map(timed, offsets))
+        summarize(f"{label} seek", samples)
+
+    server.should_exit = True
+
+
+async def bench_thumbnails(tmp_dir: Path, cards: int) -> None:
+    """Grid page weight: original thumbnails vs resized variants"""
+    from thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_WIDTHS, backfill_variants, variant_filename
+
+    # One 1280x720 JPEG per card, like the thumbnails yt-dlp writes
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=1",
+         "-frames:v", str(cards), "-q:v", "2", str(tmp_dir / "frame_%04d.jpg")],
+        check=True
+    )
+    thumbnails = []
+    for frame in sorted(tmp_dir.glob("frame_*.jpg")):
+        thumbnails.append(frame.rename(tmp_dir / f"{uuid.uuid4()}.jpg"))
+
+    started = time.perf_counter()
+    stats = await backfill_variants(thumbnails)
+    elapsed = time.perf_counter() - started
+    print(f"📊 Generated {stats['variants_written']} variants for {cards} thumbnails in {elapsed:.2f}s")
+
+    original = sum(path.stat().st_size for path in thumbnails)
+    print(f"  {'original':<16} {original / 1024:10.1f} KB per grid page")
+    for width in THUMBNAIL_WIDTHS:
+        for fmt in THUMBNAIL_FORMATS:
+            weight = sum((path.with_name(variant_filename(path.name, width, fmt))).stat().st_size for path in thumbnails)
+            print(f"  {f'{width}px {fmt}':<16} {weight / 1024:10.1f} KB per grid page ({original / weight:5.1f}x smaller)")
+
+
+def child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def bench_merge(tmp_dir: Path, seconds: int, runs: int) -> None:
+    """Merge cost: always re-encoding audio vs the probing stream-copy engine"""
+    from merge import merge_streams
+    from process_runner import run_process
+
+    video_file = tmp_dir / "sample.f137.mp4"
+    audio_file = tmp_dir / "sample.f140.m4a"
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+         "-c:v", "libx264", "-preset", "ultrafast", str(video_file)],
+        check=True
+    )
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-ac", "2", "-c:a", "aac", "-b:a", "128k", str(audio_file)],
+        check=True
+    )
+    output = tmp_dir / "merged.mp4"
+
+    async def reencode_audio():
+        await run_process("ffmpeg_merge", [
+            "ffmpeg", "-i", str(video_file), "-i", str(audio_file),
+            "-c:v", "copy", "-c:a", "aac", "-shortest", "-y", str(output)
+        ], timeout=600)
+
+    async def engine():
+        result = await merge_streams(video_file, audio_file, output)
+        assert result.ok and result.plan.decision == "copy", result.to_dict()
+
+    print(f"📊 Merging {seconds}s of 720p H.264 with AAC audio ({runs} runs per mode)")
+    for label, merge in (("always -c:a aac", reencode_audio), ("probe + stream copy", engine)):
+        wall, cpu = [], []
+        for _ in range(runs):
+            cpu_before = child_cpu_seconds()
+            started = time.perf_counter()
+            await merge()
+            wall.append(time.perf_counter() - started)
+            cpu.append(child_cpu_seconds() - cpu_before)
+        summarize(f"{label} wall", wall)
+        summarize(f"{label} CPU", cpu)
+
+
+def bench_fragments(tmp_dir: Path, seconds: int, latency_ms: int, fragment_counts: List[int]) -> None:
+    """HLS download throughput from a local fixture with serial vs parallel fragments"""
+    from downloader import build_downloader_args
+
+    stream_dir = tmp_dir / "hls"
+    stream_dir.mkdir()
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+         "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "4M", "-g", "30",
+         "-f", "hls", "-hls_time", "1", "-hls_playlist_type", "vod", str(stream_dir / "index.m3u8")],
+        check=True
+    )
+    stream_bytes = sum(path.stat().st_size for path in stream_dir.glob("*.ts"))
+    segments = len(list(stream_dir.glob("*.ts")))
+
+    handler = functools.partial(type("Handler", (SlowHandler,), {"latency": latency_ms / 1000}), directory=str(stream_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/index.m3u8"
+
+    print(f"📊 Downloading {segments} HLS fragments ({stream_bytes / 1e6:.1f} MB) with {latency_ms} ms latency each")
+    for count in fragment_counts:
+        output = tmp_dir / f"out_{count}.ts"
+        cmd = [
+            "yt-dlp", "--quiet", "--no-progress", "--no-part", "--fixup", "never",
+            *build_downloader_args(count, count),
+            "--output", str(output), url
+        ]
+        started = time.perf_counter()
+        subprocess.run(cmd, check=True)
+        elapsed = time.perf_counter() - started
+        print(f"  {f'--concurrent-fragments {count}':<28} {elapsed:7.2f}s {stream_bytes / elapsed / 1e6:8.1f} MB/s")
+    server.shutdown()
+
+
+def bench_batch(tmp_dir: Path, urls: int, latency_ms: int) -> None:
+    """Analyzing many URLs: one /videopage_analyze call after another vs /videopage_analyze_batch"""
+    media_dir = tmp_dir / "media"
+    media_dir.mkdir()
+    for index in range(urls * 2):
+        (media_dir / f"video_{index}.mp4").write_bytes(os.urandom(64 * 1024))
+    handler = functools.partial(type("Handler", (SlowHandler,), {"latency": latency_ms / 1000}), directory=str(media_dir))
+    media_server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=media_server.serve_forever, daemon=True).start()
+    port = media_server.server_address[1]
+    # Two host names for the same server, so the per-host cap is exercised
+    hosts = ("127.0.0.1", "localhost")
+    sequential_urls = [f"http://{hosts[index % 2]}:{port}/video_{index}.mp4" for index in range(urls)]
+    batch_urls = [f"http://{hosts[index % 2]}:{port}/video_{index}.mp4" for index in range(urls, urls * 2)]
+
+    # main keeps its library and downloads relative to the working directory
+    os.environ.setdefault("COOKIES_BROWSER", "none")
+    os.chdir(tmp_dir)
+    import main as server_main
+
+    server, server_port = serve_asgi(server_main.app)
+    print(f"📊 Analyzing {urls} URLs on 2 hosts with {latency_ms} ms latency per request")
+
+    started = time.perf_counter()
+    for url in sequential_urls:
+        conn = http.client.HTTPConnection("127.0.0.1", server_port, timeout=300)
+        conn.request("POST", "/videopage_analyze", body=json.dumps({"url": url}),
+                     headers={"Content-Type": "application/json"})
+        conn.getresponse().read()
+        conn.close()
+    sequential = time.perf_counter() - started
+    print(f"  {'one call per URL':<28} {sequential:7.2f}s {urls / sequential:7.2f} URLs/s")
+
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", server_port, timeout=300)
+    conn.request("POST", "/videopage_analyze_batch", body=json.dumps({"urls": batch_urls}),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    first_result = None
+    results = 0
+    for line in response:
+        if first_result is None:
+            first_result = time.perf_counter() - started
+        results += "index" in json.loads(line)
+    conn.close()
+    batch = time.perf_counter() - started
+    print(f"  {'batch (NDJSON)':<28} {batch:7.2f}s {urls / batch:7.2f} URLs/s "
+          f"first result after {first_result:.2f}s, {results} results")
+    server.should_exit = True
+    media_server.shutdown()
+
+
+async def bench_playlist(tmp_dir: Path, entries: int, page_size: int, latency_ms: int) -> None:
+    """Listing a playlist: full extraction of every entry vs one flat page"""
+    from playlists import PLAYLIST_ARGS, iter_playlist_page
+
+    media_dir = tmp_dir / "media"
+    media_dir.mkdir()
+    handler = functools.partial(type("Handler", (SlowHandler,), {"latency": latency_ms / 1000}), directory=str(media_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    items = []
+    for index in range(entries):
+        (media_dir / f"video_{index}.mp4").write_bytes(os.urandom(64 * 1024))
+        video_url = f"{base_url}/video_{index}.mp4"
+        items.append(f"<item><title>Video {index}</title><link>{video_url}</link>"
+                     f"<enclosure url=\"{video_url}\" type=\"video/mp4\"/></item>")
+    (media_dir / "feed.xml").write_text(
+        f"<?xml version=\"1.0\"?><rss version=\"2.0\"><channel><title>Fixture</title>{''.join(items)}</channel></rss>")
+    feed_url = f"{base_url}/feed.xml"
+    print(f"📊 Listing a {entries}-entry playlist with {latency_ms} ms latency per request")
+
+    # Before: the whole playlist fully extracted in one run
+    started = time.perf_counter()
+    subprocess.run(["yt-dlp", "--dump-json", "--quiet", *PLAYLIST_ARGS, feed_url], capture_output=True, check=True)
+    print(f"  {'full extraction, all entries':<32} {time.perf_counter() - started:7.2f}s")
+
+    started = time.perf_counter()
+    first_entry = None
+    listed = 0
+    async for _ in iter_playlist_page(feed_url, 1, page_size):
+        if first_entry is None:
+            first_entry = time.perf_counter() - started
+        listed += 1
+    print(f"  {f'flat page of {page_size}':<32} {time.perf_counter() - started:7.2f}s "
+          f"first entry after {first_entry:.2f}s, {listed} entries")
+    server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    engine_parser = subparsers.add_parser("engine", help="yt-dlp CLI vs in-process engine analyze latency")
+    engine_parser.add_argument("--url", help="Video URL to analyze (default: local fixture)")
+    engine_parser.add_argument("--runs", type=int, default=10)
+
+    lookup_parser = subparsers.add_parser("lookup", help="Library video id lookup latency")
+    lookup_parser.add_argument("--entries", type=int, default=100_000)
+    lookup_parser.add_argument("--lookups", type=int, default=10_000)
+
+    search_parser = subparsers.add_parser("search", help="Library search latency")
+    search_parser.add_argument("--entries", type=int, default=100_000)
+    search_parser.add_argument("--runs", type=int, default=5)
+
+    save_parser = subparsers.add_parser("save", help="Library save latency")
+    save_parser.add_argument("--entries", type=int, default=10_000)
+    save_parser.add_argument("--saves", type=int, default=200)
+
+    stress_parser = subparsers.add_parser("stress", help="Parallel saves from several processes")
+    stress_parser.add_argument("--processes", type=int, default=4)
+    stress_parser.add_argument("--threads", type=int, default=8)
+    stress_parser.add_argument("--saves", type=int, default=250, help="Saves per process")
+
+    stream_parser = subparsers.add_parser("stream", help="Library media serving throughput and seek latency")
+    stream_parser.add_argument("--clients", type=int, default=8)
+    stream_parser.add_argument("--size-mb", type=int, default=64)
+    stream_parser.add_argument("--requests", type=int, default=4, help="Requests per client")
+
+    thumbnails_parser = subparsers.add_parser("thumbnails", help="Grid page weight with thumbnail variants")
+    thumbnails_parser.add_argument("--cards", type=int, default=48, help="Thumbnails per grid page")
+
+    merge_parser = subparsers.add_parser("merge", help="Merge CPU time: audio re-encode vs stream copy")
+    merge_parser.add_argument("--seconds", type=int, default=120, help="Length of the sample video")
+    merge_parser.add_argument("--runs", type=int, default=5)
+
+    fragments_parser = subparsers.add_parser("fragments", help="HLS download throughput vs concurrent fragments")
+    fragments_parser.add_argument("--seconds", type=int, default=60, help="Length of the fixture stream")
+    fragments_parser.add_argument("--latency-ms", type=int, default=100, help="Delay added to every request")
+    fragments_parser.add_argument("--fragments", type=int, nargs="+", default=[1, 4, 8])
+
+    batch_parser = subparsers.add_parser("batch", help="Many-URL analysis: sequential calls vs the batch endpoint")
+    batch_parser.add_argument("--urls", type=int, default=32)
+    batch_parser.add_argument("--latency-ms", type=int, default=200, help="Delay added to every request")
+
+    playlist_parser = subparsers.add_parser("playlist", help="Playlist listing: full extraction vs flat pages")
+    playlist_parser.add_argument("--entries", type=int, default=100)
+    playlist_parser.add_argument("--page-size", type=int, default=50)
+    playlist_parser.add_argument("--latency-ms", type=int, default=100, help="Delay added to every request")
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        if args.benchmark == "engine":
+            asyncio.run(bench_engine(args.url or fixture_video_url(tmp_dir), args.runs))
+        elif args.benchmark == "lookup":
+            bench_lookup(tmp_dir, args.entries, args.lookups)
+        elif args.benchmark == "search":
+            bench_search(tmp_dir, args.entries, args.runs)
+        elif args.benchmark == "save":
+            bench_save(tmp_dir, args.entries, args.saves)
+        elif args.benchmark == "stress":
+            bench_stress(tmp_dir, args.processes, args.threads, args.saves)
+        elif args.benchmark == "stream":
+            bench_stream(tmp_dir, args.clients, args.size_mb, args.requests)
+        elif args.benchmark == "thumbnails":
+            asyncio.run(bench_thumbnails(tmp_dir, args.cards))
+        elif args.benchmark == "merge":
+            asyncio.run(bench_merge(tmp_dir, args.seconds, args.runs))
+        elif args.benchmark == "fragments":
+            bench_fragments(tmp_dir, args.seconds, args.latency_ms, args.fragments)
+        elif args.benchmark == "batch":
+            bench_batch(tmp_dir, args.urls, args.latency_ms)
+        elif args.benchmark == "playlist":
+            asyncio.run(bench_playlist(tmp_dir, args.entries, args.page_size, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Server tunables, overridable through environment variables."""
+
+import os
+from pathlib import Path
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to the default"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+# Maximum number of concurrently running external processes per tool.
+# Processes beyond the limit wait for a free slot instead of piling up.
+TOOL_CONCURRENCY = {
+    "ytdlp_analyze": _env_int("YTDLP_ANALYZE_CONCURRENCY", 8),
+    "ytdlp_download": _env_int("YTDLP_DOWNLOAD_CONCURRENCY", 4),
+    "ffmpeg_merge": _env_int("FFMPEG_MERGE_CONCURRENCY", 2),
+    "ffmpeg_probe": _env_int("FFMPEG_PROBE_CONCURRENCY", 8),
+    "ffmpeg_thumbnail": _env_int("FFMPEG_THUMBNAIL_CONCURRENCY", 4),
+    "ffmpeg_faststart": _env_int("FFMPEG_FASTSTART_CONCURRENCY", 2),
+    "ffmpeg_hls": _env_int("FFMPEG_HLS_CONCURRENCY", 2),
+}
+
+# Number of worker tasks draining the download job queue
+DOWNLOAD_WORKERS = _env_int("DOWNLOAD_WORKERS", 4)
+
+# Attempts (of up to 5 minutes each) a download gets when it times out or
+# its connection drops; every attempt continues the partial files
+DOWNLOAD_RESUME_ATTEMPTS = max(1, _env_int("DOWNLOAD_RESUME_ATTEMPTS", 3))
+
+# Seconds partial files of failed downloads are kept in download_tmp for a
+# retry to resume before they are deleted (0 keeps them until the job is
+# pruned from the history)
+DOWNLOAD_PARTIAL_MAX_AGE = _env_int("DOWNLOAD_PARTIAL_MAX_AGE", 7 * 24 * 3600)
+
+# Downloads running against the same host at once, and connections one
+# download may open to it (caps --concurrent-fragments and aria2c splits)
+DOWNLOAD_HOST_CONCURRENCY = _env_int("DOWNLOAD_HOST_CONCURRENCY", 2)
+DOWNLOAD_HOST_CONNECTIONS = _env_int("DOWNLOAD_HOST_CONNECTIONS", 8)
+
+# DASH/HLS fragments fetched in parallel per download, and an optional
+# external downloader for yt-dlp (e.g. "aria2c"; empty uses yt-dlp's own)
+YTDLP_CONCURRENT_FRAGMENTS = _env_int("YTDLP_CONCURRENT_FRAGMENTS", 4)
+YTDLP_EXTERNAL_DOWNLOADER = os.getenv("YTDLP_EXTERNAL_DOWNLOADER", "").strip()
+
+# Finished jobs kept around for GET /jobs before the oldest are forgotten
+JOB_HISTORY_LIMIT = _env_int("JOB_HISTORY_LIMIT", 500)
+
+# yt-dlp --dump-json results shared by analyze, metadata, download and save.
+# Set EXTRACTION_CACHE_DIR to also keep them on disk across restarts.
+EXTRACTION_CACHE_SIZE = _env_int("EXTRACTION_CACHE_SIZE", 128)
+EXTRACTION_CACHE_TTL = _env_int("EXTRACTION_CACHE_TTL", 1800)
+EXTRACTION_CACHE_DIR = Path(os.environ["EXTRACTION_CACHE_DIR"]) if os.getenv("EXTRACTION_CACHE_DIR") else None
+
+# How metadata extraction runs: "subprocess" forks the yt-dlp CLI per call,
+# "inprocess" keeps warm YoutubeDL instances in a pool of worker processes
+YTDLP_ENGINE = os.getenv("YTDLP_ENGINE", "subprocess").strip().lower()
+YTDLP_ENGINE_WORKERS = _env_int("YTDLP_ENGINE_WORKERS", 2)
+
+# POST /videopage_analyze_batch: extractions one batch runs at once, how many
+# of them may target the same host, and the most URLs a batch may contain
+ANALYZE_BATCH_CONCURRENCY = _env_int("ANALYZE_BATCH_CONCURRENCY", 8)
+ANALYZE_HOST_CONCURRENCY = _env_int("ANALYZE_HOST_CONCURRENCY", 2)
+ANALYZE_BATCH_MAX_URLS = _env_int("ANALYZE_BATCH_MAX_URLS", 500)
+
+# Playlist/channel entries listed per page when the client gives no limit,
+# and the largest page it may ask for
+PLAYLIST_PAGE_SIZE = _env_int("PLAYLIST_PAGE_SIZE", 50)
+PLAYLIST_MAX_PAGE_SIZE = _env_int("PLAYLIST_MAX_PAGE_SIZE", 500)
+
+# Browser cookies are exported once into COOKIES_FILE and shared by all yt-dlp
+# calls. COOKIES_BROWSER takes a yt-dlp --cookies-from-browser spec (e.g.
+# "chrome" or "firefox:default"); set it to "none" to only use an existing
+# COOKIES_FILE, or run without cookies.
+COOKIES_FILE = Path(os.getenv("COOKIES_FILE", "cookies.txt"))
+_cookies_browser = os.getenv("COOKIES_BROWSER", "chrome").strip()
+COOKIES_BROWSER = None if _cookies_browser.lower() in ("", "none") else _cookies_browser
+COOKIES_REFRESH_INTERVAL = _env_int("COOKIES_REFRESH_INTERVAL", 3600)
+
+# The video library database runs in WAL mode. Saves append to the log; it is
+# folded back into library.db once it grows past LIBRARY_WAL_AUTOCHECKPOINT
+# pages and every LIBRARY_CHECKPOINT_INTERVAL seconds (0 disables the timer).
+LIBRARY_WAL_AUTOCHECKPOINT = _env_int("LIBRARY_WAL_AUTOCHECKPOINT", 1000)
+LIBRARY_CHECKPOINT_INTERVAL = _env_int("LIBRARY_CHECKPOINT_INTERVAL", 300)
+
+# Seconds a library write waits for another process (e.g. another uvicorn
+# worker) to release the database write lock before failing
+LIBRARY_BUSY_TIMEOUT = _env_int("LIBRARY_BUSY_TIMEOUT", 30)
+
+# Re-encode HEVC video to H.264 when merging (MERGE_TRANSCODE_HEVC=1) so
+# browsers without HEVC support can play it. Off by default: it turns a
+# stream copy into a full libx264 encode, which can take several times the
+# video's duration on a small CPU.
+MERGE_TRANSCODE_HEVC = os.getenv("MERGE_TRANSCODE_HEVC", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Optional HLS packaging of saved videos (HLS_PACKAGING=1). The source is
+# stream-copied; HLS_LADDER lists the lower rendition heights to transcode.
+HLS_PACKAGING = os.getenv("HLS_PACKAGING", "").strip().lower() in ("1", "true", "yes", "on")
+HLS_LADDER = os.getenv("HLS_LADDER", "720,360")
+HLS_SEGMENT_SECONDS = _env_int("HLS_SEGMENT_SECONDS", 6)
+HLS_WORKERS = _env_int("HLS_WORKERS", 1)
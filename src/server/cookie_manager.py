@@ -0,0 +1,142 @@
+"""Cookie jar shared by all yt-dlp invocations.
+
+Reading cookies straight from the browser means decrypting its cookie
+database on every call, which is slow and impossible on headless servers.
+The manager exports the browser cookies once into a Netscape cookie file and
+refreshes it on a schedule or after authentication failures. Every yt-dlp
+invocation gets a private copy of that file because yt-dlp writes its cookie
+jar back on exit.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import COOKIES_BROWSER, COOKIES_FILE, COOKIES_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Minimum delay between two refreshes triggered by authentication failures
+MIN_REFRESH_GAP = 60
+
+# yt-dlp error output suggesting missing or stale cookies
+AUTH_ERROR_MARKERS = (
+    "Sign in to confirm",
+    "cookies",
+    "HTTP Error 403",
+    "login required",
+    "members-only",
+)
+
+NETSCAPE_COOKIE_HEADER = "# Netscape HTTP Cookie File\n"
+
+
+def is_auth_error(stderr: str) -> bool:
+    return any(marker in stderr for marker in AUTH_ERROR_MARKERS)
+
+
+class CookieManager:
+    """Materializes browser cookies into a cookie file and keeps it fresh"""
+
+    def __init__(self, cookies_file: Path, browser: Optional[str], refresh_interval: float):
+        self.cookies_file = cookies_file
+        self.browser = browser
+        self.refresh_interval = refresh_interval
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refresh_count = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _export(self) -> int:
+        """Export the browser cookies into the cookie file; returns the cookie count"""
+        import yt_dlp
+        from yt_dlp.cookies import load_cookies
+
+        # Reuse yt-dlp's parser so "chrome:Profile 1" style specs work as on the CLI
+        browser_spec = yt_dlp.parse_options(["--cookies-from-browser", self.browser]).ydl_opts["cookiesfrombrowser"]
+        jar = load_cookies(None, browser_spec, None)
+        tmp_path = self.cookies_file.with_name(self.cookies_file.name + ".tmp")
+        # The file holds live browser sessions: create it readable by the owner only
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.close(fd)
+        os.chmod(tmp_path, 0o600)  # In case a stale tmp file existed with a wider mode
+        jar.save(str(tmp_path))
+        os.replace(tmp_path, self.cookies_file)
+        return len(jar)
+
+    async def refresh(self, reason: str, force: bool = False) -> bool:
+        """Re-export the browser cookies; returns whether a cookie file is available"""
+        if not self.browser:
+            return self.cookies_file.exists()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self.last_refresh and time.time() - self.last_refresh < MIN_REFRESH_GAP:
+                return self.cookies_file.exists()
+            loop = asyncio.get_running_loop()
+            try:
+                count = await loop.run_in_executor(None, self._export)
+                self.last_error = None
+                logger.info(f"Exported {count} cookies from {self.browser} to {self.cookies_file} ({reason})")
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Could not export cookies from {self.browser} ({reason}): {str(e)}")
+            self.last_refresh = time.time()
+            self.refresh_count += 1
+        return self.cookies_file.exists()
+
+    def request_refresh(self, stderr: str) -> None:
+        """Schedule a refresh when yt-dlp output points to an authentication failure"""
+        if self.browser and is_auth_error(stderr):
+            asyncio.ensure_future(self.refresh("authentication failure"))
+
+    async def start(self) -> None:
+        await self.refresh("startup", force=True)
+        if self.browser and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh("scheduled", force=True)
+
+    @contextmanager
+    def cookie_args(self) -> Iterator[List[str]]:
+        """yt-dlp arguments pointing at a private copy of the cookie file"""
+        if not self.cookies_file.exists():
+            yield []
+            return
+        fd, private_path = tempfile.mkstemp(prefix="vt-cookies-", suffix=".txt")
+        os.close(fd)
+        try:
+            shutil.copyfile(self.cookies_file, private_path)
+            yield ["--cookies", private_path]
+        finally:
+            os.unlink(private_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cookies_file": str(self.cookies_file),
+            "cookies_file_exists": self.cookies_file.exists(),
+            "browser": self.browser,
+            "refresh_interval": self.refresh_interval,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+            "refresh_count": self.refresh_count,
+        }
+
+
+cookie_manager = CookieManager(COOKIES_FILE, COOKIES_BROWSER, COOKIES_REFRESH_INTERVAL)
@@ -0,0 +1,108 @@
+"""How yt-dlp fetches the media of a download.
+
+DASH and HLS formats arrive as many small fragments; by default yt-dlp
+fetches them one after another. ``--concurrent-fragments`` fetches several
+at once, and an external downloader such as aria2c can split plain HTTP
+files over several connections. Both are capped by the per-host connection
+limit from the server config so one download cannot open an unbounded
+number of connections to a site.
+
+Interrupted downloads are resumed rather than restarted: yt-dlp keeps
+``.part`` files and a ``.ytdl`` file with the next fragment index, and
+continues from them when run again with the same output name. Partials
+that will not be resumed (their job was forgotten, or they sat untouched
+past an age limit) are deleted so download_tmp does not grow without bound.
+"""
+
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Collection, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Downloaders whose connection count we know how to cap
+ARIA2C = "aria2c"
+
+# yt-dlp errors after which retrying continues the partial download
+TRANSIENT_ERROR_MARKERS = (
+    "timed out",
+    "Connection reset",
+    "Connection aborted",
+    "Connection refused",
+    "Remote end closed connection",
+    "IncompleteRead",
+    "bytes read",
+    "Unable to download fragment",
+    "fragment not found",
+    "HTTP Error 500",
+    "HTTP Error 502",
+    "HTTP Error 503",
+    "HTTP Error 504",
+)
+
+
+def is_transient_error(stderr: str) -> bool:
+    """Whether a failed download is worth resuming as-is"""
+    return any(marker in stderr for marker in TRANSIENT_ERROR_MARKERS)
+
+
+def is_partial_file(path: Path) -> bool:
+    """yt-dlp's in-progress files (.part, .part-FragN, .ytdl state)"""
+    return ".part" in path.name or path.suffix == ".ytdl"
+
+
+def remove_partial_files(tmp_dir: Path, download_id: str) -> int:
+    """Delete the partial files of one download; returns how many were removed"""
+    removed = 0
+    for path in tmp_dir.glob(f"{download_id}*"):
+        if is_partial_file(path):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def sweep_partial_files(tmp_dir: Path, max_age: float, keep: Collection[str] = ()) -> int:
+    """Delete partial files not modified for ``max_age`` seconds.
+
+    Files whose name starts with a download_id in ``keep`` (downloads that
+    are queued or running) are left alone. Returns how many were removed.
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in tmp_dir.iterdir():
+        if not is_partial_file(path) or any(path.name.startswith(download_id) for download_id in keep):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def build_downloader_args(
+    concurrent_fragments: int,
+    host_connections: int,
+    external_downloader: Optional[str] = None
+) -> List[str]:
+    """yt-dlp options for parallel fragments and the optional external downloader"""
+    connections = max(1, host_connections)
+    args = ["--concurrent-fragments", str(max(1, min(concurrent_fragments, connections)))]
+    if not external_downloader:
+        return args
+
+    if shutil.which(external_downloader) is None:
+        logger.warning(f"External downloader {external_downloader} not found, using yt-dlp's own downloader")
+        return args
+
+    args += ["--downloader", external_downloader]
+    if external_downloader == ARIA2C:
+        args += [
+            "--downloader-args",
+            f"aria2c:--max-connection-per-server={connections} --split={connections} "
+            "--min-split-size=1M --console-log-level=warn --summary-interval=0",
+        ]
+    return args
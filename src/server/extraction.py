@@ -0,0 +1,206 @@
+"""Cached yt-dlp metadata extraction shared by all endpoints."""
+
+import asyncio
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL,
+    YTDLP_ENGINE, YTDLP_ENGINE_WORKERS
+)
+from cookie_manager import cookie_manager
+from extraction_cache import ExtractionCache, normalize_url
+from process_runner import run_process
+from ytdlp_engine import YtdlpEngine
+
+logger = logging.getLogger(__name__)
+
+# Options shared by every yt-dlp invocation; cookies come from cookie_manager
+YTDLP_COMMON_ARGS = [
+    "--extractor-args", "youtubetab:skip=authcheck",
+    "--no-playlist",  # Only download single video, not playlist
+    "--retries", "3",
+    "--fragment-retries", "3",
+    "--retry-sleep", "5",
+]
+
+extraction_cache = ExtractionCache(
+    max_entries=EXTRACTION_CACHE_SIZE,
+    ttl=EXTRACTION_CACHE_TTL,
+    disk_dir=EXTRACTION_CACHE_DIR
+)
+
+# Warm in-process engine, or None to run the yt-dlp CLI for every extraction
+ytdlp_engine: Optional[YtdlpEngine] = None
+
+# Running extractions by normalized URL, joined by concurrent requests
+_in_flight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+_coalesced_requests = 0
+
+
+class YtdlpError(Exception):
+    """yt-dlp exited with an error; carries its stderr for classification"""
+
+    def __init__(self, stderr: str):
+        super().__init__(stderr)
+        self.stderr = stderr
+
+
+def classify_ytdlp_error(stderr: str, fallback_message: str) -> HTTPException:
+    """Map yt-dlp error output to an HTTP error"""
+    # Check for specific YouTube errors
+    if "Too Many Requests" in stderr or "429" in stderr:
+        return HTTPException(
+            status_code=429,
+            detail="YouTube rate limit exceeded. Please wait a few minutes before trying again."
+        )
+    elif "Sign in to confirm your age" in stderr:
+        return HTTPException(
+            status_code=403,
+            detail="This video requires age verification. Please sign into YouTube in your browser first."
+        )
+    elif "Video unavailable" in stderr or "Private video" in stderr:
+        return HTTPException(
+            status_code=404,
+            detail="Video is unavailable or private."
+        )
+    elif "This live event will begin" in stderr:
+        return HTTPException(
+            status_code=400,
+            detail="This is a scheduled live stream that hasn't started yet."
+        )
+    return HTTPException(
+        status_code=400,
+        detail=f"{fallback_message}: {stderr}"
+    )
+
+
+def create_engine(mode: str) -> Optional[YtdlpEngine]:
+    """Create the extraction engine for a mode, or None for the CLI mode"""
+    if mode != "inprocess":
+        return None
+    try:
+        import yt_dlp  # noqa: F401
+    except ImportError:
+        logger.warning("yt-dlp Python package not importable, using the yt-dlp CLI instead")
+        return None
+    return YtdlpEngine(YTDLP_COMMON_ARGS, cookies_file=cookie_manager.cookies_file, workers=YTDLP_ENGINE_WORKERS)
+
+
+async def start_extraction_engine() -> None:
+    global ytdlp_engine
+    ytdlp_engine = create_engine(YTDLP_ENGINE)
+    if ytdlp_engine is not None:
+        await ytdlp_engine.start()
+
+
+def stop_extraction_engine() -> None:
+    global ytdlp_engine
+    if ytdlp_engine is not None:
+        ytdlp_engine.shutdown()
+        ytdlp_engine = None
+
+
+def extraction_stats() -> Dict[str, Any]:
+    """Cache counters plus single-flight statistics"""
+    return {
+        **extraction_cache.stats(),
+        "engine": "inprocess" if ytdlp_engine is not None else "subprocess",
+        "in_flight": len(_in_flight),
+        "coalesced": _coalesced_requests,
+    }
+
+
+async def extract_video_info(url: str, timeout: float = 60) -> Dict[str, Any]:
+    """Return the yt-dlp info dict for a video URL, extracting it only on a cache miss.
+
+    Concurrent calls for the same normalized URL share a single in-flight
+    extraction and all receive its result or its error. Raises ``YtdlpError``
+    when yt-dlp fails and ``subprocess.TimeoutExpired`` when it takes longer
+    than the timeout.
+    """
+    global _coalesced_requests
+
+    cached = extraction_cache.get(url)
+    if cached is not None:
+        logger.info(f"Extraction cache hit for {url}")
+        return cached
+
+    key = normalize_url(url)
+    task = _in_flight.get(key)
+    if task is None:
+        # The extraction runs as its own task so a disconnecting caller
+        # does not cancel it for the others waiting on the same URL
+        task = asyncio.ensure_future(_extract_uncached(url, timeout))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        _coalesced_requests += 1
+        logger.info(f"Joining in-flight extraction for {url}")
+    return await asyncio.shield(task)
+
+
+async def _extract_uncached(url: str, timeout: float) -> Dict[str, Any]:
+    if ytdlp_engine is not None:
+        try:
+            outcome = await ytdlp_engine.extract(url, timeout)
+        except BrokenProcessPool:
+            outcome = None  # Fall back to the CLI for this call
+        if outcome is not None:
+            if "error" in outcome:
+                cookie_manager.request_refresh(outcome["error"])
+                raise YtdlpError(outcome["error"])
+            extraction_cache.put(url, outcome["info"])
+            return outcome["info"]
+
+    with cookie_manager.cookie_args() as cookie_args:
+        cmd = [
+            "yt-dlp",
+            "--dump-json",
+            "--no-download",
+            *YTDLP_COMMON_ARGS,
+            *cookie_args,
+            url
+        ]
+        logger.info(f"Running command: {' '.join(cmd)}")
+        result = await run_process("ytdlp_analyze", cmd, timeout=timeout)
+
+    logger.info(f"yt-dlp return code: {result.returncode}")
+    if result.returncode != 0:
+        cookie_manager.request_refresh(result.stderr)
+        raise YtdlpError(result.stderr)
+
+    for line in result.stdout.strip().split('\n'):
+        if line.strip():
+            try:
+                info = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            extraction_cache.put(url, info)
+            return info
+
+    raise YtdlpError("No video metadata found")
+
+
+async def write_info_json(url: str, path: Path) -> Optional[Path]:
+    """Write the (cached) info dict of a URL for ``yt-dlp --load-info-json``.
+
+    Returns None when the extraction fails, in which case the caller lets
+    yt-dlp extract the URL itself.
+    """
+    try:
+        info = await extract_video_info(url)
+    except (YtdlpError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"No reusable info JSON for {url}: {str(e)}")
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+    return path
@@ -0,0 +1,195 @@
+"""TTL + LRU cache of yt-dlp ``--dump-json`` results.
+
+Entries are stored under a canonical key (``extractor_key:video_id``) and
+reached through aliases built from the normalized request and webpage URLs,
+so different spellings of the same video URL share one extraction. An
+optional on-disk tier keeps results across restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change which video a URL points to
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "spm_id_from", "vd_source", "share_source", "from"}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a video URL for use as a cache key"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    if scheme == "http":
+        scheme = "https"
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def info_cache_key(info: Dict[str, Any]) -> Optional[str]:
+    """Canonical key of an extracted video: extractor plus video id"""
+    extractor = info.get("extractor_key") or info.get("extractor")
+    video_id = info.get("id")
+    if extractor and video_id:
+        return f"{extractor}:{video_id}".lower()
+    return None
+
+
+class ExtractionCache:
+    """In-memory LRU with per-entry TTL and an optional on-disk tier"""
+
+    def __init__(self, max_entries: int = 128, ttl: float = 1800, disk_dir: Optional[Path] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        # canonical key -> (stored_at, info)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # normalized URL or canonical key -> canonical key
+        self._aliases: Dict[str, str] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached extraction for a URL, or None"""
+        alias = normalize_url(url)
+        key = self._aliases.get(alias, alias)
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, info = entry
+            if time.time() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return info
+            self._drop(key)
+        disk_entry = self._read_disk(alias)
+        if disk_entry is not None:
+            stored_at, info = disk_entry
+            self.disk_hits += 1
+            self._store(alias, info, stored_at=stored_at)
+            return info
+        self.misses += 1
+        return None
+
+    def put(self, url: str, info: Dict[str, Any]) -> None:
+        """Cache an extraction under its canonical key and URL aliases"""
+        alias = normalize_url(url)
+        self._store(alias, info, stored_at=time.time())
+        self._write_disk(alias, info)
+
+    def invalidate(self, url: Optional[str] = None) -> int:
+        """Drop one URL's entry, or everything when no URL is given"""
+        if url is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._aliases.clear()
+            if self.disk_dir:
+                for path in self.disk_dir.glob("*.json"):
+                    path.unlink(missing_ok=True)
+            return removed
+        alias = normalize_url(url)
+        key = self._aliases.get(alias, alias)
+        entry = self._entries.get(key)
+        removed = 1 if entry is not None else 0
+        # Every URL the entry was reachable by, so no disk copy outlives it
+        names = {alias} | {name for name, target in self._aliases.items() if target == key}
+        self._drop(key)
+        if self.disk_dir:
+            if entry is None:
+                entry = self._read_disk(alias)
+            if entry is not None:
+                names |= self._disk_aliases(alias, entry[1])
+            for name in names:
+                self._disk_path(name).unlink(missing_ok=True)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk_tier": str(self.disk_dir) if self.disk_dir else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+        }
+
+    def _store(self, alias: str, info: Dict[str, Any], stored_at: float) -> None:
+        key = info_cache_key(info) or alias
+        self._entries[key] = (stored_at, info)
+        self._entries.move_to_end(key)
+        aliases = {alias, key}
+        if info.get("webpage_url"):
+            aliases.add(normalize_url(info["webpage_url"]))
+        for name in aliases:
+            self._aliases[name] = key
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        for name in [name for name, target in self._aliases.items() if target == key]:
+            del self._aliases[name]
+
+    @staticmethod
+    def _disk_aliases(alias: str, info: Dict[str, Any]) -> Set[str]:
+        """URLs an extraction is written to disk under"""
+        aliases = {alias}
+        if info.get("webpage_url"):
+            aliases.add(normalize_url(info["webpage_url"]))
+        return aliases
+
+    def _disk_path(self, alias: str) -> Path:
+        return self.disk_dir / f"{hashlib.sha1(alias.encode('utf-8')).hexdigest()}.json"
+
+    def _read_disk(self, alias: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(alias)
+        try:
+            stored_at = path.stat().st_mtime
+            if time.time() - stored_at >= self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return stored_at, info
+
+    def _write_disk(self, alias: str, info: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        try:
+            data = json.dumps(info, ensure_ascii=False)
+            for name in self._disk_aliases(alias, info):
+                path = self._disk_path(name)
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry to disk: {str(e)}")
@@ -0,0 +1,175 @@
+"""Faststart MP4 layout for library videos.
+
+An MP4 written with its ``moov`` atom (the index) after the media data cannot
+start playing until the browser has fetched the end of the file. Merges now
+pass ``-movflags +faststart`` so ffmpeg moves the index to the front as part
+of the merge; yt-dlp's own ffmpeg post-processors already do the same.
+
+Videos saved before that can be remuxed into a new file with::
+
+    cd src/server
+    python faststart.py [--workers N] [--dry-run]
+
+Each file is remuxed (stream copy, no re-encode) into a new file name and
+the library entry is pointed at it before the old file is removed. Library
+file names are served as immutable, so the rewritten bytes must never appear
+under a name a browser or CDN may already have cached.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import struct
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import LIBRARY_BUSY_TIMEOUT, TOOL_CONCURRENCY
+from process_runner import run_process
+
+logger = logging.getLogger(__name__)
+
+FASTSTART_ARGS = ["-movflags", "+faststart"]
+
+# Containers using the ISO base media file format
+MP4_EXTENSIONS = (".mp4", ".m4v", ".mov")
+
+REMUX_TIMEOUT = 600
+
+
+def moov_after_mdat(path: Path) -> Optional[bool]:
+    """Whether an MP4's index follows its media data, from the top-level boxes.
+
+    Returns None when the file is not a readable MP4.
+    """
+    seen_mdat = False
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            offset = 0
+            while offset + 8 <= size:
+                f.seek(offset)
+                box_size, box_type = struct.unpack(">I4s", f.read(8))
+                if box_size == 1:
+                    # 64-bit size follows the type
+                    box_size = struct.unpack(">Q", f.read(8))[0]
+                elif box_size == 0:
+                    # Box extends to the end of the file
+                    box_size = size - offset
+                if box_size < 8:
+                    return None
+                if box_type == b"moov":
+                    return seen_mdat
+                if box_type == b"mdat":
+                    seen_mdat = True
+                offset += box_size
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def faststart_path(path: Path) -> Path:
+    """New name for the remuxed copy of a library file (still starting with its UUID)"""
+    return path.with_name(f"{path.stem}-faststart{path.suffix}")
+
+
+async def remux_faststart(path: Path) -> Optional[Path]:
+    """Write a copy of an MP4 with its index at the front; returns its path, or None on failure"""
+    output = faststart_path(path)
+    tmp_path = path.with_name(f".{path.stem}.faststart{path.suffix}")
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", str(path),
+        "-map", "0", "-c", "copy",
+        *FASTSTART_ARGS,
+        str(tmp_path)
+    ]
+    try:
+        result = await run_process("ffmpeg_faststart", cmd, timeout=REMUX_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Faststart remux timed out: {path.name}")
+        tmp_path.unlink(missing_ok=True)
+        return None
+    if result.returncode != 0:
+        logger.warning(f"Faststart remux failed for {path.name}: {result.stderr.strip()}")
+        tmp_path.unlink(missing_ok=True)
+        return None
+    os.replace(tmp_path, output)
+    return output
+
+
+async def backfill(library_store, dry_run: bool = False) -> Dict[str, Any]:
+    """Remux every library video whose index sits after the media data"""
+    entries, _ = await asyncio.to_thread(library_store.query)
+    stats = {"checked": 0, "already_faststart": 0, "rewritten": [], "failed": [], "skipped": 0}
+
+    async def process(entry: Dict[str, Any]) -> None:
+        file_path = Path(entry.get("file_path") or "")
+        if not file_path.is_absolute():
+            file_path = Path.cwd() / file_path
+        if file_path.suffix.lower() not in MP4_EXTENSIONS or not file_path.is_file():
+            stats["skipped"] += 1
+            return
+        stats["checked"] += 1
+        needs_remux = moov_after_mdat(file_path)
+        if needs_remux is None:
+            stats["failed"].append(entry["id"])
+            return
+        if not needs_remux:
+            stats["already_faststart"] += 1
+            return
+        if dry_run:
+            stats["rewritten"].append(entry["id"])
+            return
+        output = await remux_faststart(file_path)
+        if output is None:
+            stats["failed"].append(entry["id"])
+            return
+        # Only the file fields change; a concurrent edit or delete of the entry wins
+        fields = {
+            "file_path": str(Path(entry["file_path"]).with_name(output.name)),
+            "file_size": output.stat().st_size,
+        }
+        if entry.get("library_file_name"):
+            fields["library_file_name"] = output.name
+            fields["video_direct_url"] = f"/video_library/{output.name}"
+        if await library_store.update_fields(entry["id"], **fields) is None:
+            output.unlink(missing_ok=True)
+            stats["failed"].append(entry["id"])
+            return
+        # A server streaming the old file keeps its open handle
+        file_path.unlink(missing_ok=True)
+        stats["rewritten"].append(entry["id"])
+        logger.info(f"Rewrote {file_path.name} with faststart as {output.name}")
+
+    # Parallelism is bounded by the ffmpeg_faststart tool limit
+    await asyncio.gather(*(process(entry) for entry in entries))
+    return stats
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from library_store import LibraryStore
+
+    store = LibraryStore(args.library / "library.db", busy_timeout=LIBRARY_BUSY_TIMEOUT)
+    try:
+        stats = await backfill(store, dry_run=args.dry_run)
+    finally:
+        store.close()
+    action = "would rewrite" if args.dry_run else "rewrote"
+    print(f"Checked {stats['checked']} videos: {stats['already_faststart']} already faststart, "
+          f"{action} {len(stats['rewritten'])}, {len(stats['failed'])} failed, {stats['skipped']} skipped")
+    for video_id in stats["failed"]:
+        print(f"  failed: {video_id}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite library videos with the MP4 index at the front")
+    parser.add_argument("--library", type=Path, default=Path("video_library"), help="Video library directory")
+    parser.add_argument("--workers", type=int, default=TOOL_CONCURRENCY["ffmpeg_faststart"],
+                        help="Concurrent ffmpeg remuxes")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which videos need rewriting")
+    args = parser.parse_args()
+    TOOL_CONCURRENCY["ffmpeg_faststart"] = args.workers
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(_main(args))
@@ -0,0 +1,248 @@
+"""HLS packaging of library videos for adaptive streaming.
+
+When enabled, every saved video is queued for packaging: ffmpeg segments it
+into fragmented-MP4 HLS under ``video_library/hls/<video_id>/``. The source
+rendition is a stream copy whenever its codecs can be carried in HLS, so it
+costs little more than reading the file; the renditions of the ladder below
+it are transcoded to H.264/AAC for viewers on slow links. A master playlist
+with measured bandwidths ties them together and the library entry gets an
+``hls_url`` the player prefers over the single MP4.
+
+Packaging runs on a small pool of worker tasks, each ffmpeg run taking a slot
+of the ``ffmpeg_hls`` tool. Output is written to a temporary directory and
+renamed into place once complete, so a playlist never references a segment
+that does not exist yet.
+"""
+
+import asyncio
+import logging
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from media_probe import MP4_AUDIO_CODECS, MP4_VIDEO_CODECS, MediaInfo, probe_media
+from process_runner import run_process
+
+logger = logging.getLogger(__name__)
+
+MASTER_PLAYLIST = "master.m3u8"
+
+# Target video bitrate (kbit/s) per rendition height
+LADDER_BITRATES = {2160: 14000, 1440: 8000, 1080: 5000, 720: 2800, 480: 1400, 360: 800, 240: 400}
+AUDIO_BITRATE = "128k"
+
+PACKAGE_TIMEOUT = 3600
+
+
+def _playlist_stats(playlist: Path) -> Dict[str, int]:
+    """Peak and average bitrate of a media playlist from its segment sizes"""
+    durations: List[float] = []
+    segments: List[Path] = []
+    lines = playlist.read_text().splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith("#EXTINF:"):
+            durations.append(float(line[len("#EXTINF:"):].split(",")[0]))
+            segments.append(playlist.with_name(lines[index + 1].strip()))
+    sizes = [segment.stat().st_size for segment in segments]
+    total_duration = sum(durations) or 1.0
+    peak = max((size * 8 / max(duration, 0.1) for size, duration in zip(sizes, durations)), default=0)
+    return {"peak": int(peak), "average": int(sum(sizes) * 8 / total_duration)}
+
+
+class HlsPackager:
+    """Queue of library videos to package, drained by worker tasks"""
+
+    def __init__(
+        self,
+        library_dir: Path,
+        library_store,
+        ladder: Sequence[int] = (720, 360),
+        segment_seconds: int = 6,
+        workers: int = 1
+    ):
+        self.hls_dir = library_dir / "hls"
+        self.library_store = library_store
+        self.ladder = sorted({height for height in ladder if height > 0}, reverse=True)
+        self.segment_seconds = max(1, segment_seconds)
+        self.workers = max(1, workers)
+        self.status: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks; must be called from the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def output_dir(self, video_id: str) -> Path:
+        return self.hls_dir / video_id
+
+    def submit(self, video_id: str) -> bool:
+        """Queue a video for packaging; returns False if it is already queued"""
+        if self._queue is None:
+            raise RuntimeError("HLS packager has not been started")
+        if self.status.get(video_id) in ("queued", "packaging"):
+            return False
+        self.status[video_id] = "queued"
+        self._queue.put_nowait(video_id)
+        return True
+
+    def remove(self, video_id: str) -> None:
+        """Delete the packaged output of a video"""
+        self.status.pop(video_id, None)
+        shutil.rmtree(self.output_dir(video_id), ignore_errors=True)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            video_id = await self._queue.get()
+            try:
+                self.status[video_id] = "packaging"
+                ok = await self._package(video_id)
+                self.status[video_id] = "completed" if ok else "failed"
+            except Exception as e:
+                logger.error(f"HLS packaging of {video_id} crashed: {str(e)}")
+                self.status[video_id] = "failed"
+            finally:
+                self._queue.task_done()
+
+    async def _package(self, video_id: str) -> bool:
+        entry = await asyncio.to_thread(self.library_store.get, video_id)
+        if not entry:
+            return False
+        source = Path(entry["file_path"])
+        if not source.is_absolute():
+            source = Path.cwd() / source
+        if not source.is_file():
+            logger.warning(f"HLS packaging skipped, file missing: {source}")
+            return False
+
+        info = await probe_media(source, tool="ffmpeg_hls")
+        if info.video_codec is None:
+            logger.warning(f"HLS packaging skipped, no video stream: {source.name}")
+            return False
+
+        tmp_dir = self.hls_dir / f".{video_id}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        renditions = [("source", info.height, None)]
+        renditions += [(f"{height}p", height, height) for height in self.ladder if height < info.height]
+        results = await asyncio.gather(*(
+            self._encode_rendition(source, info, tmp_dir, name, scale_height)
+            for name, _, scale_height in renditions
+        ))
+        variants = []
+        for (name, height, scale_height), ok in zip(renditions, results):
+            if not ok:
+                continue
+            width = info.width if scale_height is None else _scaled_width(info, scale_height)
+            variants.append((name, width, height, _playlist_stats(tmp_dir / f"{name}.m3u8")))
+        if not variants:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        master = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+        for name, width, height, stats in sorted(variants, key=lambda variant: variant[3]["peak"], reverse=True):
+            attributes = f"BANDWIDTH={max(stats['peak'], 1)},AVERAGE-BANDWIDTH={max(stats['average'], 1)}"
+            if width and height:
+                attributes += f",RESOLUTION={width}x{height}"
+            master += [f"#EXT-X-STREAM-INF:{attributes}", f"{name}.m3u8"]
+        (tmp_dir / MASTER_PLAYLIST).write_text("\n".join(master) + "\n")
+
+        output_dir = self.output_dir(video_id)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        tmp_dir.rename(output_dir)
+
+        updated = await self.library_store.update_fields(
+            video_id,
+            hls_url=f"/videopage_hls/{video_id}/{MASTER_PLAYLIST}",
+            hls_renditions=[name for name, _, _, _ in variants]
+        )
+        if updated is None:
+            # The video was deleted while it was being packaged
+            shutil.rmtree(output_dir, ignore_errors=True)
+            return False
+        logger.info(f"Packaged {video_id} as HLS: {', '.join(name for name, _, _, _ in variants)}")
+        return True
+
+    async def _encode_rendition(
+        self,
+        source: Path,
+        info: MediaInfo,
+        tmp_dir: Path,
+        name: str,
+        scale_height: Optional[int]
+    ) -> bool:
+        """Segment one rendition; the source one is stream-copied when possible"""
+        if scale_height is None and info.video_codec in MP4_VIDEO_CODECS:
+            video_args = ["-c:v", "copy"]
+        else:
+            bitrate = LADDER_BITRATES.get(scale_height or info.height)
+            if bitrate is None:
+                bitrate = min(LADDER_BITRATES.items(), key=lambda item: abs(item[0] - (scale_height or info.height)))[1]
+            video_args = [
+                "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "high",
+                "-b:v", f"{bitrate}k", "-maxrate", f"{bitrate * 3 // 2}k", "-bufsize", f"{bitrate * 2}k",
+                # Keyframes on segment boundaries so every segment starts cleanly
+                "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})",
+            ]
+            if scale_height is not None:
+                video_args += ["-vf", f"scale=-2:{scale_height}"]
+        if info.audio_codec is None:
+            audio_args = []
+        elif scale_height is None and info.audio_codec in MP4_AUDIO_CODECS:
+            audio_args = ["-c:a", "copy"]
+        else:
+            audio_args = ["-c:a", "aac", "-b:a", AUDIO_BITRATE]
+
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", str(source),
+            "-map", "0:v:0", *(["-map", "0:a:0"] if info.audio_codec else []),
+            *video_args, *audio_args,
+            "-f", "hls",
+            "-hls_time", str(self.segment_seconds),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", f"{name}_init.mp4",
+            "-hls_segment_filename", str(tmp_dir / f"{name}_%05d.m4s"),
+            str(tmp_dir / f"{name}.m3u8")
+        ]
+        try:
+            result = await run_process("ffmpeg_hls", cmd, timeout=PACKAGE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"HLS rendition {name} of {source.name} timed out")
+            return False
+        if result.returncode != 0:
+            logger.warning(f"HLS rendition {name} of {source.name} failed: {result.stderr.strip()}")
+            return False
+        return True
+
+
+def _scaled_width(info: MediaInfo, height: int) -> int:
+    """Width ffmpeg's scale=-2:height produces (rounded to an even number)"""
+    if not info.height:
+        return 0
+    width = round(info.width * height / info.height)
+    return width + (width % 2)
+
+
+def parse_ladder(value: str) -> List[int]:
+    """Rendition heights from a comma-separated setting, e.g. 720,360"""
+    heights = []
+    for part in value.split(","):
+        part = part.strip().lower().rstrip("p")
+        if part.isdigit():
+            heights.append(int(part))
+    return heights
+
@@ -0,0 +1,34 @@
+"""Per-host concurrency limits.
+
+Each host gets its own semaphore, so a burst of work against one site
+waits for a free slot without holding up requests to other sites.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlsplit
+
+
+def url_host(url: str) -> str:
+    """Host part of a URL used as the limit key ("www." is ignored)"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class HostLimiter:
+    """At most ``limit`` concurrent holders per host"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def hold(self, url: str) -> AsyncIterator[None]:
+        host = url_host(url)
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit)
+            self._semaphores[host] = semaphore
+        async with semaphore:
+            yield
@@ -0,0 +1,376 @@
+"""Background download jobs.
+
+Downloads are queued as jobs and drained by a fixed pool of worker tasks, so
+HTTP clients get a job id back immediately and poll ``GET /jobs/{id}``
+instead of holding a connection open for the whole download.
+
+Unfinished and failed jobs are persisted to a small JSON state file. Each
+job owns a ``download_id`` naming its files in download_tmp, so yt-dlp can
+continue the partial files it left behind: jobs interrupted by a restart
+are re-queued under the same id on startup, and submitting a download that
+failed before reuses that job's ``download_id``. When a failed job is
+pruned from the history nothing will resume it any more, and the optional
+``on_forget`` callback is given the job so its partial files can go.
+
+With a ``host_limit``, a worker takes the oldest queued job whose host has
+fewer than that many jobs running, so jobs waiting on a busy host never
+occupy a worker while downloads for other hosts are queued behind them.
+Background jobs (e.g. a whole playlist) are only taken when no other job
+is ready, so a single download is never stuck behind a channel archive.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from host_limits import url_host
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+# Pending snapshots per event subscriber; slow subscribers skip to the latest
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+class DownloadJob:
+    """State of a single queued download"""
+
+    def __init__(self, url: str, format_id: str, download_id: Optional[str] = None, background: bool = False):
+        self.id = str(uuid.uuid4())
+        self.url = url
+        self.format_id = format_id
+        self.background = background
+        self.download_id = download_id or str(uuid.uuid4())
+        self.resumed = download_id is not None
+        self.state = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.bytes_downloaded = 0
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self._done = asyncio.Event()
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    async def wait(self) -> None:
+        """Wait until the job has completed or failed"""
+        await self._done.wait()
+
+    def update_progress(self, progress: Dict[str, Any]) -> None:
+        """Record a progress snapshot and push it to event subscribers"""
+        self.progress = progress
+        self.bytes_downloaded = progress.get("bytes_downloaded", self.bytes_downloaded)
+        self.publish()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Return a queue receiving a job snapshot on every state or progress change"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self) -> None:
+        snapshot = self.to_dict()
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        queue_end = self.started_at or (self.finished_at or now)
+        data = {
+            "job_id": self.id,
+            "url": self.url,
+            "format_id": self.format_id,
+            "download_id": self.download_id,
+            "resumed": self.resumed,
+            "background": self.background,
+            "state": self.state,
+            "bytes_downloaded": self.bytes_downloaded,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": round(queue_end - self.created_at, 3),
+            "running_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            "error": self.error,
+            "error_status": self.error_status,
+        }
+        if self.result:
+            # Fields the save endpoints consume
+            data["filename"] = self.result.get("filename")
+            data["file_size"] = self.result.get("file_size")
+            data["result"] = self.result
+        return data
+
+    def to_state(self) -> Dict[str, Any]:
+        """Fields persisted across restarts"""
+        return {
+            "job_id": self.id,
+            "url": self.url,
+            "format_id": self.format_id,
+            "download_id": self.download_id,
+            "background": self.background,
+            "state": self.state,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "error_status": self.error_status,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "DownloadJob":
+        job = cls(
+            state["url"], state["format_id"],
+            download_id=state["download_id"], background=state.get("background", False)
+        )
+        job.id = state["job_id"]
+        job.created_at = state.get("created_at") or job.created_at
+        if state.get("state") == JOB_FAILED:
+            job.state = JOB_FAILED
+            job.finished_at = state.get("finished_at")
+            job.error = state.get("error")
+            job.error_status = state.get("error_status")
+            job._done.set()
+        return job
+
+
+JobHandler = Callable[[DownloadJob], Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    """Queue of download jobs drained by a pool of worker tasks"""
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        workers: int = 4,
+        history_limit: int = 500,
+        state_path: Optional[Path] = None,
+        host_limit: Optional[int] = None,
+        on_forget: Optional[Callable[[DownloadJob], None]] = None
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.history_limit = history_limit
+        self.state_path = state_path
+        self.host_limit = max(1, host_limit) if host_limit is not None else None
+        self.on_forget = on_forget
+        self.jobs: "OrderedDict[str, DownloadJob]" = OrderedDict()
+        # Queued jobs in submission order, and running jobs per host
+        self._pending: List[DownloadJob] = []
+        self._running_per_host: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks; must be called from the running event loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        resumed = self._load_state()
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        logger.info(f"Started {self.workers} download workers")
+        if resumed:
+            logger.info(f"Re-queued {resumed} interrupted download job(s)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, url: str, format_id: str) -> DownloadJob:
+        """Queue a new download and return its job immediately"""
+        return self.submit_many([url], format_id)[0]
+
+    def submit_many(self, urls: List[str], format_id: str, background: bool = False) -> List[DownloadJob]:
+        """Queue one download per URL, persisting the state once for all of them.
+
+        Background jobs yield to every other queued job that can run.
+        """
+        if self._wakeup is None:
+            raise RuntimeError("Job manager has not been started")
+        jobs = []
+        for url in urls:
+            job = DownloadJob(
+                url, format_id,
+                download_id=self._resumable_download_id(url, format_id), background=background
+            )
+            self.jobs[job.id] = job
+            self._enqueue(job)
+            jobs.append(job)
+            resuming = f", resuming download {job.download_id}" if job.resumed else ""
+            logger.info(f"Queued download job {job.id} for {url} (format {format_id}{resuming})")
+        self._prune()
+        self._save_state()
+        return jobs
+
+    def _resumable_download_id(self, url: str, format_id: str) -> Optional[str]:
+        """download_id of the latest failed job for the same download, if any"""
+        for job in reversed(self.jobs.values()):
+            if job.url == url and job.format_id == format_id:
+                return job.download_id if job.state == JOB_FAILED else None
+        return None
+
+    def _load_state(self) -> int:
+        """Restore persisted jobs; returns how many were re-queued"""
+        if self.state_path is None or not self.state_path.exists():
+            return 0
+        try:
+            states = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable job state {self.state_path}: {e}")
+            return 0
+        resumed = 0
+        for state in states:
+            job = DownloadJob.from_state(state)
+            self.jobs[job.id] = job
+            if not job.finished:
+                # Interrupted while queued or running: continue under the same download_id
+                self._enqueue(job)
+                resumed += 1
+        return resumed
+
+    def _save_state(self) -> None:
+        """Persist unfinished and failed jobs (completed ones need no resuming)"""
+        if self.state_path is None:
+            return
+        states = [job.to_state() for job in self.jobs.values() if job.state != JOB_COMPLETED]
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(states), encoding="utf-8")
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not persist job state: {e}")
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        return self.jobs.get(job_id)
+
+    def list(self, state: Optional[str] = None) -> List[DownloadJob]:
+        return [job for job in self.jobs.values() if state is None or job.state == state]
+
+    def active_download_ids(self) -> Set[str]:
+        """download_ids of queued and running jobs"""
+        return {job.download_id for job in self.jobs.values() if not job.finished}
+
+    def stats(self) -> Dict[str, int]:
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_COMPLETED: 0, JOB_FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.state] += 1
+        counts["workers"] = self.workers
+        return counts
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs once the history limit is exceeded"""
+        excess = len(self.jobs) - self.history_limit
+        if excess <= 0:
+            return
+        pruned = [job for job in self.jobs.values() if job.finished][:excess]
+        for job in pruned:
+            del self.jobs[job.id]
+        if self.on_forget is None:
+            return
+        # A retry of a failed job shares its download_id and keeps the files
+        kept_ids = {job.download_id for job in self.jobs.values()}
+        for job in pruned:
+            if job.state == JOB_FAILED and job.download_id not in kept_ids:
+                try:
+                    self.on_forget(job)
+                except Exception as e:
+                    logger.warning(f"Cleanup of forgotten job {job.id} failed: {e}")
+
+    def _enqueue(self, job: DownloadJob) -> None:
+        self._pending.append(job)
+        self._wakeup.set()
+
+    def _take(self) -> Optional[DownloadJob]:
+        """Remove and return the oldest queued job whose host has a free slot,
+        preferring foreground jobs"""
+        for background in (False, True):
+            for position, job in enumerate(self._pending):
+                if job.background != background:
+                    continue
+                host = url_host(job.url)
+                if self.host_limit is None or self._running_per_host.get(host, 0) < self.host_limit:
+                    del self._pending[position]
+                    self._running_per_host[host] = self._running_per_host.get(host, 0) + 1
+                    return job
+        return None
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = self._take()
+            if job is None:
+                # Woken by a new job or by a running job freeing its host slot
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            host = url_host(job.url)
+            try:
+                await self._run(job)
+            finally:
+                self._running_per_host[host] -= 1
+                if not self._running_per_host[host]:
+                    del self._running_per_host[host]
+                self._wakeup.set()
+
+    async def _run(self, job: DownloadJob) -> None:
+        job.state = JOB_RUNNING
+        job.started_at = time.time()
+        job.publish()
+        self._save_state()
+        logger.info(f"Download job {job.id} started")
+        try:
+            job.result = await self.handler(job)
+            job.bytes_downloaded = job.result.get("file_size", job.bytes_downloaded)
+            job.state = JOB_COMPLETED
+        except HTTPException as e:
+            job.state = JOB_FAILED
+            job.error = str(e.detail)
+            job.error_status = e.status_code
+        except Exception as e:
+            logger.error(f"Download job {job.id} crashed: {str(e)}")
+            job.state = JOB_FAILED
+            job.error = f"Internal server error: {str(e)}"
+            job.error_status = 500
+        except asyncio.CancelledError:
+            # Stopped mid-download (shutdown): persist it as queued so it
+            # resumes on the next start, and release anyone waiting on it
+            job.state = JOB_QUEUED
+            job.error = "Download interrupted by server shutdown"
+            job.error_status = 503
+            raise
+        finally:
+            if job.finished:
+                job.finished_at = time.time()
+            job._done.set()
+            job.publish()
+            self._save_state()
+            logger.info(f"Download job {job.id} {job.state} after {time.time() - job.started_at:.1f}s")
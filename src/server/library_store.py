@@ -0,0 +1,781 @@
+"""SQLite-backed storage for the saved video library.
+
+Each entry is kept whole as JSON in the ``videos`` table, next to indexed
+columns for everything the library page filters and sorts on. Tags live in a
+separate join table so tag filters and the tag list are index lookups. An
+existing ``data.json`` library is imported the first time the store is opened.
+
+Entries looked up by id are kept parsed in an in-memory index, so repeated
+requests for the same video (HEAD, range re-requests while seeking) are a
+dict lookup. Every write transaction bumps a ``generation`` counter in
+``meta``; the index follows this store's own writes and is dropped when the
+counter shows another process changed the database.
+
+The ``search`` filter runs against an FTS5 index over title, description and
+tags, kept in step with every save and delete. CJK characters are indexed as
+single-character tokens so searching inside Chinese or Japanese titles still
+works. Where SQLite lacks FTS5 the store falls back to substring matching.
+
+Per-value counts of tags, categories and uploaders are kept in
+``facet_counts`` and adjusted in the same transaction as every save and
+delete, so the library page's filter options never need a full scan.
+
+The database runs in WAL mode: a save appends its pages to the write-ahead
+log and fsyncs it on commit (``synchronous=FULL``) instead of rewriting the
+library, so a crash loses at most an uncommitted save. The log is folded back
+into the main file when it passes ``wal_autocheckpoint`` pages, and
+periodically by ``start()``'s background checkpoint task.
+
+Saves and deletes are handed to a single writer thread per process. Writes
+that queue up while a commit is being fsynced are committed together in the
+next transaction (each in its own savepoint, so one failing write does not
+abort the others). Across processes, e.g. uvicorn ``--workers``, writers
+serialize on SQLite's database lock: transactions start with ``BEGIN
+IMMEDIATE`` and wait up to ``busy_timeout`` seconds for the lock.
+
+Reads never wait for that lock: each reading thread has its own connection,
+and WAL lets it read the last committed state while a write is in progress.
+The read methods are blocking; async callers run them in a worker thread.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Most queued writes folded into one group commit
+GROUP_COMMIT_MAX = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    saved_at TEXT NOT NULL DEFAULT '',
+    title_sort TEXT NOT NULL DEFAULT '',
+    uploader TEXT,
+    category TEXT,
+    view_count INTEGER NOT NULL DEFAULT 0,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS video_tags (
+    video_id TEXT NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (video_id, tag)
+);
+-- Sort indexes end in id so keyset pages are read straight off the index
+DROP INDEX IF EXISTS idx_videos_saved_at;
+DROP INDEX IF EXISTS idx_videos_title_sort;
+DROP INDEX IF EXISTS idx_videos_view_count;
+DROP INDEX IF EXISTS idx_videos_like_count;
+DROP INDEX IF EXISTS idx_videos_duration;
+CREATE INDEX IF NOT EXISTS idx_videos_saved_at_id ON videos(saved_at, id);
+CREATE INDEX IF NOT EXISTS idx_videos_title_sort_id ON videos(title_sort, id);
+CREATE INDEX IF NOT EXISTS idx_videos_view_count_id ON videos(view_count, id);
+CREATE INDEX IF NOT EXISTS idx_videos_like_count_id ON videos(like_count, id);
+CREATE INDEX IF NOT EXISTS idx_videos_duration_id ON videos(duration, id);
+CREATE INDEX IF NOT EXISTS idx_videos_uploader ON videos(uploader);
+CREATE INDEX IF NOT EXISTS idx_videos_category ON videos(category);
+CREATE INDEX IF NOT EXISTS idx_video_tags_tag ON video_tags(tag);
+CREATE TABLE IF NOT EXISTS facet_counts (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, value)
+);
+"""
+
+# facet name in facet_counts -> key in available_filters
+FACETS = {"tag": "tags", "category": "categories", "uploader": "uploaders"}
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    id UNINDEXED,
+    title,
+    description,
+    tags,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25 column weights for id, title, description, tags
+FTS_RANK = "bm25(videos_fts, 0.0, 10.0, 1.0, 5.0)"
+
+# Han, kana and hangul: written without spaces, so index them one character per token
+CJK_PATTERN = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])")
+
+# sort_by value accepted by /videopage_list -> indexed column
+# ("relevance" additionally orders search results by bm25 rank)
+SORT_COLUMNS = {
+    "saved_at": "saved_at",
+    "title": "title_sort",
+    "view_count": "view_count",
+    "like_count": "like_count",
+    "duration": "duration",
+}
+
+
+def _py_lower(value: Optional[str]) -> str:
+    # SQLite's lower() only folds ASCII; match str.lower() used elsewhere
+    return value.lower() if value else ""
+
+
+def _number(value: Any) -> float:
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _entry_row(entry: Dict[str, Any]) -> Tuple:
+    """Indexed column values for a library entry"""
+    return (
+        entry["id"],
+        entry.get("saved_at") or "",
+        _py_lower(entry.get("video_page_name")),
+        entry.get("uploader") or None,
+        entry.get("category") or None,
+        int(_number(entry.get("view_count"))),
+        int(_number(entry.get("like_count"))),
+        float(_number(entry.get("duration"))),
+        json.dumps(entry, ensure_ascii=False),
+    )
+
+
+def _entry_tags(entry: Dict[str, Any]) -> List[str]:
+    tags = entry.get("selected_tags") or []
+    return sorted({tag for tag in tags if isinstance(tag, str) and tag})
+
+
+def _fts_text(value: Optional[str]) -> str:
+    return CJK_PATTERN.sub(r" \1 ", value) if value else ""
+
+
+def _fts_row(entry: Dict[str, Any]) -> Tuple:
+    return (
+        entry["id"],
+        _fts_text(entry.get("video_page_name")),
+        _fts_text(entry.get("description")),
+        _fts_text(" ".join(_entry_tags(entry))),
+    )
+
+
+class InvalidCursor(ValueError):
+    """A list cursor that is malformed or was issued for another sort order"""
+
+
+def encode_cursor(sort_by: str, order: str, sort_value: Any, video_id: str) -> str:
+    """Opaque page cursor: the sort key and id of the last entry on a page"""
+    raw = json.dumps([sort_by, order, sort_value, video_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, str]:
+    """(sort value, id) from a cursor issued by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, cursor_order, sort_value, video_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if (cursor_sort_by, cursor_order) != (sort_by, order) or not isinstance(video_id, str):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return sort_value, video_id
+
+
+def project(entry: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested fields of an entry (plus its id)"""
+    if not fields:
+        return entry
+    return {key: entry[key] for key in ["id", *fields] if key in entry}
+
+
+def fts_query(search: str) -> Optional[str]:
+    """Turn a user search string into an FTS5 MATCH expression.
+
+    Every word must match; the last token of each word matches as a prefix,
+    and a run of CJK characters matches as a phrase. Returns None when the
+    search has nothing indexable in it.
+    """
+    terms = []
+    for word in search.split():
+        tokens = [token for token in re.split(r"\W+", _fts_text(word)) if token]
+        if not tokens:
+            continue
+        phrase = " ".join(token.replace('"', '""') for token in tokens)
+        terms.append(f'"{phrase}"' if CJK_PATTERN.search(tokens[-1]) else f'"{phrase}"*')
+    return " AND ".join(terms) or None
+
+
+class LibraryStore:
+    """Video library entries in an SQLite database"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        legacy_json_path: Optional[Path] = None,
+        wal_autocheckpoint: int = 1000,
+        checkpoint_interval: float = 300,
+        busy_timeout: float = 30,
+    ):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self.wal_autocheckpoint = wal_autocheckpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.busy_timeout = busy_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._write_queue: "queue.Queue[Optional[Tuple[Callable, Future]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.group_commits = 0
+        self.grouped_writes = 0
+        # Writer connection; _lock serializes its transactions and checkpoints
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        # Read-only connection per reading thread
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        # id -> parsed entry, valid while the database generation equals _index_generation
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._index_generation: Optional[int] = None
+        self._index_lock = threading.Lock()
+        # Index changes of the writes in the current batch (writer thread only)
+        self._staged: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.fts_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """The writer connection, opening (and if needed creating) the database first"""
+        with self._open_lock:
+            if self._conn is None:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(
+                    str(self.db_path), timeout=self.busy_timeout, check_same_thread=False, isolation_level=None
+                )
+                conn.create_function("py_lower", 1, _py_lower, deterministic=True)
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = FULL")
+                conn.execute(f"PRAGMA wal_autocheckpoint = {int(self.wal_autocheckpoint)}")
+                conn.execute("PRAGMA foreign_keys = ON")
+                conn.executescript(SCHEMA)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                    [("schema_version", str(SCHEMA_VERSION)), ("generation", "0")],
+                )
+                self._conn = conn
+                self._init_fts()
+                self._init_facets()
+                self._migrate_legacy_json()
+            return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read-only connection"""
+        thread_id = threading.get_ident()
+        conn = self._readers.get(thread_id)
+        if conn is None:
+            self._connect()
+            conn = sqlite3.connect(
+                str(self.db_path), timeout=self.busy_timeout, check_same_thread=False, isolation_level=None
+            )
+            conn.create_function("py_lower", 1, _py_lower, deterministic=True)
+            conn.execute("PRAGMA query_only = ON")
+            with self._open_lock:
+                self._readers[thread_id] = conn
+        return conn
+
+    def _init_fts(self):
+        """Create the full-text index, rebuilding it if it is out of step with videos"""
+        conn = self._conn
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, library search falls back to substring matching: {e}")
+            return
+        self.fts_enabled = True
+        with self._transaction():
+            indexed = conn.execute("SELECT COUNT(*) FROM videos_fts").fetchone()[0]
+            total = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+            if indexed == total:
+                return
+            conn.execute("DELETE FROM videos_fts")
+            for (data,) in conn.execute("SELECT data FROM videos").fetchall():
+                conn.execute("INSERT INTO videos_fts (id, title, description, tags) VALUES (?, ?, ?, ?)",
+                             _fts_row(json.loads(data)))
+        logger.info(f"Built library search index for {total} videos")
+
+    def _init_facets(self):
+        """Build facet_counts from scratch the first time this database is opened"""
+        conn = self._conn
+        with self._transaction():
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'facet_counts'").fetchone():
+                return
+            conn.execute("DELETE FROM facet_counts")
+            conn.execute(
+                "INSERT INTO facet_counts (facet, value, count) "
+                "SELECT 'tag', tag, COUNT(*) FROM video_tags GROUP BY tag"
+            )
+            for facet in ("category", "uploader"):
+                conn.execute(
+                    f"INSERT INTO facet_counts (facet, value, count) "
+                    f"SELECT '{facet}', {facet}, COUNT(*) FROM videos WHERE {facet} IS NOT NULL GROUP BY {facet}"
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('facet_counts', '1')")
+
+    def _adjust_facets(self, conn: sqlite3.Connection, video_id: str, delta: int):
+        """Add (delta=1) or remove (delta=-1) a stored video's facet values from facet_counts"""
+        row = conn.execute("SELECT category, uploader FROM videos WHERE id = ?", (video_id,)).fetchone()
+        if row is None:
+            return
+        values = [("category", row[0]), ("uploader", row[1])]
+        values += [("tag", tag) for (tag,) in conn.execute("SELECT tag FROM video_tags WHERE video_id = ?", (video_id,))]
+        values = [(facet, value) for facet, value in values if value is not None]
+        conn.executemany(
+            "INSERT INTO facet_counts (facet, value, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (facet, value) DO UPDATE SET count = count + excluded.count",
+            [(facet, value, delta) for facet, value in values],
+        )
+        if delta < 0:
+            conn.executemany(
+                "DELETE FROM facet_counts WHERE facet = ? AND value = ? AND count <= 0",
+                values,
+            )
+
+    def _migrate_legacy_json(self):
+        """Import an existing data.json library once, then rename it aside"""
+        path = self.legacy_json_path
+        if not path or not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        entries = [entry for entry in entries if isinstance(entry, dict) and entry.get("id")]
+        with self._transaction():
+            self._insert_many(self._conn, entries)
+        migrated_path = path.with_name(path.name + ".migrated")
+        try:
+            path.replace(migrated_path)
+        except FileNotFoundError:
+            # Another worker process imported and renamed it first; the import is idempotent
+            return
+        logger.info(f"Migrated {len(entries)} library entries from {path} (kept as {migrated_path.name})")
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def _insert_many(self, conn: sqlite3.Connection, entries: Iterable[Dict[str, Any]]):
+        for entry in entries:
+            self._adjust_facets(conn, entry["id"], -1)
+            conn.execute(
+                "INSERT OR REPLACE INTO videos "
+                "(id, saved_at, title_sort, uploader, category, view_count, like_count, duration, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _entry_row(entry),
+            )
+            conn.execute("DELETE FROM video_tags WHERE video_id = ?", (entry["id"],))
+            conn.executemany(
+                "INSERT INTO video_tags (video_id, tag) VALUES (?, ?)",
+                [(entry["id"], tag) for tag in _entry_tags(entry)],
+            )
+            if self.fts_enabled:
+                conn.execute("DELETE FROM videos_fts WHERE id = ?", (entry["id"],))
+                conn.execute("INSERT INTO videos_fts (id, title, description, tags) VALUES (?, ?, ?, ?)",
+                             _fts_row(entry))
+            self._adjust_facets(conn, entry["id"], 1)
+
+    def _add_op(self, entries: List[Dict[str, Any]]) -> Callable[[sqlite3.Connection], int]:
+        def op(conn: sqlite3.Connection) -> int:
+            self._insert_many(conn, entries)
+            for entry in entries:
+                self._staged[entry["id"]] = entry
+            return conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        return op
+
+    def _delete_op(self, video_ids: Iterable[str]) -> Callable[[sqlite3.Connection], List[Dict[str, Any]]]:
+        def op(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            removed = []
+            for video_id in video_ids:
+                row = conn.execute("SELECT data FROM videos WHERE id = ?", (video_id,)).fetchone()
+                if row is None:
+                    continue
+                self._adjust_facets(conn, video_id, -1)
+                conn.execute("DELETE FROM video_tags WHERE video_id = ?", (video_id,))
+                conn.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+                if self.fts_enabled:
+                    conn.execute("DELETE FROM videos_fts WHERE id = ?", (video_id,))
+                removed.append(json.loads(row[0]))
+            for entry in removed:
+                self._staged[entry["id"]] = None
+            return removed
+        return op
+
+    def _update_op(
+        self, video_id: str, fields: Dict[str, Any]
+    ) -> Callable[[sqlite3.Connection], Optional[Dict[str, Any]]]:
+        def op(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            row = conn.execute("SELECT data FROM videos WHERE id = ?", (video_id,)).fetchone()
+            if row is None:
+                return None
+            entry = {**json.loads(row[0]), **fields}
+            self._insert_many(conn, [entry])
+            self._staged[video_id] = entry
+            return entry
+        return op
+
+    def _write(self, op: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue a write for the writer thread; the future resolves after its commit"""
+        future: Future = Future()
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="library-writer", daemon=True)
+                self._writer.start()
+            self._write_queue.put((op, future))
+        return future
+
+    def _writer_loop(self):
+        while True:
+            request = self._write_queue.get()
+            if request is None:
+                return
+            batch = [request]
+            # Everything queued while the previous commit was syncing goes in this one
+            while len(batch) < GROUP_COMMIT_MAX:
+                try:
+                    request = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._write_queue.put(None)
+                    break
+                batch.append(request)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[Tuple[Callable, Future]]):
+        outcomes = []
+        self._staged = {}
+        with self._lock:
+            try:
+                conn = self._connect()
+                with self._transaction() as transaction:
+                    previous_generation = transaction.generation
+                    for op, _ in batch:
+                        conn.execute("SAVEPOINT library_write")
+                        try:
+                            outcomes.append((True, op(conn)))
+                            conn.execute("RELEASE library_write")
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO library_write")
+                            conn.execute("RELEASE library_write")
+                            outcomes.append((False, e))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            self.group_commits += 1
+            self.grouped_writes += len(batch)
+        with self._index_lock:
+            if self._index_generation == previous_generation and all(ok for ok, _ in outcomes):
+                for video_id, entry in self._staged.items():
+                    if entry is None:
+                        self._index.pop(video_id, None)
+                    else:
+                        self._index[video_id] = entry
+            else:
+                # Another process wrote in between, or a rolled-back write left
+                # staged changes that never happened
+                self._index.clear()
+            self._index_generation = transaction.generation
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def add(self, entry: Dict[str, Any]) -> int:
+        """Insert (or replace) an entry; returns the library size afterwards"""
+        return self.add_many([entry])
+
+    def add_many(self, entries: List[Dict[str, Any]]) -> int:
+        """Insert (or replace) entries in one write; returns the library size"""
+        return self._write(self._add_op(entries)).result()
+
+    def delete(self, video_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Remove entries by id; returns the entries that existed"""
+        return self._write(self._delete_op(list(video_ids))).result()
+
+    async def save(self, entry: Dict[str, Any]) -> int:
+        """add() without blocking the event loop"""
+        return await asyncio.wrap_future(self._write(self._add_op([entry])))
+
+    async def update_fields(self, video_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Set some fields of a stored entry, reading and writing it in one transaction.
+
+        Changes saved to the entry in the meantime are kept. Returns the
+        updated entry, or None (writing nothing) if the entry no longer exists.
+        """
+        return await asyncio.wrap_future(self._write(self._update_op(video_id, fields)))
+
+    async def remove(self, video_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """delete() without blocking the event loop"""
+        return await asyncio.wrap_future(self._write(self._delete_op(list(video_ids))))
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Entry by id, served from the in-memory index when possible.
+
+        The returned dict is shared with the index and must not be modified.
+        """
+        conn = self._reader()
+        generation = _generation(conn)
+        with self._index_lock:
+            if self._index_generation is None or generation > self._index_generation:
+                self._index.clear()
+                self._index_generation = generation
+            entry = self._index.get(video_id) if generation == self._index_generation else None
+        if entry is not None:
+            return entry
+        row = conn.execute("SELECT data FROM videos WHERE id = ?", (video_id,)).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row[0])
+        with self._index_lock:
+            # Only cache what was read at the generation the index is valid for
+            if generation == self._index_generation:
+                self._index[video_id] = entry
+        return entry
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def _filter_sql(
+        self,
+        search: Optional[str],
+        tag: Optional[str],
+        category: Optional[str],
+        uploader: Optional[str],
+    ) -> Tuple[str, List[str], List[Any], bool]:
+        """FROM/JOIN clause, WHERE clauses and parameters for the list filters"""
+        self._connect()
+        clauses = []
+        params: List[Any] = []
+        match = fts_query(search) if search and self.fts_enabled else None
+        if match:
+            clauses.append("videos_fts MATCH ?")
+            params.append(match)
+        elif search:
+            needle = search.lower()
+            clauses.append(
+                "(instr(title_sort, ?) > 0"
+                " OR instr(py_lower(json_extract(data, '$.description')), ?) > 0"
+                " OR EXISTS (SELECT 1 FROM video_tags t WHERE t.video_id = videos.id"
+                " AND instr(py_lower(t.tag), ?) > 0))"
+            )
+            params.extend([needle, needle, needle])
+        if tag:
+            clauses.append("EXISTS (SELECT 1 FROM video_tags t WHERE t.video_id = videos.id AND t.tag = ?)")
+            params.append(tag)
+        if category:
+            clauses.append("videos.category = ?")
+            params.append(category)
+        if uploader:
+            clauses.append("videos.uploader = ?")
+            params.append(uploader)
+
+        source = "videos"
+        if match:
+            source += " JOIN videos_fts ON videos_fts.id = videos.id"
+        return source, clauses, params, bool(match)
+
+    def count_matching(
+        self,
+        search: Optional[str] = None,
+        tag: Optional[str] = None,
+        category: Optional[str] = None,
+        uploader: Optional[str] = None,
+    ) -> int:
+        """Number of entries matching the filters, without loading them"""
+        source, clauses, params, _ = self._filter_sql(search, tag, category, uploader)
+        sql = f"SELECT COUNT(*) FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self._reader().execute(sql, params).fetchone()[0]
+
+    def query(
+        self,
+        search: Optional[str] = None,
+        tag: Optional[str] = None,
+        category: Optional[str] = None,
+        uploader: Optional[str] = None,
+        sort_by: Optional[str] = "saved_at",
+        order: Optional[str] = "desc",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of entries matching the filters and the cursor for the next.
+
+        Pages are keyset-paginated on (sort key, id), so a page costs the same
+        however deep it is and entries saved meanwhile do not shift it. Only
+        the rows of the requested page are read and parsed. Relevance ranks
+        depend on the whole library, so relevance cursors are best-effort
+        across writes.
+        """
+        source, clauses, params, matched = self._filter_sql(search, tag, category, uploader)
+        sort_by = sort_by if sort_by in SORT_COLUMNS or (sort_by == "relevance" and matched) else "saved_at"
+        order = "desc" if order == "desc" else "asc"
+        if sort_by == "relevance":
+            # bm25 is lower for better matches; "desc" lists the best first
+            sort_expr = FTS_RANK
+            direction = "ASC" if order == "desc" else "DESC"
+        else:
+            sort_expr = f"videos.{SORT_COLUMNS[sort_by]}"
+            direction = order.upper()
+
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor, sort_by, order)
+            clauses.append(f"({sort_expr}, videos.id) {'>' if direction == 'ASC' else '<'} (?, ?)")
+            params.extend([sort_value, last_id])
+
+        sql = f"SELECT videos.data, {sort_expr}, videos.id FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {sort_expr} {direction}, videos.id {direction}"
+        if limit is not None:
+            # One extra row tells whether another page follows
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort_by, order, rows[-1][1], rows[-1][2])
+        return [project(json.loads(row[0]), fields) for row in rows], next_cursor
+
+    def facet_counts(self) -> Dict[str, Dict[str, int]]:
+        """Per-value counts of tags, categories and uploaders across the whole library"""
+        facets: Dict[str, Dict[str, int]] = {key: {} for key in FACETS.values()}
+        rows = self._reader().execute(
+            "SELECT facet, value, count FROM facet_counts ORDER BY facet, value"
+        ).fetchall()
+        for facet, value, count in rows:
+            facets[FACETS[facet]][value] = count
+        return facets
+
+    def filtered_facet_counts(
+        self,
+        search: Optional[str] = None,
+        tag: Optional[str] = None,
+        category: Optional[str] = None,
+        uploader: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """Per-value facet counts over the entries matching the filters"""
+        source, clauses, params, _ = self._filter_sql(search, tag, category, uploader)
+        where = " AND ".join(clauses) or "1"
+        queries = {
+            "tags": f"SELECT vt.tag, COUNT(*) FROM {source} JOIN video_tags vt ON vt.video_id = videos.id "
+                    f"WHERE {where} GROUP BY vt.tag ORDER BY vt.tag",
+            "categories": f"SELECT videos.category, COUNT(*) FROM {source} "
+                          f"WHERE {where} AND videos.category IS NOT NULL GROUP BY 1 ORDER BY 1",
+            "uploaders": f"SELECT videos.uploader, COUNT(*) FROM {source} "
+                         f"WHERE {where} AND videos.uploader IS NOT NULL GROUP BY 1 ORDER BY 1",
+        }
+        conn = self._reader()
+        return {key: dict(conn.execute(sql, params).fetchall()) for key, sql in queries.items()}
+
+    def checkpoint(self) -> Tuple[int, int]:
+        """Fold the write-ahead log into the database file and truncate it.
+
+        Returns (log frames, frames checkpointed); a busy reader can leave
+        frames behind, they are picked up by the next checkpoint.
+        """
+        with self._lock:
+            _, log_frames, checkpointed = self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return log_frames, checkpointed
+
+    async def start(self) -> None:
+        """Open the database (importing data.json if needed) and start checkpointing"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.count)
+        if self.checkpoint_interval > 0:
+            self._task = asyncio.create_task(self._checkpoint_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._conn is not None:
+            self.checkpoint()
+        self.close()
+
+    async def _checkpoint_periodically(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                log_frames, checkpointed = await loop.run_in_executor(None, self.checkpoint)
+                if log_frames:
+                    logger.info(f"Library checkpoint: {checkpointed}/{log_frames} WAL frames written back")
+            except sqlite3.Error as e:
+                logger.warning(f"Library checkpoint failed: {e}")
+
+    def close(self):
+        with self._writer_lock:
+            if self._writer is not None:
+                self._write_queue.put(None)
+                self._writer.join()
+                self._writer = None
+        with self._lock, self._open_lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers = {}
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        with self._index_lock:
+            self._index.clear()
+            self._index_generation = None
+
+
+def _generation(conn: sqlite3.Connection) -> int:
+    """Number of write transactions committed to the database so far"""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    return int(row[0]) if row else 0
+
+
+class _Transaction:
+    """BEGIN ... COMMIT on an autocommit connection, rolled back on error.
+
+    ``generation`` is the database generation seen when the transaction
+    started, and the one it committed after a successful exit.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.generation = 0
+
+    def __enter__(self) -> "_Transaction":
+        # Take the write lock up front so concurrent writers wait instead of deadlocking
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.generation = _generation(self.conn)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.generation += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (str(self.generation),)
+            )
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
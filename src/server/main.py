@@ -1,17 +1,46 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import os
 import shutil
 from pathlib import Path
 import uuid
 import subprocess
+import sqlite3
 import json
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
 import logging
 import traceback
+from contextlib import ExitStack
+
+from config import (
+    ANALYZE_BATCH_CONCURRENCY, ANALYZE_BATCH_MAX_URLS, ANALYZE_HOST_CONCURRENCY, DOWNLOAD_HOST_CONCURRENCY, DOWNLOAD_HOST_CONNECTIONS, DOWNLOAD_PARTIAL_MAX_AGE, DOWNLOAD_RESUME_ATTEMPTS, DOWNLOAD_WORKERS, HLS_LADDER, HLS_PACKAGING, HLS_SEGMENT_SECONDS, HLS_WORKERS, JOB_HISTORY_LIMIT,
+    LIBRARY_BUSY_TIMEOUT, LIBRARY_CHECKPOINT_INTERVAL, LIBRARY_WAL_AUTOCHECKPOINT, PLAYLIST_MAX_PAGE_SIZE, PLAYLIST_PAGE_SIZE,
+    YTDLP_CONCURRENT_FRAGMENTS,
+    YTDLP_EXTERNAL_DOWNLOADER
+)
+from cookie_manager import cookie_manager
+from downloader import (
+    build_downloader_args, is_partial_file, is_transient_error, remove_partial_files, sweep_partial_files
+)
+from extraction import (
+    YTDLP_COMMON_ARGS, YtdlpError, classify_ytdlp_error, extract_video_info, extraction_cache, extraction_stats,
+    start_extraction_engine, stop_extraction_engine, write_info_json
+)
+from jobs import DownloadJob, JobManager, FINISHED_STATES, JOB_COMPLETED
+from library_store import InvalidCursor, LibraryStore
+from hls import HlsPackager, parse_ladder
+from host_limits import HostLimiter
+from merge import merge_streams
+from playlists import iter_playlist_page
+from media_response import RangeFileResponse, is_content_addressed, media_type_for
+from thumbnails import THUMBNAIL_FORMATS, backfill_variants, generate_variants, resolve_variant, variant_paths
+from process_runner import stream_process
+from progress import DownloadProgressTracker, YTDLP_PROGRESS_ARGS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,10 +52,25 @@ app = FastAPI(title="Video Toolkit API", version="1.0.0")
 class VideoPageRequest(BaseModel):
     url: str
 
+class VideoBatchAnalyzeRequest(BaseModel):
+    urls: List[str]
+
 class VideoDownloadRequest(BaseModel):
     url: str
     format_id: str
 
+class PlaylistEntriesRequest(BaseModel):
+    url: str
+    limit: Optional[int] = None  # entries per page; PLAYLIST_PAGE_SIZE when omitted
+    cursor: Optional[str] = None  # next_cursor of the previous page
+
+class PlaylistDownloadRequest(BaseModel):
+    urls: List[str]  # entry URLs selected from /playlist_entries
+    format_id: str = "bestvideo"  # format selector applied to every entry
+
+class CacheInvalidateRequest(BaseModel):
+    url: Optional[str] = None
+
 class VideoSaveRequest(BaseModel):
     video_url: str
     video_page_name: Optional[str] = None
@@ -50,6 +94,9 @@ class VideoSaveRequest(BaseModel):
     duration: Optional[float] = None
     age_limit: Optional[int] = None
 
+class VideoDeleteRequest(BaseModel):
+    ids: List[str]
+
 class VideoFormat(BaseModel):
     format_id: str
     ext: str
@@ -108,149 +155,122 @@ VIDEO_LIBRARY_DIR = Path("video_library")
 VIDEO_LIBRARY_DIR.mkdir(parents=True, exist_ok=True)
 
 VIDEO_LIBRARY_DATA_FILE = VIDEO_LIBRARY_DIR / "data.json"
+VIDEO_LIBRARY_DB_FILE = VIDEO_LIBRARY_DIR / "library.db"
 
-# Cookies file path
-COOKIES_FILE = Path("cookies.txt")
+# Library entries live in SQLite; a legacy data.json is imported on first use
+library_store = LibraryStore(
+    VIDEO_LIBRARY_DB_FILE,
+    legacy_json_path=VIDEO_LIBRARY_DATA_FILE,
+    wal_autocheckpoint=LIBRARY_WAL_AUTOCHECKPOINT,
+    checkpoint_interval=LIBRARY_CHECKPOINT_INTERVAL,
+    busy_timeout=LIBRARY_BUSY_TIMEOUT
+)
+hls_packager = HlsPackager(
+    VIDEO_LIBRARY_DIR,
+    library_store,
+    ladder=parse_ladder(HLS_LADDER),
+    segment_seconds=HLS_SEGMENT_SECONDS,
+    workers=HLS_WORKERS
+)
+
+# Info JSON files handed to yt-dlp --load-info-json, inside download_tmp
+INFO_JSON_DIR_NAME = "info_json"
+
+# Parallel fragments / external downloader, capped per host by the config
+DOWNLOADER_ARGS = build_downloader_args(
+    YTDLP_CONCURRENT_FRAGMENTS,
+    DOWNLOAD_HOST_CONNECTIONS,
+    YTDLP_EXTERNAL_DOWNLOADER
+)
+# Shared by all batches so concurrent batches stay polite to the same site
+analyze_host_limiter = HostLimiter(ANALYZE_HOST_CONCURRENCY)
+
+# Idle interval after which a keep-alive comment is sent on event streams
+SSE_KEEPALIVE_SECONDS = 15
 
 @app.get("/")
 async def root():
     return {"message": "Video Toolkit API is running"}
 
+def build_video_info(video_data: dict) -> VideoInfo:
+    """Build the analysis response for one yt-dlp info dict"""
+    # Extract and filter formats
+    formats = []
+    if 'formats' in video_data:
+        for fmt in video_data['formats']:
+            # Filter for video formats with reasonable quality
+            if fmt.get('vcodec') != 'none' and fmt.get('height'):
+                height = fmt.get('height', 0)
+                if height >= 360:  # Only include 360p and above
+                    quality_map = {
+                        range(360, 480): "360p",
+                        range(480, 720): "480p", 
+                        range(720, 1080): "720p",
+                        range(1080, 1440): "1080p",
+                        range(1440, 2160): "1440p",
+                        range(2160, 4320): "4K"
+                    }
+                    quality = "Unknown"
+                    for height_range, quality_label in quality_map.items():
+                        if height in height_range:
+                            quality = quality_label
+                            break
+
+                    video_format = VideoFormat(
+                        format_id=fmt.get('format_id', ''),
+                        ext=fmt.get('ext', ''),
+                        resolution=fmt.get('resolution', f"{fmt.get('width', 'unknown')}x{fmt.get('height', 'unknown')}"),
+                        filesize=fmt.get('filesize'),
+                        tbr=fmt.get('tbr'),
+                        vbr=fmt.get('vbr'),
+                        abr=fmt.get('abr'),
+                        format_note=fmt.get('format_note', ''),
+                        quality=quality
+                    )
+                    formats.append(video_format)
+
+    # Sort formats by quality (height) descending
+    formats.sort(key=lambda x: int(x.resolution.split('x')[1]) if 'x' in x.resolution and x.resolution.split('x')[1].isdigit() else 0, reverse=True)
+
+    return VideoInfo(
+        id=video_data.get('id', ''),
+        title=video_data.get('title', 'Unknown'),
+        url=video_data.get('webpage_url', video_data.get('url', '')),
+        duration=video_data.get('duration'),
+        thumbnail=video_data.get('thumbnail'),
+        uploader=video_data.get('uploader'),
+        view_count=video_data.get('view_count'),
+        formats=formats,
+        # Additional metadata
+        upload_date=video_data.get('upload_date'),
+        description=video_data.get('description'),
+        tags=video_data.get('tags'),
+        categories=video_data.get('categories'),
+        like_count=video_data.get('like_count'),
+        dislike_count=video_data.get('dislike_count'),
+        comment_count=video_data.get('comment_count'),
+        channel_id=video_data.get('channel_id'),
+        channel_url=video_data.get('channel_url'),
+        average_rating=video_data.get('average_rating'),
+        age_limit=video_data.get('age_limit'),
+        webpage_url_basename=video_data.get('webpage_url_basename'),
+        extractor=video_data.get('extractor')
+    )
+
 @app.post("/videopage_analyze")
 async def analyze_video_page(request: VideoPageRequest):
     """Analyze a webpage URL to extract downloadable video information using yt-dlp"""
     try:
         logger.info(f"Analyzing video URL: {request.url}")
         
-        # Run yt-dlp to extract video information
-        cmd = [
-            "yt-dlp",
-            "--dump-json",
-            "--no-download",
-            # Use cookies from browser (more convenient) or file-based cookies
-            "--cookies-from-browser", "chrome",
-            "--extractor-args", "youtubetab:skip=authcheck",
-            "--no-playlist",  # Only download single video, not playlist
-            "--retries", "3",
-            "--fragment-retries", "3",
-            "--retry-sleep", "5",
-            # Alternative: "--cookies", str(COOKIES_FILE),
-            request.url
-        ]
-        
-        logger.info(f"Running command: {' '.join(cmd)}")
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        
-        logger.info(f"yt-dlp return code: {result.returncode}")
-        
-        if result.returncode != 0:
-            logger.error(f"yt-dlp stderr: {result.stderr}")
-            
-            # Check for specific YouTube errors
-            if "Too Many Requests" in result.stderr or "429" in result.stderr:
-                raise HTTPException(
-                    status_code=429, 
-                    detail="YouTube rate limit exceeded. Please wait a few minutes before trying again."
-                )
-            elif "Sign in to confirm your age" in result.stderr:
-                raise HTTPException(
-                    status_code=403,
-                    detail="This video requires age verification. Please sign into YouTube in your browser first."
-                )
-            elif "Video unavailable" in result.stderr or "Private video" in result.stderr:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Video is unavailable or private."
-                )
-            elif "This live event will begin" in result.stderr:
-                raise HTTPException(
-                    status_code=400,
-                    detail="This is a scheduled live stream that hasn't started yet."
-                )
-            else:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Failed to analyze URL: {result.stderr}"
-                )
+        # Extract video information (served from the extraction cache when possible)
+        try:
+            video_data = await extract_video_info(request.url, timeout=60)
+        except YtdlpError as e:
+            logger.error(f"yt-dlp stderr: {e.stderr}")
+            raise classify_ytdlp_error(e.stderr, "Failed to analyze URL")
         
-        # Parse the JSON output
-        videos = []
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-                    video_data = json.loads(line)
-                    
-                    # Extract and filter formats
-                    formats = []
-                    if 'formats' in video_data:
-                        for fmt in video_data['formats']:
-                            # Filter for video formats with reasonable quality
-                            if fmt.get('vcodec') != 'none' and fmt.get('height'):
-                                height = fmt.get('height', 0)
-                                if height >= 360:  # Only include 360p and above
-                                    quality_map = {
-                                        range(360, 480): "360p",
-                                        range(480, 720): "480p", 
-                                        range(720, 1080): "720p",
-                                        range(1080, 1440): "1080p",
-                                        range(1440, 2160): "1440p",
-                                        range(2160, 4320): "4K"
-                                    }
-                                    quality = "Unknown"
-                                    for height_range, quality_label in quality_map.items():
-                                        if height in height_range:
-                                            quality = quality_label
-                                            break
-                                    
-                                    video_format = VideoFormat(
-                                        format_id=fmt.get('format_id', ''),
-                                        ext=fmt.get('ext', ''),
-                                        resolution=fmt.get('resolution', f"{fmt.get('width', 'unknown')}x{fmt.get('height', 'unknown')}"),
-                                        filesize=fmt.get('filesize'),
-                                        tbr=fmt.get('tbr'),
-                                        vbr=fmt.get('vbr'),
-                                        abr=fmt.get('abr'),
-                                        format_note=fmt.get('format_note', ''),
-                                        quality=quality
-                                    )
-                                    formats.append(video_format)
-                    
-                    # Sort formats by quality (height) descending
-                    formats.sort(key=lambda x: int(x.resolution.split('x')[1]) if 'x' in x.resolution and x.resolution.split('x')[1].isdigit() else 0, reverse=True)
-                    
-                    video_info = VideoInfo(
-                        id=video_data.get('id', ''),
-                        title=video_data.get('title', 'Unknown'),
-                        url=video_data.get('webpage_url', video_data.get('url', '')),
-                        duration=video_data.get('duration'),
-                        thumbnail=video_data.get('thumbnail'),
-                        uploader=video_data.get('uploader'),
-                        view_count=video_data.get('view_count'),
-                        formats=formats,
-                        # Additional metadata
-                        upload_date=video_data.get('upload_date'),
-                        description=video_data.get('description'),
-                        tags=video_data.get('tags'),
-                        categories=video_data.get('categories'),
-                        like_count=video_data.get('like_count'),
-                        dislike_count=video_data.get('dislike_count'),
-                        comment_count=video_data.get('comment_count'),
-                        channel_id=video_data.get('channel_id'),
-                        channel_url=video_data.get('channel_url'),
-                        average_rating=video_data.get('average_rating'),
-                        age_limit=video_data.get('age_limit'),
-                        webpage_url_basename=video_data.get('webpage_url_basename'),
-                        extractor=video_data.get('extractor')
-                    )
-                    videos.append(video_info)
-                except json.JSONDecodeError:
-                    continue
+        videos = [build_video_info(video_data)]
         
         return {
             "message": "Video page analysis completed",
@@ -259,6 +279,8 @@ async def analyze_video_page(request: VideoPageRequest):
             "videos": videos
         }
         
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         logger.error("Request timeout - URL analysis took too long")
         raise HTTPException(status_code=408, detail="Request timeout - URL analysis took too long")
@@ -267,154 +289,225 @@ async def analyze_video_page(request: VideoPageRequest):
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+async def analyze_batch_url(index: int, url: str, slots: asyncio.Semaphore) -> dict:
+    """Analyze one URL of a batch; errors are returned instead of raised"""
+    result = {"index": index, "url": url}
+    try:
+        # Wait for the host first so URLs queued behind a busy site do not
+        # hold batch slots other hosts could use
+        async with analyze_host_limiter.hold(url), slots:
+            video_data = await extract_video_info(url, timeout=60)
+        return {**result, "ok": True, "videos": jsonable_encoder([build_video_info(video_data)])}
+    except YtdlpError as e:
+        logger.error(f"yt-dlp stderr for {url}: {e.stderr}")
+        error = classify_ytdlp_error(e.stderr, "Failed to analyze URL")
+    except subprocess.TimeoutExpired:
+        error = HTTPException(status_code=408, detail="Request timeout - URL analysis took too long")
+    except Exception as e:
+        logger.error(f"Error analyzing {url} in batch: {str(e)}")
+        error = HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    return {**result, "ok": False, "status_code": error.status_code, "error": error.detail}
+
+@app.post("/videopage_analyze_batch")
+async def analyze_video_pages_batch(request: VideoBatchAnalyzeRequest):
+    """Analyze many URLs, streaming one NDJSON line per URL as each finishes.
+
+    Every line carries the URL's index in the request. Failed URLs get the
+    status code and message analyze_video_page would have answered with; a
+    final summary line closes the stream.
+    """
+    urls = [url.strip() for url in request.urls if url.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(urls) > ANALYZE_BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many URLs: {len(urls)} (at most {ANALYZE_BATCH_MAX_URLS} per batch)"
+        )
+    logger.info(f"Analyzing batch of {len(urls)} URLs")
+
+    async def result_stream():
+        slots = asyncio.Semaphore(max(1, ANALYZE_BATCH_CONCURRENCY))
+        tasks = [asyncio.ensure_future(analyze_batch_url(index, url, slots)) for index, url in enumerate(urls)]
+        succeeded = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                succeeded += result["ok"]
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"summary": {"total": len(urls), "succeeded": succeeded, "failed": len(urls) - succeeded}}) + "\n"
+        finally:
+            # If the client went away, URLs still waiting for a slot are dropped
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def build_selection_metadata(video_data: dict) -> dict:
+    """Build the metadata used for tag selection before downloading"""
+    # Return comprehensive metadata for user selection
+    return {
+        "id": video_data.get('id', ''),
+        "title": video_data.get('title', 'Unknown'),
+        "url": video_data.get('webpage_url', video_data.get('url', '')),
+        "duration": video_data.get('duration'),
+        "thumbnail": video_data.get('thumbnail'),
+        "uploader": video_data.get('uploader'),
+        "description": video_data.get('description', ''),
+        "upload_date": video_data.get('upload_date'),
+        "extractor": video_data.get('extractor'),
+
+        # Tags for selection
+        "available_tags": video_data.get('tags', []),
+        "categories": video_data.get('categories', []),
+
+        # Engagement metrics
+        "view_count": video_data.get('view_count'),
+        "like_count": video_data.get('like_count'),
+        "dislike_count": video_data.get('dislike_count'),
+        "comment_count": video_data.get('comment_count'),
+        "average_rating": video_data.get('average_rating'),
+
+        # Channel information
+        "channel_id": video_data.get('channel_id'),
+        "channel_url": video_data.get('channel_url'),
+        "age_limit": video_data.get('age_limit', 0),
+
+        # Additional info
+        "webpage_url_basename": video_data.get('webpage_url_basename')
+    }
+
 @app.post("/videopage_metadata")
 async def get_video_metadata_for_selection(request: VideoPageRequest):
     """Get detailed video metadata for user selection before downloading"""
     try:
         logger.info(f"Getting metadata for URL: {request.url}")
         
-        # Run yt-dlp to extract video information
-        cmd = [
-            "yt-dlp",
-            "--dump-json",
-            "--no-download",
-            "--cookies-from-browser", "chrome",
-            "--extractor-args", "youtubetab:skip=authcheck",
-            "--no-playlist",  # Only download single video, not playlist
-            "--retries", "3",
-            "--fragment-retries", "3",
-            "--retry-sleep", "5",
-            request.url
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        
-        if result.returncode != 0:
-            logger.error(f"yt-dlp stderr: {result.stderr}")
-            
-            # Check for specific YouTube errors
-            if "Too Many Requests" in result.stderr or "429" in result.stderr:
-                raise HTTPException(
-                    status_code=429, 
-                    detail="YouTube rate limit exceeded. Please wait a few minutes before trying again."
-                )
-            elif "Sign in to confirm your age" in result.stderr:
-                raise HTTPException(
-                    status_code=403,
-                    detail="This video requires age verification. Please sign into YouTube in your browser first."
-                )
-            elif "Video unavailable" in result.stderr or "Private video" in result.stderr:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Video is unavailable or private."
-                )
-            else:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Failed to get metadata: {result.stderr}"
-                )
-        
-        # Parse the JSON output
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-                    video_data = json.loads(line)
-                    
-                    # Return comprehensive metadata for user selection
-                    metadata = {
-                        "id": video_data.get('id', ''),
-                        "title": video_data.get('title', 'Unknown'),
-                        "url": video_data.get('webpage_url', video_data.get('url', '')),
-                        "duration": video_data.get('duration'),
-                        "thumbnail": video_data.get('thumbnail'),
-                        "uploader": video_data.get('uploader'),
-                        "description": video_data.get('description', ''),
-                        "upload_date": video_data.get('upload_date'),
-                        "extractor": video_data.get('extractor'),
-                        
-                        # Tags for selection
-                        "available_tags": video_data.get('tags', []),
-                        "categories": video_data.get('categories', []),
-                        
-                        # Engagement metrics
-                        "view_count": video_data.get('view_count'),
-                        "like_count": video_data.get('like_count'),
-                        "dislike_count": video_data.get('dislike_count'),
-                        "comment_count": video_data.get('comment_count'),
-                        "average_rating": video_data.get('average_rating'),
-                        
-                        # Channel information
-                        "channel_id": video_data.get('channel_id'),
-                        "channel_url": video_data.get('channel_url'),
-                        "age_limit": video_data.get('age_limit', 0),
-                        
-                        # Additional info
-                        "webpage_url_basename": video_data.get('webpage_url_basename')
-                    }
-                    
-                    return {
-                        "message": "Video metadata retrieved successfully",
-                        "metadata": metadata
-                    }
-                    
-                except json.JSONDecodeError:
-                    continue
+        # Extract video information (served from the extraction cache when possible)
+        try:
+            video_data = await extract_video_info(request.url, timeout=60)
+        except YtdlpError as e:
+            logger.error(f"yt-dlp stderr: {e.stderr}")
+            raise classify_ytdlp_error(e.stderr, "Failed to get metadata")
         
-        raise HTTPException(status_code=404, detail="No video metadata found")
+        return {
+            "message": "Video metadata retrieved successfully",
+            "metadata": build_selection_metadata(video_data)
+        }
         
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=408, detail="Timeout getting video metadata")
     except Exception as e:
         logger.error(f"Error getting video metadata: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@app.post("/videopage_download")
-async def download_video_from_page(request: VideoDownloadRequest):
-    """Download a specific video format from a webpage URL using yt-dlp"""
+@app.get("/extraction_cache")
+async def get_extraction_cache_stats():
+    """Report size, hit/miss counters and coalesced requests of the extraction cache"""
+    return extraction_stats()
+
+@app.post("/extraction_cache/invalidate")
+async def invalidate_extraction_cache(request: CacheInvalidateRequest):
+    """Drop the cached extraction of one URL, or the whole cache when no URL is given"""
+    removed = extraction_cache.invalidate(request.url)
+    return {
+        "message": "Extraction cache invalidated",
+        "url": request.url,
+        "entries_removed": removed,
+        "stats": extraction_stats()
+    }
+
+@app.get("/cookies")
+async def get_cookie_status():
+    """Report the cookie file shared by yt-dlp calls and its refresh state"""
+    return cookie_manager.stats()
+
+@app.post("/cookies/refresh")
+async def refresh_cookies():
+    """Re-export browser cookies into the shared cookie file now"""
+    available = await cookie_manager.refresh("manual", force=True)
+    return {
+        "message": "Cookies refreshed" if available else "No cookie file available",
+        **cookie_manager.stats()
+    }
+
+async def perform_download(
+    url: str,
+    format_id: str,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    download_id: Optional[str] = None
+) -> dict:
+    """Download a specific video format from a webpage URL using yt-dlp
+
+    yt-dlp and ffmpeg output is parsed line by line while they run; progress
+    snapshots (phase, bytes, speed, ETA, fragments) are passed to ``on_progress``.
+    Passing the ``download_id`` of an earlier attempt continues its partial files.
+    """
+    tracker = DownloadProgressTracker(on_progress or (lambda progress: None))
+    info_json_path = None
+    merge_report = None
+    cleanup = ExitStack()
     try:
-        # Generate unique filename for this download
-        download_id = str(uuid.uuid4())
+        # Unique filename for this download; a resumed job passes its own
+        download_id = download_id or str(uuid.uuid4())
+        cookie_args = cleanup.enter_context(cookie_manager.cookie_args())
         
         # Resolve relative path if needed
         download_tmp_dir = DOWNLOAD_TMP_DIR
         if not download_tmp_dir.is_absolute():
             download_tmp_dir = Path.cwd() / download_tmp_dir
         
+        # Feed the info dict extracted during analysis (or from the extraction
+        # cache) straight to yt-dlp so the download starts without another
+        # round trip to the site. The fallback below extracts from the URL again.
+        info_json_path = await write_info_json(url, download_tmp_dir / INFO_JSON_DIR_NAME / f"{download_id}.json")
+        source_args = ["--load-info-json", str(info_json_path)] if info_json_path else [url]
+        
         # Run yt-dlp to download the specific format with audio and thumbnail
         # Use format selection that ensures both video and audio are included
         # For Bilibili and other sites with separate video/audio streams
         # Use safe filename without video title to avoid character issues
         cmd = [
             "yt-dlp",
-            "--format", f"{request.format_id}+bestaudio[ext=m4a]/best",
+            "--format", f"{format_id}+bestaudio[ext=m4a]/best",
             "--output", str(download_tmp_dir / f"{download_id}.%(ext)s"),
+            "--continue",  # Resume .part files and fragment state of earlier attempts
             "--write-thumbnail",
             "--embed-metadata",
             "--keep-video",  # Keep video file temporarily for debugging
-            # Use cookies from browser (more convenient) or file-based cookies
-            "--cookies-from-browser", "chrome",
-            "--extractor-args", "youtubetab:skip=authcheck",
-            "--no-playlist",  # Only download single video, not playlist
-            "--retries", "3",
-            "--fragment-retries", "3",
-            "--retry-sleep", "5",
-            # Alternative: "--cookies", str(COOKIES_FILE),
-            request.url
+            *YTDLP_COMMON_ARGS,
+            *DOWNLOADER_ARGS,
+            *cookie_args,
+            *YTDLP_PROGRESS_ARGS,
+            *source_args
         ]
         
         logger.info(f"Running download command: {' '.join(cmd)}")
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutes timeout for download
-        )
+        # A timeout or dropped connection keeps the partial files; the next
+        # attempt continues them instead of starting over
+        for attempt in range(1, DOWNLOAD_RESUME_ATTEMPTS + 1):
+            try:
+                result = await stream_process(
+                    "ytdlp_download",
+                    cmd,
+                    timeout=300,  # 5 minutes per attempt
+                    on_line=tracker.feed_ytdlp_line
+                )
+            except subprocess.TimeoutExpired:
+                if attempt == DOWNLOAD_RESUME_ATTEMPTS:
+                    raise
+                logger.warning(f"Download {download_id} timed out, resuming (attempt {attempt + 1})")
+                continue
+            if result.returncode == 0 or not is_transient_error(result.stderr) or attempt == DOWNLOAD_RESUME_ATTEMPTS:
+                break
+            logger.warning(f"Download {download_id} interrupted, resuming (attempt {attempt + 1}): {result.stderr}")
         
         logger.info(f"Download result code: {result.returncode}")
         if result.stderr:
@@ -423,30 +516,35 @@ async def download_video_from_page(request: VideoDownloadRequest):
         if result.returncode != 0:
             # Try alternative format selection if the first attempt fails
             logger.warning(f"First download attempt failed: {result.stderr}")
+            cookie_manager.request_refresh(result.stderr)
+            
+            if info_json_path:
+                # The reused info may hold expired format URLs; re-extract next time
+                extraction_cache.invalidate(url)
             
             # Fallback: Try with a simpler format selection but still ensure merging
             cmd_fallback = [
                 "yt-dlp",
-                "--format", f"{request.format_id}+bestaudio",
+                "--format", f"{format_id}+bestaudio",
                 "--output", str(download_tmp_dir / f"{download_id}.%(ext)s"),
+                "--continue",
                 "--write-thumbnail",
                 "--embed-metadata",
-                "--cookies-from-browser", "chrome",
-                "--extractor-args", "youtubetab:skip=authcheck",
-                "--no-playlist",
-                "--retries", "3",
-                "--fragment-retries", "3",
-                "--retry-sleep", "5",
-                request.url
+                *YTDLP_COMMON_ARGS,
+                *DOWNLOADER_ARGS,
+                *cookie_args,
+                *YTDLP_PROGRESS_ARGS,
+                url
             ]
             
             logger.info(f"Running fallback command: {' '.join(cmd_fallback)}")
             
-            result = subprocess.run(
+            tracker.set_phase("downloading")
+            result = await stream_process(
+                "ytdlp_download",
                 cmd_fallback,
-                capture_output=True,
-                text=True,
-                timeout=300
+                timeout=300,
+                on_line=tracker.feed_ytdlp_line
             )
             
             if result.returncode != 0:
@@ -456,6 +554,11 @@ async def download_video_from_page(request: VideoDownloadRequest):
                     detail=f"Failed to download video with both attempts. Error: {result.stderr}"
                 )
         
+        # Partials of an abandoned format (e.g. before the fallback) are no longer needed
+        for leftover in download_tmp_dir.glob(f"{download_id}*"):
+            if is_partial_file(leftover):
+                leftover.unlink(missing_ok=True)
+        
         # Find the downloaded files
         downloaded_files = list(download_tmp_dir.glob(f"{download_id}*"))
         video_files = [f for f in downloaded_files if f.suffix.lower() in ['.mp4', '.mkv', '.webm', '.avi'] and not '.f' in f.stem]
@@ -476,26 +579,17 @@ async def download_video_from_page(request: VideoDownloadRequest):
             
             logger.info(f"Merging video: {video_file.name} with audio: {audio_file.name}")
             
-            # Use ffmpeg to merge video and audio
-            merge_cmd = [
-                "ffmpeg",
-                "-i", str(video_file),
-                "-i", str(audio_file),
-                "-c:v", "copy",
-                "-c:a", "aac",
-                "-shortest",  # Match the shortest stream duration
-                "-y",  # Overwrite output file
-                str(merged_path)
-            ]
-            
-            merge_result = subprocess.run(
-                merge_cmd,
-                capture_output=True,
-                text=True,
-                timeout=120
+            # Stream-copy whatever MP4 can hold; transcode only what it cannot
+            tracker.set_phase("merging")
+            merge_result = await merge_streams(
+                video_file,
+                audio_file,
+                merged_path,
+                on_line=tracker.feed_ffmpeg_line
             )
+            merge_report = merge_result.to_dict()
             
-            if merge_result.returncode == 0:
+            if merge_result.ok:
                 # Remove separate files and use merged file
                 logger.info(f"Successfully merged video and audio. Removing separate files.")
                 video_file.unlink()
@@ -504,8 +598,8 @@ async def download_video_from_page(request: VideoDownloadRequest):
             else:
                 # If merging fails, use the video file (might be audio-less)
                 downloaded_file = video_file
-                logger.error(f"FFmpeg merge failed: {merge_result.stderr}")
-                print(f"FFmpeg merge failed: {merge_result.stderr}")
+                logger.error(f"FFmpeg merge failed: {merge_result.process.stderr}")
+                print(f"FFmpeg merge failed: {merge_result.process.stderr}")
         
         elif len(video_files) == 1:
             # Single video file (hopefully with audio already merged)
@@ -532,10 +626,13 @@ async def download_video_from_page(request: VideoDownloadRequest):
             "filename": downloaded_file.name,
             "file_path": str(downloaded_file),
             "file_size": downloaded_file.stat().st_size,
-            "url": request.url,
-            "format_id": request.format_id,
+            "url": url,
+            "format_id": format_id,
             "merged": len(video_files) == 1 and len(audio_files) == 1 and downloaded_file.name.endswith('.mp4')
         }
+        if merge_report:
+            # Copy-vs-transcode decision and timing of the merge
+            response_data["merge"] = merge_report
         
         # Add thumbnail information if available
         if thumbnail_file:
@@ -543,12 +640,232 @@ async def download_video_from_page(request: VideoDownloadRequest):
             response_data["thumbnail_path"] = str(thumbnail_file)
             response_data["thumbnail_size"] = thumbnail_file.stat().st_size
         
+        response_data["bytes_downloaded"] = tracker.bytes_downloaded
+        tracker.set_phase("finished")
         return response_data
         
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=408, detail="Download timeout - Video download took too long")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        cleanup.close()
+        if info_json_path:
+            info_json_path.unlink(missing_ok=True)
+
+async def run_download_job(job: DownloadJob) -> dict:
+    """Job handler executed by the download workers"""
+    return await perform_download(
+        job.url,
+        job.format_id,
+        on_progress=job.update_progress,
+        download_id=job.download_id
+    )
+
+def discard_partial_download(job: DownloadJob) -> None:
+    """Delete the partial files of a failed job that was pruned from the history"""
+    removed = remove_partial_files(DOWNLOAD_TMP_DIR, job.download_id)
+    if removed:
+        logger.info(f"Removed {removed} partial file(s) of forgotten download {job.download_id}")
+
+job_manager = JobManager(
+    run_download_job,
+    workers=DOWNLOAD_WORKERS,
+    # Workers only pick up jobs whose host has a free slot
+    host_limit=DOWNLOAD_HOST_CONCURRENCY,
+    history_limit=JOB_HISTORY_LIMIT,
+    state_path=DOWNLOAD_TMP_DIR / "jobs.json",
+    on_forget=discard_partial_download
+)
+
+# Partial files are checked for their age this often
+PARTIAL_SWEEP_INTERVAL = 3600
+
+partial_sweep_task: Optional[asyncio.Task] = None
+
+async def sweep_partial_downloads_periodically():
+    """Delete partial downloads older than DOWNLOAD_PARTIAL_MAX_AGE, except those of unfinished jobs"""
+    while True:
+        try:
+            removed = await asyncio.to_thread(
+                sweep_partial_files, DOWNLOAD_TMP_DIR, DOWNLOAD_PARTIAL_MAX_AGE, job_manager.active_download_ids()
+            )
+            if removed:
+                logger.info(f"Removed {removed} stale partial download file(s)")
+        except OSError as e:
+            logger.warning(f"Partial download sweep failed: {e}")
+        await asyncio.sleep(PARTIAL_SWEEP_INTERVAL)
+
+@app.on_event("startup")
+async def start_download_workers():
+    global partial_sweep_task
+    # Export browser cookies first so the engine workers start with them
+    await cookie_manager.start()
+    await start_extraction_engine()
+    await job_manager.start()
+    await library_store.start()
+    await hls_packager.start()
+    if DOWNLOAD_PARTIAL_MAX_AGE > 0:
+        partial_sweep_task = asyncio.create_task(sweep_partial_downloads_periodically())
+
+@app.on_event("shutdown")
+async def stop_download_workers():
+    if partial_sweep_task:
+        partial_sweep_task.cancel()
+        await asyncio.gather(partial_sweep_task, return_exceptions=True)
+    await job_manager.stop()
+    await hls_packager.stop()
+    stop_extraction_engine()
+    await cookie_manager.stop()
+    await library_store.stop()
+
+@app.post("/videopage_download")
+async def download_video_from_page(request: VideoDownloadRequest):
+    """Download a specific video format and wait for it to finish.
+
+    The download runs as a queued job; use POST /jobs to get the job id back
+    immediately instead of holding the connection open.
+    """
+    job = job_manager.submit(request.url, request.format_id)
+    await job.wait()
+    if job.state != JOB_COMPLETED:
+        # Failed, or interrupted by a shutdown and queued to resume
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    return job.result
+
+@app.post("/jobs", status_code=202)
+async def create_download_job(request: VideoDownloadRequest):
+    """Queue a download and return its job id immediately"""
+    job = job_manager.submit(request.url, request.format_id)
+    return {
+        "message": "Download job queued",
+        **job.to_dict()
+    }
+
+@app.post("/playlist_entries")
+async def list_playlist_entries(request: PlaylistEntriesRequest):
+    """Stream one page of a playlist or channel as NDJSON using flat extraction.
+
+    Each line is an entry (index, url, title, duration, thumbnail, ...) sent
+    as yt-dlp lists it; the videos themselves are not extracted. The last
+    line carries the page's entry count and the next_cursor to pass for the
+    following page (null after the last one).
+    """
+    limit = PLAYLIST_PAGE_SIZE if request.limit is None else request.limit
+    if limit < 1 or limit > PLAYLIST_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {PLAYLIST_MAX_PAGE_SIZE}")
+    start = 1
+    if request.cursor is not None:
+        if not request.cursor.isdigit() or int(request.cursor) < 1:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        start = int(request.cursor)
+    logger.info(f"Listing playlist entries {start}-{start + limit - 1} of {request.url}")
+
+    entries = iter_playlist_page(request.url, start, limit)
+    # Wait for the first entry so a failing URL still gets a proper status code
+    try:
+        first_entry = await entries.__anext__()
+    except StopAsyncIteration:
+        first_entry = None
+    except YtdlpError as e:
+        logger.error(f"yt-dlp stderr: {e.stderr}")
+        raise classify_ytdlp_error(e.stderr, "Failed to list playlist")
+    except subprocess.TimeoutExpired:
+        raise HTTPException(status_code=408, detail="Request timeout - playlist listing took too long")
+
+    async def entry_stream():
+        count = 0
+        error = None
+        try:
+            if first_entry is not None:
+                count += 1
+                yield json.dumps(first_entry) + "\n"
+                async for entry in entries:
+                    count += 1
+                    yield json.dumps(entry) + "\n"
+        except subprocess.TimeoutExpired:
+            error = "Playlist listing timed out"
+        finally:
+            await entries.aclose()
+        page = {"entries": count, "next_cursor": str(start + limit) if count == limit else None}
+        if error:
+            page["error"] = error
+        yield json.dumps({"page": page}) + "\n"
+
+    return StreamingResponse(
+        entry_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/playlist_download", status_code=202)
+async def download_playlist_entries(request: PlaylistDownloadRequest):
+    """Queue a download job for each selected playlist entry.
+
+    The jobs run on the download workers like any other, so at most
+    DOWNLOAD_WORKERS downloads (and DOWNLOAD_HOST_CONCURRENCY per host) run
+    at once. They are queued as background jobs, which yield to single
+    downloads submitted meanwhile. Each entry is fully extracted only when
+    its job starts.
+    """
+    urls = list(dict.fromkeys(url.strip() for url in request.urls if url.strip()))
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    jobs = job_manager.submit_many(urls, request.format_id, background=True)
+    return {
+        "message": f"Queued {len(jobs)} download jobs",
+        "jobs": [job.to_dict() for job in jobs]
+    }
+
+@app.get("/jobs")
+async def list_download_jobs(state: Optional[str] = None):
+    """List known download jobs, optionally filtered by state"""
+    jobs = job_manager.list(state)
+    return {
+        "total_jobs": len(jobs),
+        "jobs": [job.to_dict() for job in jobs],
+        "stats": job_manager.stats()
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_download_job(job_id: str):
+    """Report state, size, timings and result of a download job"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_download_job_events(job_id: str):
+    """Stream job snapshots as Server-Sent Events until the job finishes"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        queue = job.subscribe()
+        try:
+            snapshot = job.to_dict()
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            while snapshot["state"] not in FINISHED_STATES:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            yield f"event: done\ndata: {json.dumps(snapshot)}\n\n"
+        finally:
+            job.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/videopage_save_auto")
 async def save_video_to_library_auto_sync(request: VideoSaveRequest):
@@ -640,72 +957,45 @@ async def save_video_to_library_auto_sync(request: VideoSaveRequest):
         auto_age_limit = None
         
         try:
-            # Use yt-dlp to extract all video metadata
-            cmd = [
-                "yt-dlp",
-                "--dump-json",
-                "--no-download",
-                "--cookies-from-browser", "chrome",
-                "--extractor-args", "youtubetab:skip=authcheck",
-                "--no-playlist",
-                "--retries", "3",
-                "--fragment-retries", "3",
-                "--retry-sleep", "5",
-                request.video_url
-            ]
+            # Use yt-dlp to extract all video metadata (shared through the extraction cache)
+            video_data = await extract_video_info(request.video_url, timeout=30)
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            # Sync all metadata
+            video_page_name = video_data.get('title', 'Unknown Video')
+            auto_description = video_data.get('description', '')
+
+            categories = video_data.get('categories', [])
+            if categories:
+                auto_category = categories[0]
+
+            # Get tags (limit to first 15 to avoid overwhelming)
+            source_tags = video_data.get('tags', [])
+            if source_tags:
+                auto_tags = source_tags[:15]
+
+            auto_uploader = video_data.get('uploader')
+            auto_view_count = video_data.get('view_count')
+            auto_like_count = video_data.get('like_count')
+            auto_dislike_count = video_data.get('dislike_count')
+            auto_comment_count = video_data.get('comment_count')
+            auto_average_rating = video_data.get('average_rating')
+            auto_channel_id = video_data.get('channel_id')
+            auto_channel_url = video_data.get('channel_url')
+            auto_upload_date = video_data.get('upload_date')
+            auto_duration = video_data.get('duration')
+            auto_age_limit = video_data.get('age_limit')
+
+            logger.info(f"✅ Auto-synced metadata:")
+            logger.info(f"  📺 Title: {video_page_name}")
+            logger.info(f"  📝 Description: {len(auto_description)} chars")
+            logger.info(f"  📂 Category: {auto_category}")
+            logger.info(f"  🏷️ Tags: {len(auto_tags)} tags")
+            logger.info(f"  👤 Uploader: {auto_uploader}")
+            logger.info(f"  👀 Views: {auto_view_count}")
             
-            if result.returncode == 0 and result.stdout.strip():
-                # Parse the JSON output to get all metadata
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        try:
-                            video_data = json.loads(line)
-                            
-                            # Sync all metadata
-                            video_page_name = video_data.get('title', 'Unknown Video')
-                            auto_description = video_data.get('description', '')
-                            
-                            categories = video_data.get('categories', [])
-                            if categories:
-                                auto_category = categories[0]
-                            
-                            # Get tags (limit to first 15 to avoid overwhelming)
-                            source_tags = video_data.get('tags', [])
-                            if source_tags:
-                                auto_tags = source_tags[:15]
-                            
-                            auto_uploader = video_data.get('uploader')
-                            auto_view_count = video_data.get('view_count')
-                            auto_like_count = video_data.get('like_count')
-                            auto_dislike_count = video_data.get('dislike_count')
-                            auto_comment_count = video_data.get('comment_count')
-                            auto_average_rating = video_data.get('average_rating')
-                            auto_channel_id = video_data.get('channel_id')
-                            auto_channel_url = video_data.get('channel_url')
-                            auto_upload_date = video_data.get('upload_date')
-                            auto_duration = video_data.get('duration')
-                            auto_age_limit = video_data.get('age_limit')
-                            
-                            logger.info(f"✅ Auto-synced metadata:")
-                            logger.info(f"  📺 Title: {video_page_name}")
-                            logger.info(f"  📝 Description: {len(auto_description)} chars")
-                            logger.info(f"  📂 Category: {auto_category}")
-                            logger.info(f"  🏷️ Tags: {len(auto_tags)} tags")
-                            logger.info(f"  👤 Uploader: {auto_uploader}")
-                            logger.info(f"  👀 Views: {auto_view_count}")
-                            
-                            break
-                        except json.JSONDecodeError:
-                            continue
-                            
             logger.info("Successfully auto-synced all metadata from source video")
+        except YtdlpError as e:
+            logger.warning(f"Failed to fetch source video metadata: {e.stderr}")
         except Exception as e:
             logger.error(f"Error auto-syncing metadata: {str(e)}")
             raise HTTPException(
@@ -752,16 +1042,6 @@ async def save_video_to_library_auto_sync(request: VideoSaveRequest):
             if thumbnail_destination:
                 break
         
-        # Load existing library data
-        video_data = []
-        video_library_data_file = VIDEO_LIBRARY_DATA_FILE
-        if not video_library_data_file.is_absolute():
-            video_library_data_file = Path.cwd() / video_library_data_file
-        
-        if video_library_data_file.exists():
-            with open(video_library_data_file, 'r', encoding='utf-8') as f:
-                video_data = json.load(f)
-        
         # Create new entry with auto-synced metadata
         new_entry = {
             "id": video_id,
@@ -797,15 +1077,15 @@ async def save_video_to_library_auto_sync(request: VideoSaveRequest):
         
         # Add thumbnail information if available
         if thumbnail_destination and thumbnail_filename:
+            # Resized variants for the library grid, served via ?size=
+            await generate_variants(thumbnail_destination)
             new_entry["thumbnail_filename"] = thumbnail_filename
             new_entry["thumbnail_path"] = str(thumbnail_destination.relative_to(Path.cwd()))
             new_entry["thumbnail_url"] = f"/video_library/{thumbnail_filename}"
         
-        video_data.append(new_entry)
-        
-        # Save updated data
-        with open(video_library_data_file, 'w', encoding='utf-8') as f:
-            json.dump(video_data, f, indent=2, ensure_ascii=False)
+        total_videos = await library_store.save(new_entry)
+        if HLS_PACKAGING:
+            hls_packager.submit(video_id)
         
         response_data = {
             "message": "Video saved to library with auto-synced metadata",
@@ -815,7 +1095,7 @@ async def save_video_to_library_auto_sync(request: VideoSaveRequest):
             "file_size": new_entry["file_size"],
             "video_local_url": new_entry["video_local_url"],
             "video_direct_url": new_entry["video_direct_url"],
-            "total_videos_in_library": len(video_data),
+            "total_videos_in_library": total_videos,
             # Show what was auto-synced
             "auto_synced_metadata": {
                 "title": video_page_name,
@@ -943,115 +1223,86 @@ async def save_video_to_library(request: VideoSaveRequest):
         if not video_page_name or not auto_description or not auto_category or not auto_uploader:
             try:
                 logger.info(f"Fetching missing metadata from source video: {request.video_url}")
-                # Use yt-dlp to extract video metadata
-                cmd = [
-                    "yt-dlp",
-                    "--dump-json",
-                    "--no-download",
-                    "--cookies-from-browser", "chrome",
-                    "--extractor-args", "youtubetab:skip=authcheck",
-                    "--no-playlist",
-                    "--retries", "3",
-                    "--fragment-retries", "3",
-                    "--retry-sleep", "5",
-                    request.video_url
-                ]
+                # Use yt-dlp to extract video metadata (shared through the extraction cache)
+                video_data = await extract_video_info(request.video_url, timeout=30)
                 
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
+                # Sync title if not provided
+                if not video_page_name:
+                    extracted_title = video_data.get('title', 'Unknown Video')
+                    if (extracted_title.startswith('youtube video #') or 
+                        extracted_title == 'Unknown Video' or 
+                        len(extracted_title.strip()) < 3):
+                        video_id_from_data = video_data.get('id', '')
+                        if video_id_from_data:
+                            video_page_name = f"Video_{video_id_from_data}"
+                        else:
+                            video_page_name = "Unknown Video"
+                    else:
+                        video_page_name = extracted_title
+
+                # Sync description if not provided
+                if not auto_description:
+                    auto_description = video_data.get('description', '')
+                    logger.info(f"Synced description: {auto_description[:100]}...")
+
+                # Sync category if not provided
+                if not auto_category:
+                    categories = video_data.get('categories', [])
+                    if categories:
+                        auto_category = categories[0]  # Take first category
+                        logger.info(f"Synced category: {auto_category}")
+
+                # Sync other metadata if not provided
+                if not auto_uploader:
+                    auto_uploader = video_data.get('uploader')
+                    logger.info(f"Synced uploader: {auto_uploader}")
+
+                if not auto_view_count:
+                    auto_view_count = video_data.get('view_count')
+
+                if not auto_like_count:
+                    auto_like_count = video_data.get('like_count')
+
+                if not auto_dislike_count:
+                    auto_dislike_count = video_data.get('dislike_count')
+
+                if not auto_comment_count:
+                    auto_comment_count = video_data.get('comment_count')
+
+                if not auto_average_rating:
+                    auto_average_rating = video_data.get('average_rating')
+
+                if not auto_channel_id:
+                    auto_channel_id = video_data.get('channel_id')
+
+                if not auto_channel_url:
+                    auto_channel_url = video_data.get('channel_url')
+
+                if not auto_upload_date:
+                    auto_upload_date = video_data.get('upload_date')
+
+                if not auto_duration:
+                    auto_duration = video_data.get('duration')
+
+                if not auto_age_limit:
+                    auto_age_limit = video_data.get('age_limit')
+
+                # Sync tags if user didn't select any
+                if not auto_tags:
+                    source_tags = video_data.get('tags', [])
+                    if source_tags:
+                        # Take first 10 tags to avoid overwhelming
+                        auto_tags = source_tags[:10]
+                        logger.info(f"Synced {len(auto_tags)} tags from source video")
                 
-                if result.returncode == 0 and result.stdout.strip():
-                    # Parse the JSON output to get the metadata
-                    for line in result.stdout.strip().split('\n'):
-                        if line.strip():
-                            try:
-                                video_data = json.loads(line)
-                                
-                                # Sync title if not provided
-                                if not video_page_name:
-                                    extracted_title = video_data.get('title', 'Unknown Video')
-                                    if (extracted_title.startswith('youtube video #') or 
-                                        extracted_title == 'Unknown Video' or 
-                                        len(extracted_title.strip()) < 3):
-                                        video_id_from_data = video_data.get('id', '')
-                                        if video_id_from_data:
-                                            video_page_name = f"Video_{video_id_from_data}"
-                                        else:
-                                            video_page_name = "Unknown Video"
-                                    else:
-                                        video_page_name = extracted_title
-                                
-                                # Sync description if not provided
-                                if not auto_description:
-                                    auto_description = video_data.get('description', '')
-                                    logger.info(f"Synced description: {auto_description[:100]}...")
-                                
-                                # Sync category if not provided
-                                if not auto_category:
-                                    categories = video_data.get('categories', [])
-                                    if categories:
-                                        auto_category = categories[0]  # Take first category
-                                        logger.info(f"Synced category: {auto_category}")
-                                
-                                # Sync other metadata if not provided
-                                if not auto_uploader:
-                                    auto_uploader = video_data.get('uploader')
-                                    logger.info(f"Synced uploader: {auto_uploader}")
-                                
-                                if not auto_view_count:
-                                    auto_view_count = video_data.get('view_count')
-                                
-                                if not auto_like_count:
-                                    auto_like_count = video_data.get('like_count')
-                                
-                                if not auto_dislike_count:
-                                    auto_dislike_count = video_data.get('dislike_count')
-                                
-                                if not auto_comment_count:
-                                    auto_comment_count = video_data.get('comment_count')
-                                
-                                if not auto_average_rating:
-                                    auto_average_rating = video_data.get('average_rating')
-                                
-                                if not auto_channel_id:
-                                    auto_channel_id = video_data.get('channel_id')
-                                
-                                if not auto_channel_url:
-                                    auto_channel_url = video_data.get('channel_url')
-                                
-                                if not auto_upload_date:
-                                    auto_upload_date = video_data.get('upload_date')
-                                
-                                if not auto_duration:
-                                    auto_duration = video_data.get('duration')
-                                
-                                if not auto_age_limit:
-                                    auto_age_limit = video_data.get('age_limit')
-                                
-                                # Sync tags if user didn't select any
-                                if not auto_tags:
-                                    source_tags = video_data.get('tags', [])
-                                    if source_tags:
-                                        # Take first 10 tags to avoid overwhelming
-                                        auto_tags = source_tags[:10]
-                                        logger.info(f"Synced {len(auto_tags)} tags from source video")
-                                
-                                break
-                            except json.JSONDecodeError:
-                                continue
+                if not video_page_name:
+                    video_page_name = "Unknown Video"
                     
-                    if not video_page_name:
-                        video_page_name = "Unknown Video"
-                        
-                    logger.info("Successfully synced metadata from source video")
-                else:
-                    logger.warning("Failed to fetch source video metadata, using provided values")
-                    if not video_page_name:
-                        video_page_name = "Unknown Video"
+                logger.info("Successfully synced metadata from source video")
+            except YtdlpError:
+                logger.warning("Failed to fetch source video metadata, using provided values")
+                if not video_page_name:
+                    video_page_name = "Unknown Video"
             except Exception as e:
                 logger.error(f"Error fetching source video metadata: {str(e)}")
                 if not video_page_name:
@@ -1144,16 +1395,6 @@ async def save_video_to_library(request: VideoSaveRequest):
                 if thumbnail_destination:
                     break
         
-        # Load existing data or create new
-        video_data = []
-        video_library_data_file = VIDEO_LIBRARY_DATA_FILE
-        if not video_library_data_file.is_absolute():
-            video_library_data_file = Path.cwd() / video_library_data_file
-        
-        if video_library_data_file.exists():
-            with open(video_library_data_file, 'r', encoding='utf-8') as f:
-                video_data = json.load(f)
-        
         # Add new video entry (store relative paths for portability)
         new_entry = {
             "id": video_id,
@@ -1189,15 +1430,15 @@ async def save_video_to_library(request: VideoSaveRequest):
         
         # Add thumbnail information if available
         if thumbnail_destination and thumbnail_filename:
+            # Resized variants for the library grid, served via ?size=
+            await generate_variants(thumbnail_destination)
             new_entry["thumbnail_filename"] = thumbnail_filename
             new_entry["thumbnail_path"] = str(thumbnail_destination.relative_to(Path.cwd()))
             new_entry["thumbnail_url"] = f"/video_library/{thumbnail_filename}"
         
-        video_data.append(new_entry)
-        
-        # Save updated data
-        with open(video_library_data_file, 'w', encoding='utf-8') as f:
-            json.dump(video_data, f, indent=2, ensure_ascii=False)
+        total_videos = await library_store.save(new_entry)
+        if HLS_PACKAGING:
+            hls_packager.submit(video_id)
         
         response_data = {
             "message": "Video saved to library successfully",
@@ -1207,7 +1448,7 @@ async def save_video_to_library(request: VideoSaveRequest):
             "file_size": new_entry["file_size"],
             "video_local_url": new_entry["video_local_url"],
             "video_direct_url": new_entry["video_direct_url"],
-            "total_videos_in_library": len(video_data)
+            "total_videos_in_library": total_videos
         }
         
         # Add thumbnail information to response if available
@@ -1227,22 +1468,25 @@ async def list_saved_videos(
     tag: Optional[str] = None,
     category: Optional[str] = None,
     uploader: Optional[str] = None,
-    sort_by: Optional[str] = "saved_at",  # saved_at, title, view_count, like_count, duration
-    order: Optional[str] = "desc"  # asc, desc
+    sort_by: Optional[str] = "saved_at",  # saved_at, title, view_count, like_count, duration, relevance
+    order: Optional[str] = "desc",  # asc, desc
+    limit: Optional[int] = None,  # page size; omit to get every match
+    cursor: Optional[str] = None,  # next_cursor of the previous page
+    fields: Optional[str] = None,  # comma-separated entry fields to return, e.g. "id,video_page_name,thumbnail_url"
+    filtered_facets: bool = False  # also count tags/categories/uploaders over the matching videos
 ):
     """Get list of all saved videos from the library with search and filter options"""
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be a positive integer")
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
     try:
-        # Resolve relative path if needed
-        video_library_data_file = VIDEO_LIBRARY_DATA_FILE
-        if not video_library_data_file.is_absolute():
-            video_library_data_file = Path.cwd() / video_library_data_file
-        
-        # Check if data file exists
-        if not video_library_data_file.exists():
+        total_videos = await asyncio.to_thread(library_store.count)
+        if total_videos == 0:
             return {
                 "message": "No videos in library",
                 "total_videos": 0,
                 "videos": [],
+                "next_cursor": None,
                 "filters_applied": {
                     "search": search,
                     "tag": tag,
@@ -1253,74 +1497,33 @@ async def list_saved_videos(
                 }
             }
         
-        # Load video data
-        with open(video_library_data_file, 'r', encoding='utf-8') as f:
-            video_data = json.load(f)
-        
-        # Apply filters
-        filtered_videos = video_data.copy()
-        
-        # Search filter (title, description, tags)
-        if search:
-            search_lower = search.lower()
-            filtered_videos = [
-                video for video in filtered_videos
-                if (search_lower in video.get('video_page_name', '').lower() or
-                    search_lower in video.get('description', '').lower() or
-                    any(search_lower in tag.lower() for tag in video.get('selected_tags', [])))
-            ]
-        
-        # Tag filter
-        if tag:
-            filtered_videos = [
-                video for video in filtered_videos
-                if tag in video.get('selected_tags', [])
-            ]
-        
-        # Category filter
-        if category:
-            filtered_videos = [
-                video for video in filtered_videos
-                if video.get('category') == category
-            ]
-        
-        # Uploader filter
-        if uploader:
-            filtered_videos = [
-                video for video in filtered_videos
-                if video.get('uploader') == uploader
-            ]
-        
-        # Sort videos
-        reverse_order = order == "desc"
-        if sort_by == "title":
-            filtered_videos.sort(key=lambda x: x.get('video_page_name', '').lower(), reverse=reverse_order)
-        elif sort_by == "view_count":
-            filtered_videos.sort(key=lambda x: x.get('view_count', 0) or 0, reverse=reverse_order)
-        elif sort_by == "like_count":
-            filtered_videos.sort(key=lambda x: x.get('like_count', 0) or 0, reverse=reverse_order)
-        elif sort_by == "duration":
-            filtered_videos.sort(key=lambda x: x.get('duration', 0) or 0, reverse=reverse_order)
-        else:  # default: saved_at
-            filtered_videos.sort(key=lambda x: x.get('saved_at', ''), reverse=reverse_order)
-        
-        # Get unique values for filter options
-        all_tags = set()
-        all_categories = set()
-        all_uploaders = set()
-        
-        for video in video_data:
-            all_tags.update(video.get('selected_tags', []))
-            if video.get('category'):
-                all_categories.add(video.get('category'))
-            if video.get('uploader'):
-                all_uploaders.add(video.get('uploader'))
+        # Filtering, sorting and paging run as indexed queries in the library store
+        videos, next_cursor = await asyncio.to_thread(
+            library_store.query,
+            search=search,
+            tag=tag,
+            category=category,
+            uploader=uploader,
+            sort_by=sort_by,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+            fields=field_list
+        )
+        if limit is None:
+            filtered_count = len(videos)
+        else:
+            filtered_count = await asyncio.to_thread(
+                library_store.count_matching, search=search, tag=tag, category=category, uploader=uploader
+            )
         
-        return {
+        facet_counts = await asyncio.to_thread(library_store.facet_counts)
+        response = {
             "message": "Video library loaded successfully",
-            "total_videos": len(video_data),
-            "filtered_videos": len(filtered_videos),
-            "videos": filtered_videos,
+            "total_videos": total_videos,
+            "filtered_videos": filtered_count,
+            "videos": videos,
+            "next_cursor": next_cursor,
             "filters_applied": {
                 "search": search,
                 "tag": tag,
@@ -1329,43 +1532,28 @@ async def list_saved_videos(
                 "sort_by": sort_by,
                 "order": order
             },
-            "available_filters": {
-                "tags": sorted(list(all_tags)),
-                "categories": sorted(list(all_categories)),
-                "uploaders": sorted(list(all_uploaders))
-            }
+            "available_filters": {key: list(values) for key, values in facet_counts.items()},
+            "facet_counts": facet_counts
         }
+        if filtered_facets:
+            response["filtered_facet_counts"] = await asyncio.to_thread(
+                library_store.filtered_facet_counts, search=search, tag=tag, category=category, uploader=uploader
+            )
+        return response
         
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Invalid video library data file")
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+    except sqlite3.DatabaseError:
+        raise HTTPException(status_code=500, detail="Invalid video library database")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/videopage_file/{video_id}")
 @app.head("/videopage_file/{video_id}")
-async def get_video_file(video_id: str):
+async def get_video_file(video_id: str, request: Request):
     """Serve a video file from the library by video ID"""
     try:
-        # Resolve relative path if needed
-        video_library_data_file = VIDEO_LIBRARY_DATA_FILE
-        if not video_library_data_file.is_absolute():
-            video_library_data_file = Path.cwd() / video_library_data_file
-        
-        # Check if data file exists
-        if not video_library_data_file.exists():
-            raise HTTPException(status_code=404, detail="Video library not found")
-        
-        # Load video data
-        with open(video_library_data_file, 'r', encoding='utf-8') as f:
-            video_data = json.load(f)
-        
-        # Find the video by ID
-        video_entry = None
-        for video in video_data:
-            if video.get('id') == video_id:
-                video_entry = video
-                break
-        
+        video_entry = await asyncio.to_thread(library_store.get, video_id)
         if not video_entry:
             raise HTTPException(status_code=404, detail="Video not found")
         
@@ -1376,21 +1564,98 @@ async def get_video_file(video_id: str):
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="Video file not found on disk")
         
-        # Return the video file
-        return FileResponse(
-            path=file_path,
+        # Return the video file, honouring Range requests so the player can seek.
+        # Not immutable: the id URL follows the entry when its file is replaced
+        # (e.g. by the faststart backfill), so caches revalidate via the ETag.
+        return RangeFileResponse(
+            file_path,
+            request,
             filename=video_entry['library_file_name'],
             media_type='video/mp4'
         )
         
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Invalid video library data file")
+    except HTTPException:
+        raise
+    except sqlite3.DatabaseError:
+        raise HTTPException(status_code=500, detail="Invalid video library database")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/videopage_delete")
+async def delete_videos_from_library(request: VideoDeleteRequest):
+    """Remove videos from the library and delete their files"""
+    try:
+        removed = await library_store.remove(request.ids)
+    except sqlite3.DatabaseError:
+        raise HTTPException(status_code=500, detail="Invalid video library database")
+    
+    for entry in removed:
+        paths = []
+        for key in ("file_path", "thumbnail_path"):
+            if not entry.get(key):
+                continue
+            file_path = Path(entry[key])
+            if not file_path.is_absolute():
+                file_path = Path.cwd() / file_path
+            paths.append(file_path)
+            if key == "thumbnail_path":
+                paths.extend(variant_paths(file_path))
+        for file_path in paths:
+            try:
+                file_path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete {file_path}: {e}")
+    
+    for entry in removed:
+        hls_packager.remove(entry["id"])
+    
+    removed_ids = [entry["id"] for entry in removed]
+    return {
+        "message": f"Deleted {len(removed_ids)} video(s) from library",
+        "deleted_ids": removed_ids,
+        "not_found": [video_id for video_id in request.ids if video_id not in removed_ids],
+        "total_videos_in_library": await asyncio.to_thread(library_store.count)
+    }
+
+@app.post("/videopage_hls/{video_id}", status_code=202)
+async def package_video_hls(video_id: str):
+    """Queue HLS packaging of a library video (also when HLS_PACKAGING is off)"""
+    video_entry = await asyncio.to_thread(library_store.get, video_id)
+    if not video_entry:
+        raise HTTPException(status_code=404, detail="Video not found")
+    queued = hls_packager.submit(video_id)
+    return {
+        "message": "HLS packaging queued" if queued else "HLS packaging already in progress",
+        "video_id": video_id,
+        "status": hls_packager.status.get(video_id)
+    }
+
+@app.get("/videopage_hls/{video_id}/{filename}")
+@app.head("/videopage_hls/{video_id}/{filename}")
+async def get_video_hls_file(video_id: str, filename: str, request: Request):
+    """Serve the HLS playlists and segments of a packaged library video"""
+    video_entry = await asyncio.to_thread(library_store.get, video_id)
+    if not video_entry or not video_entry.get("hls_url") or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="HLS package not found")
+    
+    file_path = hls_packager.output_dir(video_id) / filename
+    if not file_path.is_absolute():
+        file_path = Path.cwd() / file_path
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="HLS file not found")
+    
+    return RangeFileResponse(file_path, request, media_type=media_type_for(file_path))
+
 @app.get("/video_library/{filename}")
 @app.head("/video_library/{filename}")
-async def serve_video_library_file(filename: str):
+async def serve_video_library_file(
+    filename: str,
+    request: Request,
+    size: Optional[int] = None,  # thumbnails: display width in pixels, served from the nearest variant
+    image_format: Optional[str] = Query(None, alias="format")  # thumbnails: webp (default) or jpg
+):
     """Serve video files and images directly from the video library folder"""
     # Resolve relative path if needed
     library_dir = VIDEO_LIBRARY_DIR
@@ -1401,38 +1666,48 @@ async def serve_video_library_file(filename: str):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Determine media type based on file extension
-    file_extension = file_path.suffix.lower()
+    if image_format is not None and image_format not in THUMBNAIL_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(THUMBNAIL_FORMATS)}")
     
-    # Video files
-    if file_extension == ".mp4":
-        media_type = "video/mp4"
-    elif file_extension == ".webm":
-        media_type = "video/webm"
-    elif file_extension == ".avi":
-        media_type = "video/x-msvideo"
-    elif file_extension == ".mov":
-        media_type = "video/quicktime"
-    elif file_extension == ".mkv":
-        media_type = "video/x-matroska"
-    # Image files (thumbnails)
-    elif file_extension in [".jpg", ".jpeg"]:
-        media_type = "image/jpeg"
-    elif file_extension == ".png":
-        media_type = "image/png"
-    elif file_extension == ".webp":
-        media_type = "image/webp"
-    else:
-        media_type = "application/octet-stream"  # Default for unknown types
+    immutable = is_content_addressed(filename)
+    if size is not None and file_path.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp"):
+        variant = resolve_variant(file_path, size, image_format)
+        if variant is not None:
+            file_path = variant
+        else:
+            # Not generated (yet): send the original without pinning it to this URL
+            immutable = False
     
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type=media_type
+    return RangeFileResponse(
+        file_path,
+        request,
+        immutable=immutable,
+        filename=file_path.name,
+        media_type=media_type_for(file_path)
     )
 
+@app.post("/video_library/thumbnails/backfill")
+async def backfill_thumbnail_variants():
+    """Generate missing thumbnail variants for videos saved before they existed"""
+    try:
+        entries, _ = await asyncio.to_thread(library_store.query, fields=["thumbnail_path"])
+    except sqlite3.DatabaseError:
+        raise HTTPException(status_code=500, detail="Invalid video library database")
+    
+    thumbnail_paths = []
+    for entry in entries:
+        if not entry.get("thumbnail_path"):
+            continue
+        thumbnail_path = Path(entry["thumbnail_path"])
+        if not thumbnail_path.is_absolute():
+            thumbnail_path = Path.cwd() / thumbnail_path
+        thumbnail_paths.append(thumbnail_path)
+    
+    stats = await backfill_variants(thumbnail_paths)
+    return {"message": "Thumbnail variants backfilled", **stats}
+
 @app.get("/download/{filename}")
-async def download_file(filename: str):
+async def download_file(filename: str, request: Request):
     """Download processed file"""
     # Resolve relative path if needed
     outputs_dir = OUTPUTS_DIR
@@ -1443,8 +1718,9 @@ async def download_file(filename: str):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=file_path,
+    return RangeFileResponse(
+        file_path,
+        request,
         filename=filename,
         media_type='application/octet-stream'
     )
@@ -0,0 +1,64 @@
+"""Stream information of media files.
+
+ffprobe is not always installed next to ffmpeg, so the codecs, frame size
+and duration are read from the stream summary ``ffmpeg -i`` prints.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from process_runner import run_process
+
+PROBE_TIMEOUT = 60
+
+# Codecs stream-copied into MP4 (merges) and fragmented-MP4 HLS. Video is
+# copied whenever the container can hold it, as re-encoding it costs far
+# more than the download. Audio is limited to what every major browser
+# plays; anything else (Vorbis, AC-3, FLAC) is re-encoded to AAC, which is cheap.
+MP4_VIDEO_CODECS = ("h264", "hevc", "av1", "vp9")
+MP4_AUDIO_CODECS = ("aac", "mp3", "opus")
+
+_STREAM_PATTERN = re.compile(r"Stream #\d+:\d+.*?: (Video|Audio): (\w+)(.*)")
+_SIZE_PATTERN = re.compile(r"\b(\d{2,5})x(\d{2,5})\b")
+_DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+@dataclass
+class MediaInfo:
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    duration: Optional[float] = None
+
+
+def parse_ffmpeg_info(output: str) -> MediaInfo:
+    """First video and audio stream of an ``ffmpeg -i`` stream summary"""
+    info = MediaInfo()
+    for line in output.splitlines():
+        if info.duration is None:
+            duration = _DURATION_PATTERN.search(line)
+            if duration:
+                hours, minutes, seconds = duration.groups()
+                info.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        match = _STREAM_PATTERN.search(line)
+        if not match:
+            continue
+        kind, codec, rest = match.groups()
+        if kind == "Video" and info.video_codec is None:
+            info.video_codec = codec
+            size = _SIZE_PATTERN.search(rest)
+            if size:
+                info.width, info.height = int(size.group(1)), int(size.group(2))
+        elif kind == "Audio" and info.audio_codec is None:
+            info.audio_codec = codec
+    return info
+
+
+async def probe_media(path: Path, tool: str = "ffmpeg_probe") -> MediaInfo:
+    """Codecs, frame size and duration of a media file"""
+    # Without an output file ffmpeg exits with an error after the summary
+    result = await run_process(tool, ["ffmpeg", "-hide_banner", "-i", str(path)], timeout=PROBE_TIMEOUT)
+    return parse_ffmpeg_info(result.stderr)
@@ -0,0 +1,272 @@
+"""File responses with HTTP Range support for library media.
+
+``RangeFileResponse`` extends Starlette's ``FileResponse`` (which on the
+pinned Starlette version always sends the whole file) with single and
+multiple byte ranges, ``Accept-Ranges``, ``If-Range`` and 416 handling, so
+the browser's video element can seek without downloading the whole file.
+
+Responses carry a strong ETag and Last-Modified and answer If-None-Match /
+If-Modified-Since with 304. Files under ``/video_library`` are named after
+their video's UUID and are never rewritten in place (a rewrite such as the
+faststart remux writes a new name), so responses for those names can also be
+marked immutable. ``/videopage_file/{id}`` follows the entry to whatever file
+it points at and is only revalidated.
+
+File bodies are streamed in 1 MB chunks read in a worker thread, so a
+large file never blocks the event loop. (uvicorn does not offer the ASGI
+``zerocopysend`` extension, so there is no sendfile path.)
+"""
+
+import os
+import secrets
+import stat
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+# Bytes read per chunk
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Requests for more ranges than this get the whole file instead
+MAX_RANGES = 16
+
+# Cache-Control for files whose name identifies their content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_TYPES = {
+    # Video files
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".avi": "video/x-msvideo",
+    ".mov": "video/quicktime",
+    ".mkv": "video/x-matroska",
+    # Image files (thumbnails)
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    # HLS playlists and segments
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+}
+
+# Headers a 304 repeats from the full response (RFC 9110 section 15.4.5)
+NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "expires", "vary", "content-location")
+
+
+def media_type_for(path) -> str:
+    """Media type for a library file from its extension"""
+    return MEDIA_TYPES.get(Path(path).suffix.lower(), "application/octet-stream")
+
+
+def is_content_addressed(filename: str) -> bool:
+    """Whether a library file name starts with a video UUID (and so never changes)"""
+    try:
+        uuid.UUID(filename[:36])
+    except ValueError:
+        return False
+    return True
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Byte ranges (inclusive) requested by a Range header.
+
+    Returns None when the header is malformed or not in bytes (the whole file
+    is served), and an empty list when no range is satisfiable (416).
+    Overlapping and adjacent ranges are merged.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_text, dash, end_text = part.partition("-")
+        if not dash:
+            return None
+        try:
+            if start_text.strip():
+                start = int(start_text)
+                end = int(end_text) if end_text.strip() else size - 1
+            else:
+                # Suffix range: the last N bytes
+                suffix = int(end_text)
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        if start < 0 or end < start:
+            return None
+        ranges.append((start, min(end, size - 1)))
+
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that honours Range, If-Range and conditional request headers"""
+
+    def __init__(self, path, request: Request, immutable: bool = False, **kwargs) -> None:
+        kwargs.setdefault("method", request.method)
+        super().__init__(path, **kwargs)
+        self.range_header = request.headers.get("range")
+        self.if_range = request.headers.get("if-range")
+        self.if_none_match = request.headers.get("if-none-match")
+        self.if_modified_since = request.headers.get("if-modified-since")
+        self.headers["accept-ranges"] = "bytes"
+        if immutable:
+            self.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        # Starlette's ETag is an unquoted hash; use a quoted strong validator
+        # so If-Range and If-None-Match comparisons work as specified.
+        self.headers.setdefault("content-length", str(stat_result.st_size))
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"')
+
+    def _not_modified(self) -> bool:
+        """Whether If-None-Match / If-Modified-Since allow a 304"""
+        if self.if_none_match is not None:
+            # Weak comparison (RFC 9110 section 13.1.2)
+            etag = self.headers["etag"]
+            candidates = [tag.strip() for tag in self.if_none_match.split(",")]
+            return "*" in candidates or any(
+                tag.removeprefix("W/") == etag for tag in candidates
+            )
+        if self.if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(self.if_modified_since)
+                modified = parsedate_to_datetime(self.headers["last-modified"])
+            except (TypeError, ValueError):
+                return False
+            return since.tzinfo is not None and modified <= since
+        return False
+
+    def _range_applies(self) -> bool:
+        """If-Range: only honour the Range header if the file has not changed"""
+        if not self.range_header:
+            return False
+        if self.if_range is None:
+            return True
+        if_range = self.if_range.strip()
+        return if_range in (self.headers.get("etag"), self.headers.get("last-modified"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(self.stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(self.stat_result)
+        size = self.stat_result.st_size
+
+        if self._not_modified():
+            headers = [
+                (key.encode("latin-1"), value.encode("latin-1"))
+                for key, value in self.headers.items()
+                if key in NOT_MODIFIED_HEADERS
+            ]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        ranges = parse_range_header(self.range_header, size) if self._range_applies() else None
+        if ranges is not None and len(ranges) > MAX_RANGES:
+            ranges = None
+
+        if ranges == []:
+            await self._send_start(send, 416, {
+                "content-range": f"bytes */{size}",
+                "content-length": "0",
+            })
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ranges is None:
+            await self._send_start(send, self.status_code, {})
+            parts: List[Tuple[bytes, int, int]] = [(b"", 0, size)]
+            trailer = b""
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            await self._send_start(send, 206, {
+                "content-range": f"bytes {start}-{end}/{size}",
+                "content-length": str(end - start + 1),
+            })
+            parts = [(b"", start, end - start + 1)]
+            trailer = b""
+        else:
+            boundary = secrets.token_hex(16)
+            parts = [
+                (
+                    (
+                        f"--{boundary}\r\n"
+                        f"Content-Type: {self.media_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                    ).encode("latin-1"),
+                    start,
+                    end - start + 1,
+                )
+                for start, end in ranges
+            ]
+            # Every part after the first starts on a new line
+            parts = [parts[0]] + [(b"\r\n" + head, start, count) for head, start, count in parts[1:]]
+            trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            length = sum(len(head) + count for head, _, count in parts) + len(trailer)
+            await self._send_start(send, 206, {
+                "content-type": f"multipart/byteranges; boundary={boundary}",
+                "content-length": str(length),
+            })
+
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as file:
+            for head, start, count in parts:
+                if head:
+                    await send({"type": "http.response.body", "body": head, "more_body": True})
+                await self._stream(file, start, count, send)
+        await send({"type": "http.response.body", "body": trailer, "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+    async def _send_start(self, send: Send, status: int, overrides: dict) -> None:
+        headers = dict(self.headers)
+        headers.update(overrides)
+        if status == 416:
+            headers.pop("content-disposition", None)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        })
+
+    @staticmethod
+    async def _stream(file: BinaryIO, start: int, count: int, send: Send) -> None:
+        file.seek(start)
+        remaining = count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(file.read, min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
@@ -0,0 +1,156 @@
+"""Merging separately downloaded video and audio streams into one MP4.
+
+The inputs are probed first. Video is stream-copied whenever MP4 can hold
+its codec, as every merge used to do; only codecs the container cannot take
+(e.g. VP8) are transcoded to H.264, and HEVC only when MERGE_TRANSCODE_HEVC
+asks for it. Audio is copied when browsers can play it, which covers the
+usual ``bestaudio[ext=m4a]`` AAC track, and re-encoded to AAC otherwise
+(e.g. Vorbis from WebM). Transcodes get a timeout that grows with the input's
+duration. If ffmpeg still rejects a copy, the merge is retried once with the
+audio re-encoded, the way every merge used to run.
+"""
+
+import logging
+import subprocess
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from config import MERGE_TRANSCODE_HEVC
+from faststart import FASTSTART_ARGS
+from media_probe import MP4_AUDIO_CODECS, MP4_VIDEO_CODECS, probe_media
+from process_runner import stream_process
+from progress import FFMPEG_PROGRESS_ARGS
+
+logger = logging.getLogger(__name__)
+
+# Stream copies are bounded by disk speed; transcodes get extra time per
+# second of input (libx264 veryfast can fall below real time on small CPUs)
+MERGE_TIMEOUT = 120
+VIDEO_TRANSCODE_SECONDS_PER_SECOND = 3
+AUDIO_TRANSCODE_SECONDS_PER_SECOND = 0.25
+# Used for a transcode when the input duration is unknown
+MAX_TRANSCODE_TIMEOUT = 4 * 3600
+
+
+@dataclass
+class MergePlan:
+    video_codec: Optional[str]
+    audio_codec: Optional[str]
+    copy_video: bool
+    copy_audio: bool
+
+    def codec_args(self) -> list:
+        args = ["-c:v", "copy"] if self.copy_video else ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20"]
+        args += ["-c:a", "copy"] if self.copy_audio else ["-c:a", "aac", "-b:a", "192k"]
+        return args
+
+    @property
+    def decision(self) -> str:
+        if self.copy_video and self.copy_audio:
+            return "copy"
+        if self.copy_video:
+            return "transcode_audio"
+        if self.copy_audio:
+            return "transcode_video"
+        return "transcode"
+
+
+def merge_timeout(plan: MergePlan, duration: Optional[float]) -> float:
+    """Seconds a merge may run, scaled with the input duration for transcodes"""
+    if plan.copy_video and plan.copy_audio:
+        return MERGE_TIMEOUT
+    if not duration:
+        return MAX_TRANSCODE_TIMEOUT
+    per_second = 0 if plan.copy_video else VIDEO_TRANSCODE_SECONDS_PER_SECOND
+    per_second += 0 if plan.copy_audio else AUDIO_TRANSCODE_SECONDS_PER_SECOND
+    return MERGE_TIMEOUT + duration * per_second
+
+
+def plan_merge(
+    video_codec: Optional[str],
+    audio_codec: Optional[str],
+    transcode_hevc: bool = MERGE_TRANSCODE_HEVC
+) -> MergePlan:
+    """Copy the video unless MP4 cannot hold it and the audio if browsers play it"""
+    copy_video = video_codec is None or video_codec in MP4_VIDEO_CODECS
+    if transcode_hevc and video_codec == "hevc":
+        copy_video = False
+    return MergePlan(
+        video_codec=video_codec,
+        audio_codec=audio_codec,
+        copy_video=copy_video,
+        copy_audio=audio_codec in MP4_AUDIO_CODECS
+    )
+
+
+@dataclass
+class MergeResult:
+    process: subprocess.CompletedProcess
+    plan: MergePlan
+    seconds: float
+    retried: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.process.returncode == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self.plan),
+            "decision": self.plan.decision,
+            "seconds": round(self.seconds, 3),
+            "retried": self.retried,
+        }
+
+
+async def _run_merge(
+    video_file: Path,
+    audio_file: Path,
+    output: Path,
+    plan: MergePlan,
+    duration: Optional[float],
+    on_line: Callable[[str], None]
+) -> subprocess.CompletedProcess:
+    cmd = [
+        "ffmpeg",
+        "-i", str(video_file),
+        "-i", str(audio_file),
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        *plan.codec_args(),
+        "-shortest",  # Match the shortest stream duration
+        *FASTSTART_ARGS,  # Index at the front so playback starts before the whole file loads
+        *FFMPEG_PROGRESS_ARGS,
+        "-y",  # Overwrite output file
+        str(output)
+    ]
+    return await stream_process("ffmpeg_merge", cmd, timeout=merge_timeout(plan, duration), on_line=on_line)
+
+
+async def merge_streams(
+    video_file: Path,
+    audio_file: Path,
+    output: Path,
+    on_line: Callable[[str], None] = lambda line: None
+) -> MergeResult:
+    """Merge a video-only and an audio-only file into an MP4 at ``output``"""
+    started = time.perf_counter()
+    video_info = await probe_media(video_file)
+    audio_info = await probe_media(audio_file)
+    plan = plan_merge(video_info.video_codec, audio_info.audio_codec)
+    duration = video_info.duration or audio_info.duration
+    process = await _run_merge(video_file, audio_file, output, plan, duration, on_line)
+    retried = False
+    if process.returncode != 0 and plan.copy_audio:
+        logger.warning(f"Stream-copy merge failed, re-encoding audio: {process.stderr}")
+        plan = replace(plan, copy_audio=False)
+        process = await _run_merge(video_file, audio_file, output, plan, duration, on_line)
+        retried = True
+    result = MergeResult(process, plan, time.perf_counter() - started, retried)
+    logger.info(
+        f"Merged {video_file.name} ({plan.video_codec}) + {audio_file.name} ({plan.audio_codec}): "
+        f"{plan.decision} in {result.seconds:.2f}s"
+    )
+    return result
@@ -0,0 +1,94 @@
+"""Playlist and channel enumeration with flat extraction.
+
+Every other yt-dlp call passes ``--no-playlist``. Listing a playlist or
+channel instead runs yt-dlp with ``--flat-playlist``, which only reads the
+site's listing pages and reports each entry's URL and basic metadata without
+extracting the video itself. ``--playlist-items`` limits a run to one page of
+entries and ``--lazy-playlist`` makes yt-dlp print them as it reads the
+listing, so a page of a large channel arrives entry by entry and later pages
+are never fetched unless asked for.
+
+Full extraction is left to the entries that get analyzed or downloaded.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict
+
+from cookie_manager import cookie_manager
+from extraction import YTDLP_COMMON_ARGS, YtdlpError
+from process_runner import stream_process
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_ARGS = [arg for arg in YTDLP_COMMON_ARGS if arg != "--no-playlist"] + ["--yes-playlist"]
+
+PLAYLIST_PAGE_TIMEOUT = 300
+
+
+def flat_entry(info: Dict[str, Any], fallback_index: int) -> Dict[str, Any]:
+    """Client-facing fields of one flat playlist entry"""
+    thumbnails = info.get("thumbnails") or []
+    return {
+        "index": info.get("playlist_index") or fallback_index,
+        "id": info.get("id"),
+        "url": info.get("webpage_url") or info.get("url"),
+        "title": info.get("title"),
+        "duration": info.get("duration"),
+        "uploader": info.get("uploader") or info.get("channel"),
+        "view_count": info.get("view_count"),
+        "thumbnail": info.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None),
+        "live_status": info.get("live_status"),
+        "playlist_title": info.get("playlist_title") or info.get("playlist"),
+    }
+
+
+async def iter_playlist_page(url: str, start: int, limit: int) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the flat entries ``start`` (1-based) to ``start + limit - 1`` of a playlist.
+
+    Entries are yielded as yt-dlp prints them. Raises ``YtdlpError`` when
+    yt-dlp fails before producing any entry and ``subprocess.TimeoutExpired``
+    when the page takes longer than the timeout.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    received = 0
+
+    def on_line(line: str) -> None:
+        if not line.startswith("{"):
+            return  # stderr warnings and progress
+        try:
+            info = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        if isinstance(info, dict):
+            queue.put_nowait(info)
+
+    with cookie_manager.cookie_args() as cookie_args:
+        cmd = [
+            "yt-dlp",
+            "--flat-playlist",
+            "--lazy-playlist",
+            "--dump-json",
+            "--playlist-items", f"{start}:{start + limit - 1}",
+            *PLAYLIST_ARGS,
+            *cookie_args,
+            url
+        ]
+        logger.info(f"Running command: {' '.join(cmd)}")
+        task = asyncio.ensure_future(stream_process("ytdlp_analyze", cmd, PLAYLIST_PAGE_TIMEOUT, on_line))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (info := await queue.get()) is not None:
+                yield flat_entry(info, start + received)
+                received += 1
+            result = await task
+        finally:
+            # Stops yt-dlp when the client goes away mid-page
+            task.cancel()
+
+    if result.returncode != 0:
+        cookie_manager.request_refresh(result.stderr)
+        if not received:
+            raise YtdlpError(result.stderr)
+        logger.warning(f"Playlist page of {url} ended early after {received} entries: {result.stderr.strip()}")
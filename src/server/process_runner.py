@@ -0,0 +1,143 @@
+"""Non-blocking execution of external tools (yt-dlp, ffmpeg).
+
+Every process is started with asyncio so the event loop keeps serving other
+requests while it runs, and each tool has its own concurrency limit taken
+from ``config.TOOL_CONCURRENCY``.
+"""
+
+import asyncio
+import logging
+import subprocess
+from collections import deque
+from typing import Callable, Deque, Dict, List
+
+from config import TOOL_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_CONCURRENCY = 4
+
+# Streamed output is read in chunks of this size; only the last lines are kept
+STREAM_CHUNK_SIZE = 64 * 1024
+OUTPUT_TAIL_LINES = 200
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_semaphore(tool: str) -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent processes for a tool"""
+    semaphore = _semaphores.get(tool)
+    if semaphore is None:
+        limit = max(1, TOOL_CONCURRENCY.get(tool, DEFAULT_TOOL_CONCURRENCY))
+        semaphore = asyncio.Semaphore(limit)
+        _semaphores[tool] = semaphore
+    return semaphore
+
+
+async def _terminate(process: asyncio.subprocess.Process) -> None:
+    """Kill a running process and reap it"""
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+async def run_process(tool: str, cmd: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """Run a command without blocking the event loop.
+
+    Waits for a free slot of the given tool first; the timeout only covers the
+    process run itself. Mirrors ``subprocess.run(capture_output=True, text=True)``:
+    returns a ``CompletedProcess`` with decoded output and raises
+    ``subprocess.TimeoutExpired`` when the timeout is exceeded.
+    """
+    async with _get_semaphore(tool):
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{tool} process timed out after {timeout}s: {cmd[0]}")
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        finally:
+            # Also covers cancellation, e.g. when the client disconnects
+            await _terminate(process)
+
+    return subprocess.CompletedProcess(
+        cmd,
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace')
+    )
+
+
+async def _pump_lines(stream: asyncio.StreamReader, on_line: Callable[[str], None], tail: Deque[str]) -> None:
+    """Feed a process stream to a callback line by line as output arrives.
+
+    Both ``\\n`` and ``\\r`` terminate a line so carriage-return progress bars are
+    seen as they update. Only a bounded tail of the output is retained.
+    """
+    pending = b""
+    while True:
+        chunk = await stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk.replace(b"\r", b"\n")
+        *lines, pending = pending.split(b"\n")
+        for raw_line in lines:
+            if raw_line:
+                line = raw_line.decode('utf-8', errors='replace')
+                tail.append(line)
+                on_line(line)
+    if pending:
+        line = pending.decode('utf-8', errors='replace')
+        tail.append(line)
+        on_line(line)
+
+
+async def stream_process(
+    tool: str,
+    cmd: List[str],
+    timeout: float,
+    on_line: Callable[[str], None]
+) -> subprocess.CompletedProcess:
+    """Run a command like ``run_process`` but hand each output line to ``on_line``.
+
+    Output is parsed incrementally instead of being buffered in memory; the
+    returned ``CompletedProcess`` only carries the last ``OUTPUT_TAIL_LINES``
+    lines of stdout and stderr, enough for error reporting.
+    """
+    stdout_tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    stderr_tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+
+    async with _get_semaphore(tool):
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    _pump_lines(process.stdout, on_line, stdout_tail),
+                    _pump_lines(process.stderr, on_line, stderr_tail),
+                    process.wait()
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"{tool} process timed out after {timeout}s: {cmd[0]}")
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        finally:
+            await _terminate(process)
+
+    return subprocess.CompletedProcess(
+        cmd,
+        process.returncode,
+        "\n".join(stdout_tail),
+        "\n".join(stderr_tail)
+    )
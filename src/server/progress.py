@@ -0,0 +1,135 @@
+"""Incremental parsing of yt-dlp and ffmpeg progress output."""
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+YTDLP_PROGRESS_PREFIX = "[vt-progress]"
+
+# Machine readable progress line printed by yt-dlp for every update
+YTDLP_PROGRESS_TEMPLATE = (
+    "download:" + YTDLP_PROGRESS_PREFIX + " "
+    "%(progress.status)s|%(progress.downloaded_bytes)s|%(progress.total_bytes)s|"
+    "%(progress.total_bytes_estimate)s|%(progress.speed)s|%(progress.eta)s|"
+    "%(progress.fragment_index)s|%(progress.fragment_count)s|%(info.format_id)s"
+)
+
+YTDLP_PROGRESS_ARGS = [
+    "--newline",
+    "--progress-template", YTDLP_PROGRESS_TEMPLATE,
+]
+
+# Arguments making ffmpeg print key=value progress blocks on stdout
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+# Minimum delay between two progress notifications of the same phase
+PROGRESS_NOTIFY_INTERVAL = 0.25
+
+
+def _number(value: str) -> Optional[float]:
+    """Parse a numeric template field; yt-dlp prints NA for missing values"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_ytdlp_progress(line: str) -> Optional[Dict[str, Any]]:
+    """Parse one line printed through YTDLP_PROGRESS_TEMPLATE"""
+    if not line.startswith(YTDLP_PROGRESS_PREFIX):
+        return None
+    fields = line[len(YTDLP_PROGRESS_PREFIX):].strip().split("|")
+    if len(fields) != 9:
+        return None
+    status, downloaded, total, estimate, speed, eta, fragment_index, fragment_count, format_id = fields
+    fragment_index = _number(fragment_index)
+    fragment_count = _number(fragment_count)
+    return {
+        "status": status,
+        "downloaded_bytes": int(_number(downloaded) or 0),
+        "total_bytes": _number(total) or _number(estimate),
+        "speed": _number(speed),
+        "eta": _number(eta),
+        "fragment_index": int(fragment_index) if fragment_index is not None else None,
+        "fragment_count": int(fragment_count) if fragment_count is not None else None,
+        "format_id": format_id if format_id != "NA" else None,
+    }
+
+
+class DownloadProgressTracker:
+    """Accumulate progress of a download across its streams and the merge.
+
+    Feed it output lines as they arrive; it calls ``notify`` with a progress
+    snapshot at most every PROGRESS_NOTIFY_INTERVAL seconds, and immediately
+    whenever the phase changes.
+    """
+
+    def __init__(self, notify: Callable[[Dict[str, Any]], None]):
+        self.notify = notify
+        self.started_at = time.time()
+        self.phase = "downloading"
+        self.finished_bytes = 0
+        self.current: Dict[str, Any] = {}
+        self.merge_out_time: Optional[float] = None
+        self.merge_speed: Optional[str] = None
+        self._last_notified = 0.0
+
+    @property
+    def bytes_downloaded(self) -> int:
+        return self.finished_bytes + self.current.get("downloaded_bytes", 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.time() - self.started_at
+        total = self.current.get("total_bytes")
+        downloaded = self.current.get("downloaded_bytes", 0)
+        return {
+            "phase": self.phase,
+            "format_id": self.current.get("format_id"),
+            "percent": round(downloaded / total * 100, 1) if total else None,
+            "downloaded_bytes": downloaded,
+            "total_bytes": int(total) if total else None,
+            "bytes_downloaded": self.bytes_downloaded,
+            "speed": self.current.get("speed"),
+            "eta": self.current.get("eta"),
+            "fragment_index": self.current.get("fragment_index"),
+            "fragment_count": self.current.get("fragment_count"),
+            # Average throughput over the whole job, across all streams
+            "average_speed": round(self.bytes_downloaded / elapsed, 1) if elapsed > 0 else None,
+            "merge_out_time": self.merge_out_time,
+            "merge_speed": self.merge_speed,
+        }
+
+    def set_phase(self, phase: str) -> None:
+        if phase != self.phase:
+            self.phase = phase
+            self._emit(force=True)
+
+    def feed_ytdlp_line(self, line: str) -> None:
+        progress = parse_ytdlp_progress(line)
+        if progress is None:
+            if line.startswith("[Merger]"):
+                self.set_phase("merging")
+            return
+        if progress["status"] == "finished":
+            self.finished_bytes += progress["downloaded_bytes"] or int(progress["total_bytes"] or 0)
+            self.current = {}
+            self._emit(force=True)
+            return
+        self.current = progress
+        self._emit()
+
+    def feed_ffmpeg_line(self, line: str) -> None:
+        key, _, value = line.partition("=")
+        if key == "out_time_us":
+            out_time = _number(value)
+            if out_time is not None:
+                self.merge_out_time = round(out_time / 1_000_000, 2)
+        elif key == "speed":
+            self.merge_speed = value.strip()
+        elif key == "progress":
+            self._emit(force=value.strip() == "end")
+
+    def _emit(self, force: bool = False) -> None:
+        now = time.time()
+        if force or now - self._last_notified >= PROGRESS_NOTIFY_INTERVAL:
+            self._last_notified = now
+            self.notify(self.snapshot())
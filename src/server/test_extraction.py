@@ -0,0 +1,22 @@
+"""Unit tests for extraction: mapping yt-dlp errors to HTTP errors."""
+
+import pytest
+
+from extraction import classify_ytdlp_error
+
+
+@pytest.mark.parametrize("stderr, status", [
+    ("ERROR: HTTP Error 429: Too Many Requests", 429),
+    ("ERROR: [youtube] abc: Sign in to confirm your age", 403),
+    ("ERROR: [youtube] abc: Video unavailable", 404),
+    ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access", 404),
+    ("ERROR: [youtube] abc: This live event will begin in 3 hours.", 400),
+])
+def test_known_errors(stderr, status):
+    assert classify_ytdlp_error(stderr, "Failed to analyze video").status_code == status
+
+
+def test_other_errors_keep_the_output():
+    error = classify_ytdlp_error("ERROR: Unsupported URL: https://example.com", "Failed to analyze video")
+    assert error.status_code == 400
+    assert error.detail == "Failed to analyze video: ERROR: Unsupported URL: https://example.com"
@@ -0,0 +1,48 @@
+"""Unit tests for extraction_cache: URL aliases, TTL and the disk tier."""
+
+from extraction_cache import ExtractionCache, normalize_url
+
+SHORT_URL = "https://youtu.be/abc123?si=share"
+WEBPAGE_URL = "https://www.youtube.com/watch?v=abc123"
+INFO = {"id": "abc123", "extractor_key": "Youtube", "webpage_url": WEBPAGE_URL, "title": "Video"}
+
+
+def test_normalize_url_drops_tracking_and_host_variants():
+    assert normalize_url("http://m.youtube.com/watch?v=abc123&utm_source=x&feature=share") == WEBPAGE_URL.replace("www.", "")
+    assert normalize_url("https://example.com/video/") == "https://example.com/video"
+
+
+def test_aliases_share_one_entry(tmp_path):
+    cache = ExtractionCache(disk_dir=tmp_path)
+    cache.put(SHORT_URL, INFO)
+    assert cache.get(WEBPAGE_URL) == INFO
+    assert cache.stats()["entries"] == 1
+
+
+def test_expired_entries_are_missed():
+    cache = ExtractionCache(ttl=0)
+    cache.put(SHORT_URL, INFO)
+    assert cache.get(SHORT_URL) is None
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ExtractionCache(disk_dir=tmp_path).put(SHORT_URL, INFO)
+    cache = ExtractionCache(disk_dir=tmp_path)
+    assert cache.get(WEBPAGE_URL) == INFO
+    assert cache.disk_hits == 1
+
+
+def test_invalidate_removes_every_disk_alias(tmp_path):
+    cache = ExtractionCache(disk_dir=tmp_path)
+    cache.put(SHORT_URL, INFO)
+    assert cache.invalidate(SHORT_URL) == 1
+    assert cache.get(WEBPAGE_URL) is None
+    assert ExtractionCache(disk_dir=tmp_path).get(WEBPAGE_URL) is None
+
+
+def test_invalidate_after_a_restart_removes_every_disk_alias(tmp_path):
+    ExtractionCache(disk_dir=tmp_path).put(SHORT_URL, INFO)
+    cache = ExtractionCache(disk_dir=tmp_path)
+    cache.invalidate(SHORT_URL)
+    assert cache.get(WEBPAGE_URL) is None
+    assert list(tmp_path.glob("*.json")) == []
@@ -0,0 +1,150 @@
+"""Unit tests for library_store: cursors, search queries, facets and writes."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from library_store import InvalidCursor, LibraryStore, decode_cursor, encode_cursor, fts_query
+
+
+def make_entry(video_id, title="Video", **fields):
+    entry = {
+        "id": video_id,
+        "video_page_name": title,
+        "saved_at": f"2024-01-01T00:00:{video_id[-2:]}",
+        "view_count": 0,
+    }
+    entry.update(fields)
+    return entry
+
+
+@pytest.fixture
+def store(tmp_path):
+    library = LibraryStore(tmp_path / "library.db", checkpoint_interval=0)
+    yield library
+    library.close()
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("title", "asc", "ünïcode title", "id-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "title", "asc") == ("ünïcode title", "id-1")
+
+
+def test_cursor_for_another_sort_order_is_rejected():
+    cursor = encode_cursor("saved_at", "desc", "2024-01-01", "id-1")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "saved_at", "asc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "view_count", "desc")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm90IGpzb24", "WzEsMl0"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "saved_at", "desc")
+
+
+def test_fts_query_prefix_matches_the_last_token_of_each_word():
+    assert fts_query("cat video") == '"cat"* AND "video"*'
+    assert fts_query("e-mail") == '"e mail"*'
+
+
+def test_fts_query_matches_cjk_runs_as_phrases():
+    assert fts_query("猫咪") == '"猫 咪"'
+    assert fts_query("猫咪 cat") == '"猫 咪" AND "cat"*'
+
+
+def test_fts_query_without_indexable_text():
+    assert fts_query("") is None
+    assert fts_query("!!! ---") is None
+
+
+def test_query_pages_with_cursor(store):
+    store.add_many([make_entry(f"id-{index:02d}", title=f"Video {index}") for index in range(5)])
+    first, cursor = store.query(limit=2)
+    second, cursor = store.query(limit=2, cursor=cursor)
+    third, cursor = store.query(limit=2, cursor=cursor)
+    assert [entry["id"] for entry in first + second + third] == ["id-04", "id-03", "id-02", "id-01", "id-00"]
+    assert cursor is None
+
+
+def test_query_search(store):
+    store.add_many([
+        make_entry("id-01", title="Cooking pasta", selected_tags=["food"]),
+        make_entry("id-02", title="Mountain biking", description="Riding through pasta fields"),
+        make_entry("id-03", title="猫咪视频"),
+    ])
+    entries, _ = store.query(search="past")
+    assert {entry["id"] for entry in entries} == {"id-01", "id-02"}
+    entries, _ = store.query(search="猫咪")
+    assert [entry["id"] for entry in entries] == ["id-03"]
+    assert store.count_matching(search="food") == 1
+
+
+def test_facet_counts_follow_saves_and_deletes(store):
+    store.add_many([
+        make_entry("id-01", selected_tags=["a", "b"], category="Music", uploader="alice"),
+        make_entry("id-02", selected_tags=["a"], category="Music", uploader="bob"),
+    ])
+    facets = store.facet_counts()
+    assert facets["tags"] == {"a": 2, "b": 1}
+    assert facets["categories"] == {"Music": 2}
+    assert facets["uploaders"] == {"alice": 1, "bob": 1}
+
+    # Replacing an entry moves its counts
+    store.add(make_entry("id-02", selected_tags=["c"], category="Gaming", uploader="bob"))
+    store.delete(["id-01"])
+    facets = store.facet_counts()
+    assert facets["tags"] == {"c": 1}
+    assert facets["categories"] == {"Gaming": 1}
+    assert facets["uploaders"] == {"bob": 1}
+    assert store.filtered_facet_counts(category="Gaming")["tags"] == {"c": 1}
+
+
+def test_concurrent_writes_are_group_committed(store):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda index: store.add(make_entry(f"id-{index:03d}")), range(200)))
+    assert store.count() == 200
+    assert store.grouped_writes == 200
+    assert store.group_commits <= 200
+
+
+def test_failed_write_does_not_affect_its_batch(store):
+    store.add(make_entry("id-01"))
+    with pytest.raises(KeyError):
+        store.add({"video_page_name": "no id"})
+    assert store.get("id-01")["id"] == "id-01"
+    assert store.count() == 1
+
+
+def test_get_sees_writes_from_another_connection(store, tmp_path):
+    store.add(make_entry("id-01", title="Before"))
+    assert store.get("id-01")["video_page_name"] == "Before"
+
+    other = LibraryStore(tmp_path / "library.db", checkpoint_interval=0)
+    try:
+        other.add(make_entry("id-01", title="After"))
+    finally:
+        other.close()
+    assert store.get("id-01")["video_page_name"] == "After"
+
+
+def test_update_fields_merges_into_the_stored_entry(store):
+    store.add(make_entry("id-01", title="Title", hls_url=None))
+
+    async def update():
+        return await store.update_fields("id-01", hls_url="/hls/id-01/master.m3u8")
+
+    updated = asyncio.run(update())
+    assert updated["hls_url"] == "/hls/id-01/master.m3u8"
+    assert store.get("id-01")["video_page_name"] == "Title"
+
+
+def test_update_fields_of_a_deleted_entry(store):
+    async def update():
+        return await store.update_fields("missing", hls_url="/hls/missing/master.m3u8")
+
+    assert asyncio.run(update()) is None
+    assert store.count() == 0
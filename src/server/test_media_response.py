@@ -0,0 +1,128 @@
+"""Unit tests for media_response: Range parsing and RangeFileResponse."""
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from media_response import MAX_RANGES, RangeFileResponse, is_content_addressed, parse_range_header
+
+BODY = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=1000-", [(1000, 1023)]),
+    ("bytes=-24", [(1000, 1023)]),
+    ("bytes=-5000", [(0, 1023)]),
+    ("bytes=0-5000", [(0, 1023)]),
+    ("bytes=0-9, 5-19, 20-29", [(0, 29)]),
+    ("bytes=100-199,0-9", [(0, 9), (100, 199)]),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header", ["items=0-1", "bytes=", "bytes=abc-", "bytes=5", "bytes=9-5"])
+def test_parse_malformed_range_header(header):
+    assert parse_range_header(header, len(BODY)) is None
+
+
+def test_parse_unsatisfiable_range_header():
+    assert parse_range_header("bytes=2000-", len(BODY)) == []
+    assert parse_range_header("bytes=-0", len(BODY)) == []
+
+
+def test_is_content_addressed():
+    assert is_content_addressed("0b6f5c3e-2a43-4f0e-9b8a-3e2f1c9d7a10.mp4")
+    assert not is_content_addressed("video.mp4")
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(BODY)
+
+    async def media(request):
+        return RangeFileResponse(path, request, media_type="video/mp4", immutable="immutable" in request.query_params)
+
+    app = Starlette(routes=[Route("/media", media, methods=["GET", "HEAD"])])
+    return TestClient(app)
+
+
+def test_full_response(client):
+    response = client.get("/media")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"].startswith('"')
+    assert "cache-control" not in response.headers
+
+
+def test_immutable_response(client):
+    response = client.get("/media?immutable=1")
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_single_range(client):
+    response = client.get("/media", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 100-199/1024"
+    assert response.headers["content-length"] == "100"
+    assert response.content == BODY[100:200]
+
+
+def test_multiple_ranges(client):
+    response = client.get("/media", headers={"Range": "bytes=0-9,100-109"})
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1]
+    body = response.content
+    assert int(response.headers["content-length"]) == len(body)
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+    assert b"Content-Range: bytes 0-9/1024\r\n\r\n" + BODY[0:10] in body
+    assert b"Content-Range: bytes 100-109/1024\r\n\r\n" + BODY[100:110] in body
+
+
+def test_too_many_ranges_get_the_whole_file(client):
+    ranges = ",".join(f"{index * 10}-{index * 10 + 1}" for index in range(MAX_RANGES + 1))
+    response = client.get("/media", headers={"Range": f"bytes={ranges}"})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/media", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+    assert response.content == b""
+
+
+def test_if_range(client):
+    etag = client.get("/media").headers["etag"]
+    response = client.get("/media", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    # A stale validator means the file changed: send all of it
+    response = client.get("/media", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_not_modified(client):
+    full = client.get("/media")
+    response = client.get("/media", headers={"If-None-Match": full.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == full.headers["etag"]
+    response = client.get("/media", headers={"If-Modified-Since": full.headers["last-modified"]})
+    assert response.status_code == 304
+    response = client.get("/media", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_head_sends_no_body(client):
+    response = client.head("/media", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
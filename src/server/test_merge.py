@@ -0,0 +1,33 @@
+"""Unit tests for merge: which streams are copied and the merge timeout."""
+
+import pytest
+
+from merge import MAX_TRANSCODE_TIMEOUT, MERGE_TIMEOUT, merge_timeout, plan_merge
+
+
+@pytest.mark.parametrize("video_codec", ["h264", "hevc", "av1", "vp9", None])
+def test_video_is_copied_when_mp4_holds_it(video_codec):
+    assert plan_merge(video_codec, "aac", transcode_hevc=False).copy_video
+
+
+def test_video_mp4_cannot_hold_is_transcoded():
+    assert plan_merge("vp8", "aac").decision == "transcode_video"
+
+
+def test_hevc_transcode_is_opt_in():
+    assert plan_merge("hevc", "aac", transcode_hevc=False).decision == "copy"
+    assert plan_merge("hevc", "aac", transcode_hevc=True).decision == "transcode_video"
+
+
+@pytest.mark.parametrize("audio_codec, copied", [
+    ("aac", True), ("mp3", True), ("opus", True), ("vorbis", False), ("ac3", False), ("flac", False),
+])
+def test_audio_is_copied_only_when_browsers_play_it(audio_codec, copied):
+    assert plan_merge("h264", audio_codec).copy_audio is copied
+
+
+def test_merge_timeout():
+    assert merge_timeout(plan_merge("h264", "aac"), 600) == MERGE_TIMEOUT
+    assert merge_timeout(plan_merge("h264", "vorbis"), 600) == MERGE_TIMEOUT + 600 * 0.25
+    assert merge_timeout(plan_merge("vp8", "vorbis"), 600) == MERGE_TIMEOUT + 600 * 3.25
+    assert merge_timeout(plan_merge("vp8", "aac"), None) == MAX_TRANSCODE_TIMEOUT
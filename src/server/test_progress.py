@@ -0,0 +1,62 @@
+"""Unit tests for progress: yt-dlp template lines and the download tracker."""
+
+from progress import YTDLP_PROGRESS_PREFIX, DownloadProgressTracker, parse_ytdlp_progress
+
+
+def progress_line(*fields):
+    return f"{YTDLP_PROGRESS_PREFIX} " + "|".join(str(field) for field in fields)
+
+
+def test_parse_ytdlp_progress():
+    line = progress_line("downloading", 1024, 4096, "NA", 512.5, 6, 3, 10, "137")
+    assert parse_ytdlp_progress(line) == {
+        "status": "downloading",
+        "downloaded_bytes": 1024,
+        "total_bytes": 4096.0,
+        "speed": 512.5,
+        "eta": 6.0,
+        "fragment_index": 3,
+        "fragment_count": 10,
+        "format_id": "137",
+    }
+
+
+def test_parse_ytdlp_progress_missing_values():
+    line = progress_line("downloading", "NA", "NA", 2048, "NA", "NA", "NA", "NA", "NA")
+    progress = parse_ytdlp_progress(line)
+    assert progress["downloaded_bytes"] == 0
+    assert progress["total_bytes"] == 2048.0
+    assert progress["speed"] is None
+    assert progress["fragment_index"] is None
+    assert progress["format_id"] is None
+
+
+def test_parse_ytdlp_progress_ignores_other_lines():
+    assert parse_ytdlp_progress("[download] Destination: video.mp4") is None
+    assert parse_ytdlp_progress(f"{YTDLP_PROGRESS_PREFIX} downloading|1|2") is None
+
+
+def test_tracker_sums_finished_streams():
+    snapshots = []
+    tracker = DownloadProgressTracker(snapshots.append)
+    tracker.feed_ytdlp_line(progress_line("downloading", 500, 1000, "NA", 100, 5, "NA", "NA", "137"))
+    tracker.feed_ytdlp_line(progress_line("finished", 1000, 1000, "NA", "NA", "NA", "NA", "NA", "137"))
+    tracker.feed_ytdlp_line(progress_line("downloading", 200, 400, "NA", 100, 2, "NA", "NA", "140"))
+    assert tracker.bytes_downloaded == 1200
+    snapshot = tracker.snapshot()
+    assert snapshot["format_id"] == "140"
+    assert snapshot["percent"] == 50.0
+    # The first line and the finished stream are always reported
+    assert snapshots[0]["downloaded_bytes"] == 500
+    assert snapshots[1]["bytes_downloaded"] == 1000
+
+
+def test_tracker_phases_and_ffmpeg_progress():
+    snapshots = []
+    tracker = DownloadProgressTracker(snapshots.append)
+    tracker.feed_ytdlp_line("[Merger] Merging formats into \"video.mp4\"")
+    assert snapshots[-1]["phase"] == "merging"
+    for line in ("out_time_us=12500000", "speed=2.5x", "progress=end"):
+        tracker.feed_ffmpeg_line(line)
+    assert snapshots[-1]["merge_out_time"] == 12.5
+    assert snapshots[-1]["merge_speed"] == "2.5x"
@@ -0,0 +1,130 @@
+"""Resized thumbnail variants for the library grid.
+
+yt-dlp writes the thumbnail at the source's full resolution, often hundreds
+of KB per card. When a video is saved, ffmpeg scales the thumbnail down to a
+few fixed widths in WebP and JPEG next to the original
+(``<video_id>_<width>.<format>``), and ``/video_library/{filename}?size=``
+serves the closest variant. Each ffmpeg run takes a slot of the
+``ffmpeg_thumbnail`` tool, so variant generation is bounded like every other
+external process. The encoding itself runs in those ffmpeg processes, which
+already spread over the cores, so no Python process pool is involved.
+"""
+
+import asyncio
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from process_runner import run_process
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+
+# Encoder arguments per output format
+THUMBNAIL_FORMATS = {
+    "webp": ["-c:v", "libwebp", "-quality", "80"],
+    "jpg": ["-c:v", "mjpeg", "-q:v", "4"],
+}
+DEFAULT_THUMBNAIL_FORMAT = "webp"
+
+THUMBNAIL_TIMEOUT = 60
+
+
+def variant_filename(thumbnail_filename: str, width: int, fmt: str) -> str:
+    """File name of a resized variant of a library thumbnail"""
+    return f"{Path(thumbnail_filename).stem}_{width}.{fmt}"
+
+
+def variant_width(size: int) -> int:
+    """Smallest variant width that covers the requested size (or the largest)"""
+    for width in THUMBNAIL_WIDTHS:
+        if width >= size:
+            return width
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def variant_paths(thumbnail_path: Path) -> List[Path]:
+    """Every variant a thumbnail can have, existing or not"""
+    return [
+        thumbnail_path.with_name(variant_filename(thumbnail_path.name, width, fmt))
+        for width in THUMBNAIL_WIDTHS
+        for fmt in THUMBNAIL_FORMATS
+    ]
+
+
+def missing_variants(thumbnail_path: Path) -> List[Path]:
+    return [path for path in variant_paths(thumbnail_path) if not path.exists()]
+
+
+async def _encode(source: Path, fmt: str, widths: Iterable[int]) -> bool:
+    """Write the given widths of one format with a single ffmpeg run"""
+    outputs = []
+    for width in widths:
+        outputs += [
+            # Never upscale; -2 keeps the aspect ratio with an even height
+            "-vf", f"scale='min({width},iw)':-2",
+            "-frames:v", "1",
+            *THUMBNAIL_FORMATS[fmt],
+            str(source.with_name(variant_filename(source.name, width, fmt))),
+        ]
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(source), *outputs]
+    try:
+        result = await run_process("ffmpeg_thumbnail", cmd, timeout=THUMBNAIL_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Thumbnail variants timed out: {source.name} ({fmt})")
+        return False
+    except FileNotFoundError:
+        logger.warning("ffmpeg not found; thumbnail variants are not generated")
+        return False
+    if result.returncode != 0:
+        logger.warning(f"Thumbnail variants failed for {source.name} ({fmt}): {result.stderr.strip()}")
+        return False
+    return True
+
+
+async def generate_variants(thumbnail_path: Path, only_missing: bool = False) -> List[str]:
+    """Create the resized variants of a thumbnail; returns the file names written.
+
+    Formats are encoded concurrently (each within the ffmpeg_thumbnail limit).
+    A format that fails to encode is skipped and the original is served
+    instead.
+    """
+    if not thumbnail_path.exists():
+        return []
+    wanted = set(missing_variants(thumbnail_path) if only_missing else variant_paths(thumbnail_path))
+    jobs = {}
+    for fmt in THUMBNAIL_FORMATS:
+        widths = [
+            width for width in THUMBNAIL_WIDTHS
+            if thumbnail_path.with_name(variant_filename(thumbnail_path.name, width, fmt)) in wanted
+        ]
+        if widths:
+            jobs[fmt] = widths
+    results = await asyncio.gather(*(_encode(thumbnail_path, fmt, widths) for fmt, widths in jobs.items()))
+    return [
+        variant_filename(thumbnail_path.name, width, fmt)
+        for (fmt, widths), ok in zip(jobs.items(), results) if ok
+        for width in widths
+    ]
+
+
+def resolve_variant(thumbnail_path: Path, size: int, fmt: Optional[str] = None) -> Optional[Path]:
+    """Existing variant of a thumbnail for a requested display width, if any"""
+    fmt = fmt or DEFAULT_THUMBNAIL_FORMAT
+    if fmt not in THUMBNAIL_FORMATS:
+        return None
+    path = thumbnail_path.with_name(variant_filename(thumbnail_path.name, variant_width(size), fmt))
+    return path if path.exists() else None
+
+
+async def backfill_variants(thumbnail_paths: Iterable[Path]) -> Dict[str, int]:
+    """Generate missing variants for existing thumbnails"""
+    pending = [path for path in thumbnail_paths if path.exists() and missing_variants(path)]
+    written = await asyncio.gather(*(generate_variants(path, only_missing=True) for path in pending))
+    return {
+        "thumbnails_processed": len(pending),
+        "variants_written": sum(len(names) for names in written),
+        "thumbnails_failed": sum(1 for names in written if not names),
+    }
@@ -0,0 +1,185 @@
+"""In-process yt-dlp engine.
+
+Runs extractions through the yt-dlp Python API in a dedicated pool of worker
+processes. Each worker builds one ``YoutubeDL`` instance at startup and keeps
+it warm, so the package and extractor imports, the cookie jar and the HTTP
+session are set up once per worker instead of once per request as with the
+``yt-dlp`` CLI. The cookie jar is reloaded only when the cookie manager has
+refreshed the shared cookie file.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cookie_manager import NETSCAPE_COOKIE_HEADER
+
+logger = logging.getLogger(__name__)
+
+# YoutubeDL instance owned by the current worker process
+_worker_ydl = None
+
+# Shared cookie file, the worker's private copy of it and the copied mtime
+_worker_cookies: Optional[Tuple[Path, Path]] = None
+_worker_cookies_mtime: Optional[float] = None
+
+
+class _ErrorCollector:
+    """yt-dlp logger keeping error output instead of printing it"""
+
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def debug(self, message: str) -> None:
+        pass
+
+    def info(self, message: str) -> None:
+        pass
+
+    def warning(self, message: str) -> None:
+        pass
+
+    def error(self, message: str) -> None:
+        self.errors.append(message)
+
+
+def _sync_worker_cookies() -> bool:
+    """Copy the shared cookie file when it changed; returns whether it did"""
+    global _worker_cookies_mtime
+    if _worker_cookies is None:
+        return False
+    shared_file, private_file = _worker_cookies
+    try:
+        mtime = shared_file.stat().st_mtime
+    except OSError:
+        mtime = None
+    if mtime == _worker_cookies_mtime and private_file.exists():
+        return False
+    data = NETSCAPE_COOKIE_HEADER.encode('utf-8') if mtime is None else shared_file.read_bytes()
+    # Write an owner-only temp file and swap it in, never following a link at the path
+    fd, tmp_path = tempfile.mkstemp(prefix="vt-cookies-worker-", dir=private_file.parent)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, private_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _worker_cookies_mtime = mtime
+    return True
+
+
+def _remove_worker_cookies() -> None:
+    """Delete the worker's private cookie copy when the worker exits"""
+    if _worker_cookies is not None:
+        _worker_cookies[1].unlink(missing_ok=True)
+
+
+def _init_worker(cli_args: List[str], cookies_file: Optional[str]) -> None:
+    """Build the warm YoutubeDL instance of a worker process"""
+    global _worker_ydl, _worker_cookies
+    import yt_dlp
+
+    # Parse the same options the CLI mode passes so both modes behave alike
+    options = yt_dlp.parse_options(cli_args).ydl_opts
+    options.update({
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "logger": _ErrorCollector(),
+    })
+    if cookies_file:
+        # yt-dlp writes its jar back on exit, so each worker uses a private copy
+        # mkstemp: owner-only and an unpredictable name; starts as an empty jar
+        fd, private_path = tempfile.mkstemp(prefix="vt-cookies-worker-", suffix=".txt")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(NETSCAPE_COOKIE_HEADER)
+        _worker_cookies = (Path(cookies_file), Path(private_path))
+        atexit.register(_remove_worker_cookies)
+        _sync_worker_cookies()
+        options["cookiefile"] = private_path
+    _worker_ydl = yt_dlp.YoutubeDL(options)
+
+
+def _extract_in_worker(url: str) -> Dict[str, Any]:
+    """Extract one URL with the worker's YoutubeDL; errors are returned as data"""
+    from yt_dlp.utils import DownloadError
+
+    if _sync_worker_cookies():
+        # The cookie manager refreshed the shared file since the last call
+        _worker_ydl.cookiejar.clear()
+        _worker_ydl.cookiejar.load()
+    collector = _worker_ydl.params["logger"]
+    collector.errors.clear()
+    try:
+        info = _worker_ydl.extract_info(url, download=False)
+    except DownloadError as e:
+        return {"error": "\n".join(collector.errors) or str(e)}
+    if info is None:
+        # The CLI defaults ignore some errors and return nothing instead of raising
+        return {"error": "\n".join(collector.errors) or "No video metadata found"}
+    return {"info": _worker_ydl.sanitize_info(info)}
+
+
+def _ping() -> bool:
+    return True
+
+
+class YtdlpEngine:
+    """Pool of worker processes each holding a warm YoutubeDL instance"""
+
+    def __init__(self, cli_args: List[str], cookies_file: Optional[Path] = None, workers: int = 2):
+        self.cli_args = list(cli_args)
+        self.cookies_file = cookies_file
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn avoids forking a process that already runs an event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.cli_args, str(self.cookies_file) if self.cookies_file else None)
+            )
+        return self._pool
+
+    async def start(self) -> None:
+        """Start every worker up front so the first requests find them warm"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        await asyncio.gather(*[loop.run_in_executor(pool, _ping) for _ in range(self.workers)])
+        logger.info(f"Started {self.workers} in-process yt-dlp workers")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    async def extract(self, url: str, timeout: float) -> Dict[str, Any]:
+        """Extract a URL in a worker process.
+
+        Returns ``{"info": ...}`` or ``{"error": stderr-like text}`` and raises
+        ``subprocess.TimeoutExpired`` after the timeout. A timed-out extraction
+        keeps its worker busy until yt-dlp gives up on its own.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_pool(), _extract_in_worker, url)
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired(["yt-dlp", url], timeout)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); start a fresh pool next time
+            logger.error("yt-dlp worker pool broke, restarting it")
+            self.shutdown()
+            raise
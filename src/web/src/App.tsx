@@ -17,6 +17,7 @@ interface Video {
   url: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   video_url?: string;
   // Enhanced metadata
   description?: string;
@@ -14,6 +14,7 @@ interface Video {
   url: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   video_url?: string;
   // Enhanced metadata
   description?: string;
@@ -42,6 +43,7 @@ interface ApiVideo {
   saved_at: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   thumbnail_url?: string;
   // Enhanced metadata from backend
   description?: string;
@@ -88,6 +90,12 @@ function getFileExtension(filename: string): string {
   return filename.split('.').pop()?.toUpperCase() || 'MP4';
 }
 
+// Videos fetched per page from /videopage_list
+const PAGE_SIZE = 48;
+
+// Thumbnail width requested for grid cards (the server picks the nearest variant)
+const THUMBNAIL_SIZE = 320;
+
 const LibraryPage: React.FC = () => {
   const [videos, setVideos] = useState<Video[]>([]);
   const [loading, setLoading] = useState(true);
@@ -105,15 +113,19 @@ const LibraryPage: React.FC = () => {
   const [isPlayerOpen, setIsPlayerOpen] = useState(false);
   
   // Available filter options
-  const [availableCategories, setAvailableCategories] = useState<string[]>([]);
-  const [availableUploaders, setAvailableUploaders] = useState<string[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [filteredCount, setFilteredCount] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Filter option -> number of videos with it, across the whole library
+  const [availableCategories, setAvailableCategories] = useState<Record<string, number>>({});
+  const [availableUploaders, setAvailableUploaders] = useState<Record<string, number>>({});
 
   // Transform API video to UI video format
   const transformApiVideo = (apiVideo: ApiVideo): Video => {
     return {
       id: apiVideo.id,
       title: apiVideo.video_page_name,
-      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}`,
+      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}?size=${THUMBNAIL_SIZE}`,
       duration: apiVideo.duration ? formatDuration(apiVideo.duration) : 'N/A',
       format: getFileExtension(apiVideo.library_file_name),
       fileSize: formatFileSize(apiVideo.file_size),
@@ -121,6 +133,7 @@ const LibraryPage: React.FC = () => {
       url: apiVideo.video_url,
       video_local_url: apiVideo.video_local_url,
       video_direct_url: apiVideo.video_direct_url,
+      hls_url: apiVideo.hls_url,
       video_url: apiVideo.video_url,
       // Enhanced metadata
       description: apiVideo.description,
@@ -139,20 +152,26 @@ const LibraryPage: React.FC = () => {
     };
   };
 
-  // Fetch videos with filters
-  const fetchVideos = async () => {
+  // Fetch the first page of videos with filters, or the page after `cursor`
+  const fetchVideos = async (cursor?: string) => {
     try {
-      setLoading(true);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
       setError(null);
       
       const params = new URLSearchParams({
         sort_by: sortBy,
-        order: sortOrder
+        order: sortOrder,
+        limit: String(PAGE_SIZE)
       });
       
       if (searchTerm) params.append('search', searchTerm);
       if (selectedCategory) params.append('category', selectedCategory);
       if (selectedUploader) params.append('uploader', selectedUploader);
+      if (cursor) params.append('cursor', cursor);
       
       const response = await fetch(`http://localhost:6800/videopage_list?${params}`);
       
@@ -162,19 +181,19 @@ const LibraryPage: React.FC = () => {
       
       const data = await response.json();
       const transformedVideos = data.videos.map(transformApiVideo);
-      setVideos(transformedVideos);
+      setVideos(cursor ? [...videos, ...transformedVideos] : transformedVideos);
+      setNextCursor(data.next_cursor || null);
+      setFilteredCount(data.filtered_videos ?? data.total_videos ?? 0);
       
-      // Extract available filter options
-      const categories = [...new Set(data.videos.map((v: ApiVideo) => v.category).filter(Boolean))] as string[];
-      const uploaders = [...new Set(data.videos.map((v: ApiVideo) => v.uploader).filter(Boolean))] as string[];
-      
-      setAvailableCategories(categories.sort());
-      setAvailableUploaders(uploaders.sort());
+      // Filter options cover the whole library, not just the loaded page
+      setAvailableCategories(data.facet_counts?.categories || {});
+      setAvailableUploaders(data.facet_counts?.uploaders || {});
       
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch videos');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -327,7 +346,7 @@ const LibraryPage: React.FC = () => {
           <div className="text-center py-20">
             <p className="text-slate-400 text-lg">{error}</p>
             <button 
-              onClick={fetchVideos}
+              onClick={() => fetchVideos()}
               className="mt-4 bg-blue-500 hover:bg-blue-600 text-white px-6 py-2 rounded-lg transition-colors"
             >
               Retry
@@ -346,7 +365,7 @@ const LibraryPage: React.FC = () => {
           <div>
             <h1 className="text-3xl font-bold text-white mb-2">Video Library</h1>
             <p className="text-slate-400">
-              {videos.length} video{videos.length !== 1 ? 's' : ''} in your collection
+              {filteredCount} video{filteredCount !== 1 ? 's' : ''} in your collection
               {selectedVideos.size > 0 && ` • ${selectedVideos.size} selected`}
               {isSelectionMode && selectedVideos.size === 0 && ' • Click videos to select them'}
             </p>
@@ -472,8 +491,8 @@ const LibraryPage: React.FC = () => {
                 className="w-full pl-10 pr-4 py-2 bg-slate-700/50 border border-slate-600/50 rounded-lg text-white focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent appearance-none"
               >
                 <option value="">All Categories</option>
-                {availableCategories.map(category => (
-                  <option key={category} value={category}>{category}</option>
+                {Object.entries(availableCategories).map(([category, count]) => (
+                  <option key={category} value={category}>{category} ({count})</option>
                 ))}
               </select>
             </div>
@@ -487,8 +506,8 @@ const LibraryPage: React.FC = () => {
                 className="w-full pl-10 pr-4 py-2 bg-slate-700/50 border border-slate-600/50 rounded-lg text-white focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent appearance-none"
               >
                 <option value="">All Uploaders</option>
-                {availableUploaders.map(uploader => (
-                  <option key={uploader} value={uploader}>{uploader}</option>
+                {Object.entries(availableUploaders).map(([uploader, count]) => (
+                  <option key={uploader} value={uploader}>{uploader} ({count})</option>
                 ))}
               </select>
             </div>
@@ -505,6 +524,7 @@ const LibraryPage: React.FC = () => {
                 <option value="view_count">Views</option>
                 <option value="like_count">Likes</option>
                 <option value="duration">Duration</option>
+                {searchTerm && <option value="relevance">Relevance</option>}
               </select>
               <select
                 value={sortOrder}
@@ -588,6 +608,18 @@ const LibraryPage: React.FC = () => {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={() => fetchVideos(nextCursor)}
+              disabled={loadingMore}
+              className="bg-slate-700/50 hover:bg-slate-600/50 disabled:opacity-50 disabled:cursor-not-allowed text-white px-6 py-2 rounded-lg transition-colors"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Video Player Modal */}
@@ -12,6 +12,7 @@ interface Video {
   url: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   video_url?: string;
   // Enhanced metadata
   description?: string;
@@ -40,6 +41,7 @@ interface ApiVideo {
   saved_at: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   thumbnail_url?: string;
   // Enhanced metadata from backend
   description?: string;
@@ -109,6 +111,9 @@ function getVideoSource(url: string): string {
   return 'Unknown';
 }
 
+// Thumbnail width requested for the cards (the server picks the nearest variant)
+const THUMBNAIL_SIZE = 320;
+
 const RecentVideos: React.FC<RecentVideosProps> = ({ onPlayVideo }) => {
   const [recentVideos, setRecentVideos] = useState<Video[]>([]);
   const [loading, setLoading] = useState(true);
@@ -119,7 +124,7 @@ const RecentVideos: React.FC<RecentVideosProps> = ({ onPlayVideo }) => {
     return {
       id: apiVideo.id,
       title: apiVideo.video_page_name,
-      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}`,
+      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}?size=${THUMBNAIL_SIZE}`,
       duration: apiVideo.duration ? formatDuration(apiVideo.duration) : 'N/A',
       format: getFileExtension(apiVideo.library_file_name),
       fileSize: formatFileSize(apiVideo.file_size),
@@ -127,6 +132,7 @@ const RecentVideos: React.FC<RecentVideosProps> = ({ onPlayVideo }) => {
       url: apiVideo.video_url,
       video_local_url: apiVideo.video_local_url,
       video_direct_url: apiVideo.video_direct_url,
+      hls_url: apiVideo.hls_url,
       video_url: apiVideo.video_url,
       // Enhanced metadata
       description: apiVideo.description,
@@ -150,7 +156,7 @@ const RecentVideos: React.FC<RecentVideosProps> = ({ onPlayVideo }) => {
     try {
       setLoading(true);
       setError(null);
-      const response = await fetch('http://localhost:6800/videopage_list?sort_by=saved_at&order=desc');
+      const response = await fetch('http://localhost:6800/videopage_list?sort_by=saved_at&order=desc&limit=3');
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -2,6 +2,50 @@ import React, { useState, useEffect } from 'react';
 import { Globe, Download, ChevronDown } from 'lucide-react';
 import { useLanguage } from '../contexts/LanguageContext';
 
+interface DownloadProgress {
+  phase: string;
+  percent: number | null;
+  speed: number | null;
+  eta: number | null;
+  fragment_index: number | null;
+  fragment_count: number | null;
+  bytes_downloaded: number;
+}
+
+interface DownloadJob {
+  job_id: string;
+  state: 'queued' | 'running' | 'completed' | 'failed';
+  progress: Partial<DownloadProgress>;
+  filename?: string;
+  error?: string | null;
+}
+
+const formatBytes = (bytes: number) => {
+  if (bytes >= 1024 * 1024 * 1024) return `${(bytes / (1024 * 1024 * 1024)).toFixed(2)} GB`;
+  if (bytes >= 1024 * 1024) return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+  return `${(bytes / 1024).toFixed(0)} KB`;
+};
+
+// Follow a download job over Server-Sent Events until it completes or fails
+const waitForDownloadJob = (jobId: string, onUpdate: (job: DownloadJob) => void) =>
+  new Promise<DownloadJob>((resolve, reject) => {
+    const events = new EventSource(`http://localhost:6800/jobs/${jobId}/events`);
+    const handleSnapshot = (event: MessageEvent) => {
+      const job: DownloadJob = JSON.parse(event.data);
+      onUpdate(job);
+      if (job.state === 'completed' || job.state === 'failed') {
+        events.close();
+        resolve(job);
+      }
+    };
+    events.addEventListener('progress', handleSnapshot as EventListener);
+    events.addEventListener('done', handleSnapshot as EventListener);
+    events.onerror = () => {
+      events.close();
+      reject(new Error('Lost connection to download progress stream'));
+    };
+  });
+
 interface VideoInputProps {
   onSubmit: (url: string, format: string) => void;
   isProcessing: boolean;
@@ -18,6 +62,7 @@ const VideoInput: React.FC<VideoInputProps> = ({ onSubmit, isProcessing, onVideo
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [analyzeError, setAnalyzeError] = useState<string | null>(null);
   const [isImporting, setIsImporting] = useState(false);
+  const [downloadJob, setDownloadJob] = useState<DownloadJob | null>(null);
 
   const validateUrl = (urlString: string) => {
     try {
@@ -167,8 +212,8 @@ const VideoInput: React.FC<VideoInputProps> = ({ onSubmit, isProcessing, onVideo
       setIsImporting(true);
       
       try {
-        // Step 1: Download the video
-        const downloadResponse = await fetch('http://localhost:6800/videopage_download', {
+        // Step 1: Queue the download and follow its progress
+        const downloadResponse = await fetch('http://localhost:6800/jobs', {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
@@ -183,7 +228,13 @@ const VideoInput: React.FC<VideoInputProps> = ({ onSubmit, isProcessing, onVideo
           throw new Error(`Download failed: ${downloadResponse.statusText}`);
         }
         
-        const downloadData = await downloadResponse.json();
+        const queuedJob: DownloadJob = await downloadResponse.json();
+        setDownloadJob(queuedJob);
+        const downloadData = await waitForDownloadJob(queuedJob.job_id, setDownloadJob);
+        
+        if (downloadData.state === 'failed') {
+          throw new Error(`Download failed: ${downloadData.error}`);
+        }
         
         // Step 2: Save the video to library
         const saveResponse = await fetch('http://localhost:6800/videopage_save', {
@@ -225,10 +276,41 @@ const VideoInput: React.FC<VideoInputProps> = ({ onSubmit, isProcessing, onVideo
         alert(error instanceof Error ? error.message : 'Failed to import video');
       } finally {
         setIsImporting(false);
+        setDownloadJob(null);
       }
     }
   };
 
+  const renderDownloadProgress = (job: DownloadJob) => {
+    const progress = job.progress || {};
+    const phase = job.state === 'queued' ? 'queued' : progress.phase || 'downloading';
+    const percent = progress.percent ?? null;
+    const details = [
+      progress.bytes_downloaded ? formatBytes(progress.bytes_downloaded) : null,
+      progress.speed ? `${formatBytes(progress.speed)}/s` : null,
+      progress.eta != null ? `${t('videoInput.eta')} ${Math.round(progress.eta)}s` : null,
+      progress.fragment_count ? `${progress.fragment_index ?? 0}/${progress.fragment_count}` : null,
+    ].filter(Boolean);
+
+    return (
+      <div className="space-y-2">
+        <div className="flex justify-between text-sm text-slate-300">
+          <span>{t(`videoInput.phase.${phase}`)}</span>
+          {percent !== null && <span>{percent.toFixed(1)}%</span>}
+        </div>
+        <div className="w-full h-2 bg-slate-700 rounded-full overflow-hidden">
+          <div
+            className={`h-full bg-blue-500 transition-all duration-300 ${percent === null ? 'animate-pulse w-full' : ''}`}
+            style={percent !== null ? { width: `${percent}%` } : undefined}
+          ></div>
+        </div>
+        {details.length > 0 && (
+          <p className="text-xs text-slate-400">{details.join(' · ')}</p>
+        )}
+      </div>
+    );
+  };
+
   return (
     <div className="bg-gradient-to-br from-slate-800 to-slate-900 rounded-2xl p-8 shadow-2xl border border-slate-700/50">
       <div className="text-center mb-8">
@@ -324,6 +406,8 @@ const VideoInput: React.FC<VideoInputProps> = ({ onSubmit, isProcessing, onVideo
         </div>
         )}
 
+        {downloadJob && renderDownloadProgress(downloadJob)}
+
         <button
           type="submit"
           disabled={isProcessing || isImporting || !url.trim() || !isValidUrl || !format || isAnalyzing || formats.length === 0 || analyzeError !== null}
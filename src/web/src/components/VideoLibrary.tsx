@@ -1,4 +1,4 @@
-import React, { useState, useEffect, forwardRef, useImperativeHandle } from 'react';
+import React, { useState, useEffect, useRef, forwardRef, useImperativeHandle } from 'react';
 import { Search, Play, Download, ExternalLink, Calendar, HardDrive, Grid3X3, List, Loader2 } from 'lucide-react';
 import VideoCard from './VideoCard';
 import { useLanguage } from '../contexts/LanguageContext';
@@ -14,6 +14,7 @@ interface Video {
   url: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   video_url?: string;
   // Enhanced metadata
   description?: string;
@@ -42,6 +43,7 @@ interface ApiVideo {
   saved_at: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   thumbnail_url?: string;
   // Enhanced metadata from backend
   description?: string;
@@ -78,6 +80,15 @@ function formatDuration(seconds?: number): string {
   return `${minutes}:${remainingSeconds.toString().padStart(2, '0')}`;
 }
 
+// Delay after the last keystroke before the search is sent to the server
+const SEARCH_DEBOUNCE_MS = 250;
+
+// Videos fetched per page from /videopage_list
+const PAGE_SIZE = 24;
+
+// Thumbnail width requested for grid cards (the server picks the nearest variant)
+const THUMBNAIL_SIZE = 320;
+
 interface VideoLibraryProps {
   onPlayVideo: (video: Video) => void;
   onDownloadVideo: (video: Video) => void;
@@ -92,8 +103,14 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = React.useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [viewMode, setViewMode] = React.useState<'gallery' | 'list'>('gallery');
   const [sortOrder, setSortOrder] = useState<'newest' | 'oldest'>('newest');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [totalVideos, setTotalVideos] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // The in-flight list request; a newer request aborts it so its response cannot overwrite newer results
+  const requestRef = useRef<AbortController | null>(null);
   const { t } = useLanguage();
 
   // Helper function to format file size
@@ -125,7 +142,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
     return {
       id: apiVideo.id,
       title: apiVideo.video_page_name,
-      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}`,
+      thumbnail_url: `http://localhost:6800${apiVideo.thumbnail_url}?size=${THUMBNAIL_SIZE}`,
       duration: apiVideo.duration ? formatDuration(apiVideo.duration) : 'N/A',
       format: getFileExtension(apiVideo.library_file_name),
       fileSize: formatFileSize(apiVideo.file_size),
@@ -133,6 +150,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
       url: apiVideo.video_url,
       video_local_url: apiVideo.video_local_url,
       video_direct_url: apiVideo.video_direct_url,
+      hls_url: apiVideo.hls_url,
       video_url: apiVideo.video_url,
       // Enhanced metadata
       description: apiVideo.description,
@@ -151,12 +169,28 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
     };
   };
 
-  // Fetch videos from API
-  const fetchVideos = async () => {
+  // Fetch the first page of videos, or the page after `cursor`
+  const fetchVideos = async (cursor?: string) => {
+    requestRef.current?.abort();
+    const controller = new AbortController();
+    requestRef.current = controller;
     try {
-      setLoading(true);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
       setError(null);
-      const response = await fetch('http://localhost:6800/videopage_list');
+      
+      const params = new URLSearchParams({
+        sort_by: 'saved_at',
+        order: sortOrder === 'newest' ? 'desc' : 'asc',
+        limit: String(PAGE_SIZE)
+      });
+      if (debouncedSearch) params.append('search', debouncedSearch);
+      if (cursor) params.append('cursor', cursor);
+      
+      const response = await fetch(`http://localhost:6800/videopage_list?${params}`, { signal: controller.signal });
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
@@ -164,36 +198,42 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
       
       const data = await response.json();
       const transformedVideos = data.videos.map(transformApiVideo);
-      setVideos(transformedVideos);
+      setVideos(prev => cursor ? [...prev, ...transformedVideos] : transformedVideos);
+      setNextCursor(data.next_cursor || null);
+      setTotalVideos(data.total_videos || 0);
     } catch (err) {
+      if (controller.signal.aborted) return;
       setError(err instanceof Error ? err.message : 'Failed to fetch videos');
     } finally {
-      setLoading(false);
+      // A superseded request leaves the loading state to the one that replaced it
+      if (requestRef.current === controller) {
+        requestRef.current = null;
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
   // Expose refresh function to parent component
   useImperativeHandle(ref, () => ({
-    refreshVideos: fetchVideos
+    refreshVideos: () => fetchVideos()
   }));
 
-  // Fetch videos on component mount
+  // Only search once typing pauses instead of on every keystroke
   useEffect(() => {
-    fetchVideos();
-  }, []);
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  const filteredVideos = videos.filter(video =>
-    video.title.toLowerCase().includes(searchTerm.toLowerCase())
-  );
+  // Search and date order are applied by the server, so refetch from the first page
+  useEffect(() => {
+    fetchVideos();
+  }, [debouncedSearch, sortOrder]);
 
-  // Sort filtered videos by date
-  const sortedVideos = [...filteredVideos].sort((a, b) => {
-    const dateA = new Date(a.downloadedAt).getTime();
-    const dateB = new Date(b.downloadedAt).getTime();
-    return sortOrder === 'newest' ? dateB - dateA : dateA - dateB;
-  });
+  // Abort the in-flight request when the library is unmounted
+  useEffect(() => () => requestRef.current?.abort(), []);
 
-  if (loading) {
+  if (loading && videos.length === 0 && !searchTerm) {
     return (
       <div className="space-y-6">
         <div className="flex items-center justify-center py-16">
@@ -217,7 +257,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
           <h3 className="text-xl font-semibold text-white mb-2">{t('videoLibrary.failedToLoad')}</h3>
           <p className="text-slate-400 mb-4">{error}</p>
           <button
-            onClick={fetchVideos}
+            onClick={() => fetchVideos()}
             className="bg-blue-500 hover:bg-blue-600 text-white px-4 py-2 rounded-lg transition-colors duration-200"
           >
             {t('videoLibrary.tryAgain')}
@@ -233,13 +273,13 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
         <div>
           <h2 className="text-2xl font-bold text-white mb-1">{t('videoLibrary.title')}</h2>
           <p className="text-slate-400">
-            {videos.length} {videos.length === 1 ? t('videoLibrary.videosInCollection') : t('videoLibrary.videosInCollectionPlural')} {t('videoLibrary.inYourCollection')}
+            {totalVideos} {totalVideos === 1 ? t('videoLibrary.videosInCollection') : t('videoLibrary.videosInCollectionPlural')} {t('videoLibrary.inYourCollection')}
           </p>
         </div>
 
         <div className="flex items-center space-x-4">
           <button
-            onClick={fetchVideos}
+            onClick={() => fetchVideos()}
             disabled={loading}
             className="bg-slate-700/50 hover:bg-slate-600/50 disabled:opacity-50 disabled:cursor-not-allowed text-slate-300 hover:text-white px-3 py-2 rounded-lg transition-colors duration-200 flex items-center space-x-2"
             title={t('videoLibrary.refreshLibrary')}
@@ -298,7 +338,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
         </div>
       </div>
 
-      {filteredVideos.length === 0 ? (
+      {videos.length === 0 ? (
         <div className="text-center py-16">
           <div className="bg-slate-800/30 rounded-full w-24 h-24 flex items-center justify-center mx-auto mb-4">
             <Search className="h-12 w-12 text-slate-500" />
@@ -317,7 +357,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
         <>
           {viewMode === 'gallery' ? (
             <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-              {sortedVideos.map((video) => (
+              {videos.map((video) => (
                 <VideoCard
                   key={video.id}
                   video={video}
@@ -328,7 +368,7 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
             </div>
           ) : (
             <div className="bg-slate-800/30 rounded-xl border border-slate-700/50 overflow-hidden">
-              {sortedVideos.map((video) => (
+              {videos.map((video) => (
                 <div
                   key={video.id}
                   className="flex items-center p-4 hover:bg-slate-700/30 transition-colors duration-200 border-b border-slate-700/30 last:border-b-0"
@@ -408,6 +448,19 @@ const VideoLibrary = forwardRef<VideoLibraryRef, VideoLibraryProps>(({ onPlayVid
               ))}
             </div>
           )}
+
+          {nextCursor && (
+            <div className="flex justify-center">
+              <button
+                onClick={() => fetchVideos(nextCursor)}
+                disabled={loadingMore}
+                className="bg-slate-700/50 hover:bg-slate-600/50 disabled:opacity-50 disabled:cursor-not-allowed text-slate-300 hover:text-white px-4 py-2 rounded-lg transition-colors duration-200 flex items-center space-x-2"
+              >
+                {loadingMore && <Loader2 className="h-4 w-4 animate-spin" />}
+                <span className="text-sm">{t('videoLibrary.loadMore')}</span>
+              </button>
+            </div>
+          )}
         </>
       )}
     </div>
@@ -39,6 +39,7 @@ interface Video {
   url: string;
   video_local_url?: string;
   video_direct_url?: string;
+  hls_url?: string;
   // Enhanced metadata
   description?: string;
   category?: string;
@@ -55,6 +56,11 @@ interface Video {
   age_limit?: number;
 }
 
+// Browsers with native HLS playback (Safari, recent Chrome) get the
+// adaptive stream; everything else plays the single MP4
+const SUPPORTS_NATIVE_HLS = typeof document !== 'undefined'
+  && document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+
 interface VideoPlayerProps {
   video: Video | null;
   isOpen: boolean;
@@ -66,6 +72,7 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ video, isOpen, onClose, onDow
   const [isPlaying, setIsPlaying] = useState(false);
   const [hasError, setHasError] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
+  const [hlsFailed, setHlsFailed] = useState(false);
   const videoRef = useRef<HTMLVideoElement>(null);
   const { t } = useLanguage();
 
@@ -75,6 +82,7 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ video, isOpen, onClose, onDow
       setIsPlaying(false);
       setHasError(false);
       setIsLoading(true);
+      setHlsFailed(false);
     }
   }, [isOpen, video]);
 
@@ -95,7 +103,17 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ video, isOpen, onClose, onDow
     setHasError(false);
   };
 
+  const playHls = SUPPORTS_NATIVE_HLS && !!video.hls_url && !hlsFailed;
+  const videoSrc = playHls
+    ? `http://localhost:6800${video.hls_url}`
+    : video.video_local_url ? `http://localhost:6800${video.video_local_url}` : video.url;
+
   const handleVideoError = () => {
+    if (playHls) {
+      // Fall back to the MP4 if the HLS package cannot be played
+      setHlsFailed(true);
+      return;
+    }
     setIsLoading(false);
     setHasError(true);
   };
@@ -155,7 +173,7 @@ const VideoPlayer: React.FC<VideoPlayerProps> = ({ video, isOpen, onClose, onDow
           ) : (
             <video
               ref={videoRef}
-              src={video.video_local_url ? `http://localhost:6800${video.video_local_url}` : video.url}
+              src={videoSrc}
               poster={video.thumbnail_url}
               controls
               className="w-full h-full"